@@ -1,8 +1,20 @@
 import os
 import sys
 import mysql.connector as mysql
+import pandas as pd
 import pyodbc
-from datetime import datetime
+from datetime import datetime, timedelta
+
+from acesso_bd import ESTATISTICAS, POOL_TAMANHO, PoolLigacoes
+from agregados import ETL_AGREGADOS, aplica_deltas, clausula_output_delta, prepara_ligacao
+from carga_conjuntos import DERIVADAS_TEMPO, ETL_CARGA_CONJUNTOS, define_dimensao, resolve_dimensao_em_cache
+from dimensao_historica import ETL_SCD2, prepara_historico, verifica_requisitos, versao_atual
+from desenho_fisico import ETL_TROCA_PARTICOES, TABELA_CARGA, cria_tabela_troca, troca_particao_mes
+from dimensao_tempo import ETL_TEMPO_CALENDARIO, chave_tempo, garante_datas, prepara_calendario
+from etl_paralelo import ETL_WORKERS, executa_particoes, imprime_resumo, novo_resultado, particiona_meses
+from instrumentacao import METRICAS
+from zona_aterragem import (ETL_FASE, FASE_CARGA, FASE_EXTRACAO, escreve_particoes, le_particao, limpa_origem,
+                            marca_carregada, particao_carregada, particoes)
 
 # ---------------------------------------------------------
 # Variaveis de ligação aos SGBD (Mantidas como no original)
@@ -22,28 +34,50 @@ MSSQL_PWD = os.getenv("MSSQL_PWD", "root2025")
 MSSQL_DB = os.getenv("MSSQL_DB", "TP_G2_Viagens")
 MSSQL_DRIVER = os.getenv("MSSQL_DRIVER", "ODBC Driver 18 for SQL Server")
 
+# Destino das viagens a extrair (filtro de negócio do enunciado)
+CIDADE_DESTINO = os.getenv("CIDADE_DESTINO", "figfoz")
+PAIS_DESTINO = os.getenv("PAIS_DESTINO", "portugal")
+
 
 # ---------------------------------------------------------
 # Ligações ao SGBD
 # ---------------------------------------------------------
 
 def get_mysql_conn():
-    """Liga ao MySQL via mysql-connector-python."""
+    """
+    Liga ao MySQL via mysql-connector-python, com o pool nativo do conector (um pool por
+    processo, para que os workers não herdem as ligações do coordenador).
+    """
     return mysql.connect(
         host=MYSQL_HOST, port=MYSQL_PORT,
         user=MYSQL_USER, password=MYSQL_PWD,
-        database=MYSQL_DB, autocommit=True, charset="utf8mb4"
+        database=MYSQL_DB, autocommit=True, charset="utf8mb4",
+        pool_name=f"etl_mysql_{os.getpid()}", pool_size=POOL_TAMANHO
     )
 
 
-def get_mssql_conn():
-    """Liga ao SQL Server via pyodbc (schema padrão: dbo)."""
+def _liga_mssql():
+    """Abre uma nova ligação ao SQL Server via pyodbc (schema padrão: dbo)."""
     conn_str = (
         f"DRIVER={{{MSSQL_DRIVER}}};SERVER={MSSQL_HOST},{MSSQL_PORT};"
         f"DATABASE={MSSQL_DB};UID={MSSQL_USER};PWD={MSSQL_PWD};"
-        f"TrustServerCertificate=Yes;"
+        f"TrustServerCertificate=Yes;MARS_Connection=Yes;"  # MARS: vários cursores preparados ativos
     )
-    return pyodbc.connect(conn_str)
+    conn = pyodbc.connect(conn_str)
+    if ETL_AGREGADOS:
+        prepara_ligacao(conn)
+    if ETL_SCD2:
+        prepara_historico(conn, DIMENSOES_DW.values())
+    return conn
+
+
+# Pool do processo atual (cada worker cria as suas ligações na primeira utilização)
+POOL_MSSQL = PoolLigacoes(_liga_mssql)
+
+
+def get_mssql_conn():
+    """Ligação ao SQL Server obtida do pool; close() devolve-a ao pool."""
+    return POOL_MSSQL.obtem()
 
 
 # ---------------------------------------------------------
@@ -72,6 +106,35 @@ def get_next_id(cur, table_name, id_column):
     return (max_id or 0) + 1
 
 
+# Contador de ids do modo particionado: cada worker reserva, depois de extrair o seu mês,
+# tantos idviagens quantas as viagens que extraiu (a contagem feita antes pelo coordenador
+# pode já não corresponder, p.ex. viagens concluídas entretanto).
+SQL_CRIA_RESERVA_IDS = """
+    IF OBJECT_ID('etl_reserva_ids') IS NULL
+        CREATE TABLE etl_reserva_ids (tabela sysname PRIMARY KEY, proximo int NOT NULL);
+"""
+
+
+def inicia_reserva_ids(cur, table_name, id_column):
+    """Põe o contador de table_name no próximo ID livre (coordenador, antes de lançar os workers)."""
+    cur.execute(SQL_CRIA_RESERVA_IDS)
+    proximo = get_next_id(cur, table_name, id_column)
+    cur.execute("DELETE FROM etl_reserva_ids WHERE tabela = ?;", (table_name,))
+    cur.execute("INSERT INTO etl_reserva_ids (tabela, proximo) VALUES (?, ?);", (table_name, proximo))
+
+
+def reserva_ids(conn, cur, table_name, n):
+    """
+    Reserva n IDs consecutivos de table_name e devolve o primeiro. O UPDATE é atómico e o
+    commit imediato, para o bloqueio da linha do contador não esperar pela carga do worker.
+    """
+    cur.execute("UPDATE etl_reserva_ids SET proximo = proximo + ? OUTPUT deleted.proximo WHERE tabela = ?;",
+                (n, table_name))
+    primeiro = cur.fetchone()[0]
+    conn.commit()
+    return primeiro
+
+
 # ---------------------------------------------------------
 # FUNÇÕES get_or_create (Refatoradas para Chaves Explícitas)
 # ---------------------------------------------------------
@@ -153,7 +216,8 @@ def get_or_create_dim_condutor(cur, condutor_data):
     certificacao = condutor_data["certificacao"]
 
     # 1. Procura pela Chave Natural (Nome + Certificação)
-    cur.execute("SELECT idcondutor FROM condutor WHERE nome = ? AND certificacao = ?", (nome, certificacao))
+    cur.execute(f"SELECT idcondutor FROM condutor WHERE nome = ? AND certificacao = ?{versao_atual()}",
+                (nome, certificacao))
     row = cur.fetchone()
     if row: return row[0]
 
@@ -169,7 +233,8 @@ def get_or_create_dim_condutor(cur, condutor_data):
         return next_id
     except Exception as e:
         # Fallback (procura novamente em caso de concorrência)
-        cur.execute("SELECT idcondutor FROM condutor WHERE nome = ? AND certificacao = ?", (nome, certificacao))
+        cur.execute(f"SELECT idcondutor FROM condutor WHERE nome = ? AND certificacao = ?{versao_atual()}",
+                    (nome, certificacao))
         row = cur.fetchone()
         if row:
             return row[0]
@@ -262,7 +327,7 @@ def get_or_create_dim_barco(cur, barco_data):
     tamanho = barco_data["tamanho"]
 
     # 1. Procura pela Chave Natural (Nome + Tamanho)
-    cur.execute("SELECT idbarco FROM barco WHERE nome = ? AND tamanho = ?", (nome, tamanho))
+    cur.execute(f"SELECT idbarco FROM barco WHERE nome = ? AND tamanho = ?{versao_atual()}", (nome, tamanho))
     row = cur.fetchone()
     if row: return row[0]
 
@@ -281,7 +346,7 @@ def get_or_create_dim_barco(cur, barco_data):
         return next_id
     except Exception as e:
         # Fallback (procura novamente em caso de concorrência)
-        cur.execute("SELECT idbarco FROM barco WHERE nome = ? AND tamanho = ?", (nome, tamanho))
+        cur.execute(f"SELECT idbarco FROM barco WHERE nome = ? AND tamanho = ?{versao_atual()}", (nome, tamanho))
         row = cur.fetchone()
         if row:
             return row[0]
@@ -289,11 +354,254 @@ def get_or_create_dim_barco(cur, barco_data):
             raise e
 
 
+# ---------------------------------------------------------
+# QUERY DE EXTRAÇÃO (MySQL)
+# ---------------------------------------------------------
+
+# Índices de cobertura recomendados para a query de extração:
+# (tabela, nome do índice, colunas). As tabelas filho ficam cobertas pelo
+# índice (viagem_idviagem, métricas), evitando o acesso às linhas base.
+INDICES_RECOMENDADOS = [
+    ("viagem", "ix_viagem_destino_status", ("localizacao_idlocalizacao1", "status", "datachegada")),
+    ("taxas", "ix_taxas_viagem_valor", ("viagem_idviagem", "valor")),
+    ("contentores", "ix_contentores_viagem_peso", ("viagem_idviagem", "pesocontentor", "tamanho")),
+    ("localizacao", "ix_localizacao_cidade_pais", ("cidade", "pais")),
+]
+
+
+# Viagens concluídas com destino à Figueira da Foz e respetivas dimensões (partilhado
+# pela extração, pela contagem por mês e pela leitura dos membros das dimensões).
+# Parâmetros: (cidade_destino, pais_destino)
+FROM_VIAGENS_DESTINO = """
+        FROM viagem v
+        -- FILTRO DE NEGÓCIO (Requisito do Enunciado): destino = Figueira da Foz
+        JOIN localizacao dest ON v.localizacao_idlocalizacao1 = dest.idlocalizacao
+                             AND dest.cidade = %s AND dest.pais = %s
+        JOIN localizacao l ON v.localizacao_idlocalizacao = l.idlocalizacao
+        JOIN condutor c ON v.condutor_idcondutor = c.idcondutor
+        JOIN barco b ON v.barco_idbarco = b.idbarco
+        JOIN empresabarco eb ON b.empresabarco_idempresabarco = eb.idempresabarco
+"""
+
+
+def _where_viagens(por_intervalo, alias="v"):
+    """Cláusula WHERE comum; com por_intervalo acrescenta [datachegada_inicio, datachegada_fim[."""
+    where = f"WHERE {alias}.status = 'concluida'"
+    if por_intervalo:
+        where += f" AND {alias}.datachegada >= %s AND {alias}.datachegada < %s"
+    return where
+
+
+def _viagens_no_ambito(alias):
+    """
+    FROM das viagens com o destino a extrair, com o alias dado (o estado e o intervalo vêm de
+    _where_viagens), para as tabelas derivadas das tabelas filho só agregarem as viagens em âmbito.
+    """
+    return f"""FROM viagem {alias}
+            JOIN localizacao {alias}_dest ON {alias}.localizacao_idlocalizacao1 = {alias}_dest.idlocalizacao
+                                         AND {alias}_dest.cidade = %s AND {alias}_dest.pais = %s"""
+
+
+def parametros_extracao(inicio=None, fim=None):
+    """
+    Parâmetros de constroi_query_extracao (por_intervalo=inicio is not None), pela ordem dos %s:
+    o filtro das viagens aparece no FROM principal, nas duas tabelas derivadas e no WHERE.
+    """
+    intervalo = () if inicio is None else (inicio, fim)
+    filtro = (CIDADE_DESTINO, PAIS_DESTINO) + intervalo
+    return (CIDADE_DESTINO, PAIS_DESTINO) + filtro + filtro + intervalo
+
+
+def constroi_query_extracao(por_intervalo=False):
+    """
+    Constrói a query de extração das viagens concluídas com destino à Figueira da Foz.
+
+    As tabelas filho (taxas, contentores) são agregadas por viagem_idviagem numa
+    tabela derivada ANTES do JOIN, para que cada viagem dê origem a uma única linha.
+    Juntar as duas tabelas diretamente à viagem gera o produto taxas x contentores,
+    o que multiplica as somas (SUM(valor) fica multiplicado pelo nº de contentores, etc.).
+    As tabelas derivadas repetem o filtro das viagens (destino, estado e intervalo), para
+    que uma extração por mês não agregue as tabelas filho inteiras.
+
+    O filtro do destino é um JOIN à localização de destino; a comparação por igualdade
+    (sem lower()) permite usar o índice e, com a collation *_ci do MySQL, continua
+    a ser insensível a maiúsculas.
+    Parâmetros: parametros_extracao([datachegada_inicio, datachegada_fim]).
+    """
+    return f"""
+        SELECT
+            v.idviagem,
+            v.datapartida AS data_partida,
+            v.datachegada AS data_chegada,
+            v.tipoviagem,
+            v.localizacao_idlocalizacao as id_localizacao_origem,
+            v.condutor_idcondutor,
+            v.barco_idbarco,
+
+            l.pais as pais_origem,
+            l.cidade as cidade_origem,
+
+            c.nomecondutor,
+            c.idadecondutor AS idade,
+            c.certificacao,
+
+            b.nomebarco,
+            b.tamanhobarco AS tamanho,
+            b.tipobarco,
+            b.capacidadeteu,
+            b.empresabarco_idempresabarco,
+
+            eb.nomeempresabarco,
+            eb.paisempresabarco,
+
+            -- Métricas (Factos), já agregadas por viagem
+            COALESCE(t.totaltaxas_eur, 0) AS totaltaxas_eur,
+            COALESCE(ct.num_contentores_total, 0) AS num_contentores_total,
+            COALESCE(ct.peso_total_kg, 0) AS peso_total_kg,
+            COALESCE(ct.teu_total_calc, 0) AS teu_total_calc
+        {FROM_VIAGENS_DESTINO}
+        LEFT JOIN (
+            SELECT tx.viagem_idviagem, SUM(tx.valor) AS totaltaxas_eur
+            {_viagens_no_ambito("vt")}
+            JOIN taxas tx ON tx.viagem_idviagem = vt.idviagem
+            {_where_viagens(por_intervalo, "vt")}
+            GROUP BY tx.viagem_idviagem
+        ) t ON t.viagem_idviagem = v.idviagem
+        LEFT JOIN (
+            SELECT co.viagem_idviagem,
+                   COUNT(*) AS num_contentores_total,
+                   SUM(co.pesocontentor) AS peso_total_kg,
+                   SUM(CAST(co.tamanho AS DECIMAL(10,2)) / 20.0) AS teu_total_calc
+            {_viagens_no_ambito("vc")}
+            JOIN contentores co ON co.viagem_idviagem = vc.idviagem
+            {_where_viagens(por_intervalo, "vc")}
+            GROUP BY co.viagem_idviagem
+        ) ct ON ct.viagem_idviagem = v.idviagem
+
+        {_where_viagens(por_intervalo)}
+        ORDER BY v.datachegada;
+    """
+
+
+def constroi_query_particoes():
+    """Conta as viagens a extrair por (ano, mes) de datachegada. Parâmetros: (cidade, pais)."""
+    return f"""
+        SELECT YEAR(v.datachegada) AS ano, MONTH(v.datachegada) AS mes, COUNT(*) AS n
+        {FROM_VIAGENS_DESTINO}
+        {_where_viagens(False)}
+        GROUP BY YEAR(v.datachegada), MONTH(v.datachegada);
+    """
+
+
+# Membros distintos de cada dimensão presentes nas viagens a extrair.
+# As colunas devolvidas seguem os nomes usados no dicionário de cada get_or_create.
+QUERIES_MEMBROS_DIMENSOES = {
+    "condutor": """
+        SELECT c.nomecondutor AS nome, c.certificacao, MAX(c.idadecondutor) AS idade
+        {from_} {where}
+        GROUP BY c.nomecondutor, c.certificacao""",
+    "empresabarco": """
+        SELECT DISTINCT eb.nomeempresabarco, eb.paisempresabarco
+        {from_} {where}""",
+    "barco": """
+        SELECT b.nomebarco, b.tamanhobarco AS tamanho, MAX(b.tipobarco) AS tipobarco,
+               MAX(b.capacidadeteu) AS capacidadeteu,
+               MAX(eb.nomeempresabarco) AS nomeempresabarco, MAX(eb.paisempresabarco) AS paisempresabarco
+        {from_} {where}
+        GROUP BY b.nomebarco, b.tamanhobarco""",
+    "localizacao": """
+        SELECT DISTINCT l.pais, l.cidade
+        {from_} {where}""",
+    "tipo_viagem": """
+        SELECT DISTINCT v.tipoviagem
+        {from_} {where}""",
+    "tempo": """
+        SELECT DISTINCT v.datachegada
+        {from_} {where}""",
+    "classeduracao": """
+        SELECT DISTINCT DATEDIFF(v.datachegada, v.datapartida) AS duracao
+        {from_} {where}""",
+}
+
+
+def relatorio_indices_extracao(cur):
+    """
+    Compara os índices existentes no MySQL (information_schema) com INDICES_RECOMENDADOS
+    e imprime o CREATE INDEX dos que faltam. Um índice existente cobre a recomendação
+    se as suas primeiras colunas forem as colunas recomendadas (pela mesma ordem).
+    """
+    cur.execute("""
+                SELECT TABLE_NAME, INDEX_NAME, COLUMN_NAME
+                FROM information_schema.STATISTICS
+                WHERE TABLE_SCHEMA = DATABASE()
+                ORDER BY TABLE_NAME, INDEX_NAME, SEQ_IN_INDEX
+                """)
+    indices_existentes = {}
+    for row in cur.fetchall():
+        # O cursor pode ser de dicionário ou de tuplos
+        if isinstance(row, dict):
+            tabela, indice, coluna = row["TABLE_NAME"], row["INDEX_NAME"], row["COLUMN_NAME"]
+        else:
+            tabela, indice, coluna = row
+        indices_existentes.setdefault((tabela.lower(), indice), []).append(coluna.lower())
+
+    em_falta = []
+    for tabela, nome_indice, colunas in INDICES_RECOMENDADOS:
+        coberto = any(
+            t == tabela and tuple(cols[:len(colunas)]) == colunas
+            for (t, _), cols in indices_existentes.items()
+        )
+        if not coberto:
+            em_falta.append(f"CREATE INDEX {nome_indice} ON {tabela} ({', '.join(colunas)});")
+
+    if em_falta:
+        print("Índices de cobertura recomendados para a extração (em falta no MySQL):")
+        for ddl in em_falta:
+            print(f"    {ddl}")
+    return em_falta
+
+
+# ---------------------------------------------------------
+# FACTOS
+# ---------------------------------------------------------
+
+def sql_insert_facto_viagem(tabela="viagens"):
+    """INSERT parametrizado de um facto em tabela (viagens ou uma tabela de carga com a mesma estrutura)."""
+    return f"""
+                          INSERT INTO {tabela} (idviagens, duracaoviagem, totaltaxas, numerocontentores,
+                                               pesototalcontentores, teutotal, classeduracao_idclasseduracao,
+                                               localizacao_idlocalizacao, tipo_viagem_idtipoviagem,
+                                               condutor_idcondutor, barco_idbarco, tempo_idtempo)
+                          {clausula_output_delta()}
+                          VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?);
+                          """
+
+
+SQL_INSERT_FACTO_VIAGEM = sql_insert_facto_viagem()
+
+
+def valores_facto_viagem(id_viagens, r_mysql, duracao, ids_dimensoes):
+    """
+    Parâmetros do INSERT na tabela de factos (viagens).
+    ids_dimensoes = (classeduracao, localizacao, tipo_viagem, condutor, barco, tempo) - FKs Substitutas.
+    """
+    return (
+        id_viagens,  # Chave da Viagem no DW
+        duracao,  # Facto
+        float(r_mysql['totaltaxas_eur']),  # Facto (EUR)
+        int(r_mysql['num_contentores_total']),  # Facto
+        int(r_mysql['peso_total_kg']),  # Facto
+        int(r_mysql['teu_total_calc']),  # Facto
+        *ids_dimensoes,
+    )
+
+
 # ---------------------------------------------------------
 # FUNÇÃO PRINCIPAL ETL
 # ---------------------------------------------------------
 
 def main():
+    verifica_requisitos(ETL_CARGA_CONJUNTOS)
     print("1 - Ligação ao MySQL (Origem)")
     mysql_conn = get_mysql_conn()
     print("2 - Ligação ao MsSQL (Data Warehouse)")
@@ -303,66 +611,23 @@ def main():
         mysql_cur = mysql_conn.cursor(dictionary=True)
         sqlsrv_cur = sqlsrv_conn.cursor()
 
-        # [FASE 1: EXTRAÇÃO COMPLEXA DO MYSQL - QUERY CORRIGIDA]
-
-        query_mysql_viagens = f"""
-            SELECT
-                v.idviagem,
-                v.datapartida AS data_partida,
-                v.datachegada AS data_chegada,
-                v.tipoviagem,
-                v.localizacao_idlocalizacao as id_localizacao_origem,
-                v.condutor_idcondutor,
-                v.barco_idbarco,
-
-                l.pais as pais_origem,
-                l.cidade as cidade_origem,
-
-                c.nomecondutor,
-                c.idadecondutor AS idade,
-                c.certificacao,
-
-                b.nomebarco,
-                b.tamanhobarco AS tamanho,
-                b.tipobarco,
-                b.capacidadeteu,
-                b.empresabarco_idempresabarco,
-
-                eb.nomeempresabarco,
-                eb.paisempresabarco,
-
-                -- MÉTricas (Factos)
-                COALESCE(SUM(t.valor), 0) AS totaltaxas_eur,
-                COALESCE(COUNT(ct.idcontentor), 0) AS num_contentores_total,
-                COALESCE(SUM(ct.pesocontentor), 0) AS peso_total_kg,
-                COALESCE(SUM(CAST(ct.tamanho AS DECIMAL(10,2)) / 20.0), 0) AS teu_total_calc
-
-            FROM viagem v
-            JOIN localizacao l ON v.localizacao_idlocalizacao = l.idlocalizacao
-            JOIN condutor c ON v.condutor_idcondutor = c.idcondutor
-            JOIN barco b ON v.barco_idbarco = b.idbarco
-            JOIN empresabarco eb ON b.empresabarco_idempresabarco = eb.idempresabarco
-            LEFT JOIN taxas t ON v.idviagem = t.viagem_idviagem
-            LEFT JOIN contentores ct ON v.idviagem = ct.viagem_idviagem
-
-            -- FILTROS DE NEGÓCIO (Requisito do Enunciado)
-            WHERE v.status = 'concluida' 
-            -- CORRIGIDO: Usado IN para evitar o erro "Subquery returns more than 1 row"
-            AND v.localizacao_idlocalizacao1 IN (
-                SELECT idlocalizacao FROM localizacao WHERE lower(cidade) = "figfoz" AND lower(pais) = "portugal" 
-            )
-
-            GROUP BY 
-                v.idviagem, v.datapartida, v.datachegada, v.tipoviagem, v.localizacao_idlocalizacao, 
-                v.condutor_idcondutor, v.barco_idbarco, l.pais, l.cidade, c.nomecondutor, c.idadecondutor, 
-                c.certificacao, b.nomebarco, b.tamanhobarco, b.tipobarco, b.capacidadeteu, 
-                b.empresabarco_idempresabarco, eb.nomeempresabarco, eb.paisempresabarco
-            ORDER BY v.datachegada;
-        """
-        mysql_cur.execute(query_mysql_viagens)
-        rows_mysql = mysql_cur.fetchall()
+        # [FASE 1: EXTRAÇÃO DO MYSQL - FILHOS PRÉ-AGREGADOS POR VIAGEM]
+
+        with METRICAS.etapa("extracao"):
+            relatorio_indices_extracao(mysql_cur)
+
+            query_mysql_viagens = constroi_query_extracao()
+            mysql_cur.execute(query_mysql_viagens, parametros_extracao())
+            rows_mysql = mysql_cur.fetchall()
+        METRICAS.conta("extracao", linhas=len(rows_mysql), round_trips=2)
         print(f"Registos lidos do MySQL (Viagens): {len(rows_mysql)}")
 
+        if ETL_TEMPO_CALENDARIO and rows_mysql:
+            with METRICAS.etapa("dimensoes"):
+                prepara_calendario(sqlsrv_cur, min(r["data_chegada"] for r in rows_mysql),
+                                   max(r["data_chegada"] for r in rows_mysql))
+                sqlsrv_conn.commit()
+
         # ----------------------------------------------------------------------
         # FASE 2: TRANSFORMAÇÃO E CARGA (Loop de Viagens)
         # ----------------------------------------------------------------------
@@ -370,96 +635,543 @@ def main():
         print("Iniciando Transformação e Carga (Factos)...")
         linhas_processadas = 0
 
-        for idx, r_mysql in enumerate(rows_mysql, start=1):
-
-            # B. TRANSFORMAÇÃO E OBTENÇÃO DE IDs (DIMENSÕES)
-
-            # 1) Condutor (PK Explícita)
-            data_condutor = {
-                "idcondutor": r_mysql["condutor_idcondutor"],  # ID de Origem (usado aqui como dado para lookup)
-                "nome": r_mysql["nomecondutor"],
-                "idade": int(r_mysql["idade"]),
-                "certificacao": r_mysql["certificacao"],
-            }
-            id_condutor = get_or_create_dim_condutor(sqlsrv_cur, data_condutor)
-
-            # 2) Empresa Barco (PK Explícita - Pai do Snowflake)
-            data_empresa = {
-                "idempresabarco": r_mysql["empresabarco_idempresabarco"],  # ID de Origem
-                "nomeempresabarco": r_mysql["nomeempresabarco"],
-                "paisempresabarco": r_mysql["paisempresabarco"],
-            }
-            id_empresa_barco = get_or_create_dim_empresabarco(sqlsrv_cur, data_empresa)
-
-            # 3) Barco (PK Explícita - Filho do Snowflake)
-            data_barco = {
-                "idbarco": r_mysql["barco_idbarco"],  # ID de Origem
-                "nomebarco": r_mysql["nomebarco"],
-                "tamanho": r_mysql["tamanho"],
-                "tipobarco": r_mysql["tipobarco"],
-                "capacidadeteu": int(r_mysql["capacidadeteu"]),
-                "empresabarco_idempresabarco": id_empresa_barco  # FK SUBSTITUTA OBTIDA NO PASSO 2
-            }
-            id_barco = get_or_create_dim_barco(sqlsrv_cur, data_barco)
-
-            # 4) Localização (Origem - PK Explícita)
-            data_localizacao = {
-                "idlocalizacao": r_mysql["id_localizacao_origem"],  # ID de Origem
-                "pais": r_mysql["pais_origem"],
-                "cidade": r_mysql["cidade_origem"],
-            }
-            id_localizacao = get_or_create_dim_localizacao(sqlsrv_cur, data_localizacao)
-
-            # 5) Tipo Viagem (PK Explícita)
-            id_tipo_viagem = get_or_create_dim_tipo_viagem(sqlsrv_cur, r_mysql["tipoviagem"])
-
-            # 6) Tempo (PK Explícita)
-            data_chegada = r_mysql["data_chegada"]
-            id_tempo = get_or_create_dim_tempo(sqlsrv_cur, data_chegada)
-
-            # C. CÁLCULOS E TRANSFORMAÇÕES PARA FACTOS
-
-            duracao = (data_chegada - r_mysql["data_partida"]).days
-            id_classe_duracao = get_or_create_dim_classeduracao(sqlsrv_cur, duracao)
-
-            taxa_eur = float(r_mysql['totaltaxas_eur'])
-
-            # D. INSERÇÃO NA TABELA DE FACTOS (viagens)
-            # OMITIMOS a PK 'idviagens' (IDENTITY)
-            sqlsrv_cur.execute("""
-                               INSERT INTO viagens (idviagens, duracaoviagem, totaltaxas, numerocontentores,
-                                                    pesototalcontentores, teutotal, classeduracao_idclasseduracao,
-                                                    localizacao_idlocalizacao, tipo_viagem_idtipoviagem,
-                                                    condutor_idcondutor, barco_idbarco, tempo_idtempo)
-                               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?);
-                               """, (
-                                   (linhas_processadas + 1),  # Chave Natural da Viagem
-                                   duracao,  # Facto
-                                   taxa_eur,  # Facto (EUR)
-                                   int(r_mysql['num_contentores_total']),  # Facto
-                                   int(r_mysql['peso_total_kg']),  # Facto
-                                   int(r_mysql['teu_total_calc']),  # Facto
-                                   id_classe_duracao,  # FK Substituta
-                                   id_localizacao,  # FK Substituta
-                                   id_tipo_viagem,  # FK Substituta
-                                   id_condutor,  # FK Substituta
-                                   id_barco,  # FK Substituta
-                                   id_tempo,  # FK Substituta
-                               ))
-
-            linhas_processadas += 1
-            if linhas_processadas % 100 == 0:
+        if ETL_CARGA_CONJUNTOS:
+            linhas_processadas = carrega_factos_conjuntos(sqlsrv_conn, sqlsrv_cur, rows_mysql)
+        else:
+            for idx, r_mysql in enumerate(rows_mysql, start=1):
+
+                with METRICAS.etapa("dimensoes"):
+                    # B. TRANSFORMAÇÃO E OBTENÇÃO DE IDs (DIMENSÕES)
+
+                    # 1) Condutor (PK Explícita)
+                    data_condutor = {
+                        "idcondutor": r_mysql["condutor_idcondutor"],  # ID de Origem (usado aqui como dado para lookup)
+                        "nome": r_mysql["nomecondutor"],
+                        "idade": int(r_mysql["idade"]),
+                        "certificacao": r_mysql["certificacao"],
+                    }
+                    id_condutor = get_or_create_dim_condutor(sqlsrv_cur, data_condutor)
+
+                    # 2) Empresa Barco (PK Explícita - Pai do Snowflake)
+                    data_empresa = {
+                        "idempresabarco": r_mysql["empresabarco_idempresabarco"],  # ID de Origem
+                        "nomeempresabarco": r_mysql["nomeempresabarco"],
+                        "paisempresabarco": r_mysql["paisempresabarco"],
+                    }
+                    id_empresa_barco = get_or_create_dim_empresabarco(sqlsrv_cur, data_empresa)
+
+                    # 3) Barco (PK Explícita - Filho do Snowflake)
+                    data_barco = {
+                        "idbarco": r_mysql["barco_idbarco"],  # ID de Origem
+                        "nomebarco": r_mysql["nomebarco"],
+                        "tamanho": r_mysql["tamanho"],
+                        "tipobarco": r_mysql["tipobarco"],
+                        "capacidadeteu": int(r_mysql["capacidadeteu"]),
+                        "empresabarco_idempresabarco": id_empresa_barco  # FK SUBSTITUTA OBTIDA NO PASSO 2
+                    }
+                    id_barco = get_or_create_dim_barco(sqlsrv_cur, data_barco)
+
+                    # 4) Localização (Origem - PK Explícita)
+                    data_localizacao = {
+                        "idlocalizacao": r_mysql["id_localizacao_origem"],  # ID de Origem
+                        "pais": r_mysql["pais_origem"],
+                        "cidade": r_mysql["cidade_origem"],
+                    }
+                    id_localizacao = get_or_create_dim_localizacao(sqlsrv_cur, data_localizacao)
+
+                    # 5) Tipo Viagem (PK Explícita)
+                    id_tipo_viagem = get_or_create_dim_tipo_viagem(sqlsrv_cur, r_mysql["tipoviagem"])
+
+                    # 6) Tempo (PK Explícita)
+                    data_chegada = r_mysql["data_chegada"]
+                    if ETL_TEMPO_CALENDARIO:
+                        id_tempo = chave_tempo(data_chegada)  # SK determinística (yyyymmdd), sem lookup
+                    else:
+                        id_tempo = get_or_create_dim_tempo(sqlsrv_cur, data_chegada)
+
+                    # C. CÁLCULOS E TRANSFORMAÇÕES PARA FACTOS
+
+                    duracao = (data_chegada - r_mysql["data_partida"]).days
+                    id_classe_duracao = get_or_create_dim_classeduracao(sqlsrv_cur, duracao)
+
+                # D. INSERÇÃO NA TABELA DE FACTOS (viagens)
+                # OMITIMOS a PK 'idviagens' (IDENTITY)
+                with METRICAS.etapa("carga"):
+                    sqlsrv_cur.execute(SQL_INSERT_FACTO_VIAGEM, valores_facto_viagem(
+                        (linhas_processadas + 1),  # Chave Natural da Viagem
+                        r_mysql, duracao,
+                        (id_classe_duracao, id_localizacao, id_tipo_viagem, id_condutor, id_barco, id_tempo),
+                    ))
+
+                linhas_processadas += 1
+                if linhas_processadas % 100 == 0:
+                    with METRICAS.etapa("carga"):
+                        aplica_deltas(sqlsrv_cur)
+                        sqlsrv_conn.commit()
+                    print(f"... {linhas_processadas} registos de Factos processados")
+                    METRICAS.progresso(linhas_processadas)
+
+            METRICAS.conta("dimensoes", linhas=linhas_processadas)
+            METRICAS.conta("carga", linhas=linhas_processadas)
+
+        aplica_deltas(sqlsrv_cur)
+        sqlsrv_conn.commit()
+        print(f"ETL concluído. Total de Viagens Carregadas: {linhas_processadas}")
+        ESTATISTICAS.relatorio()
+        METRICAS.resumo(modo="sequencial", factos=linhas_processadas)
+    finally:
+        if mysql_conn and mysql_conn.is_connected():
+            mysql_conn.close()
+        if sqlsrv_conn:
+            sqlsrv_conn.close()
+
+
+# ---------------------------------------------------------
+# RESOLUÇÃO DE MEMBROS DAS DIMENSÕES (LINHA A LINHA OU POR CONJUNTOS)
+# ---------------------------------------------------------
+# Os membros de cada dimensão são passados como {chave natural: linha de staging},
+# com as colunas de DIMENSOES_DW[dimensão] (naturais + atributos). No barco, a última
+# coluna é a chave natural (nome, pais) da empresa, trocada pela SK depois de resolvida.
+
+DIMENSOES_DW = {
+    "tempo": define_dimensao("tempo", "idtempo", ["data_completa"], derivadas=DERIVADAS_TEMPO),
+    "localizacao": define_dimensao("localizacao", "idlocalizacao", ["pais", "cidade"]),
+    "condutor": define_dimensao("condutor", "idcondutor", ["nome", "certificacao"], ["idade"], historico=True),
+    "tipo_viagem": define_dimensao("tipo_viagem", "idtipoviagem", ["tipo"]),
+    "classeduracao": define_dimensao("classeduracao", "idclasseduracao", ["duracao"]),
+    "empresabarco": define_dimensao("empresabarco", "idempresa_barco", ["nome", "pais"]),
+    "barco": define_dimensao("barco", "idbarco", ["nome", "tamanho"],
+                             ["tipo", "capacidade", "empresabarco_idempresa_barco"], historico=True),
+}
+
+
+# Uma duração (em dias) de cada classe, para o get_or_create_dim_classeduracao
+DURACAO_REPRESENTATIVA = {mapeia_duracao_para_texto(d): d for d in (0, 8, 16, 31, 61)}
+
+# Nº de linhas por lote na carga por conjuntos
+LOTE_CONJUNTOS = int(os.getenv("ETL_LOTE_CONJUNTOS", "5000"))
+
+
+def membros_das_linhas(rows_mysql):
+    """Membros distintos de cada dimensão num lote de linhas extraídas do MySQL."""
+    membros = {dimensao: {} for dimensao in DIMENSOES_DW}
+    for r_mysql in rows_mysql:
+        _, naturais = chaves_naturais_viagem(r_mysql)
+        empresa = (r_mysql["nomeempresabarco"], r_mysql["paisempresabarco"])
+        membros["condutor"].setdefault(naturais["condutor"], (*naturais["condutor"], int(r_mysql["idade"])))
+        membros["empresabarco"].setdefault(empresa, empresa)
+        membros["barco"].setdefault(naturais["barco"], (*naturais["barco"], r_mysql["tipobarco"],
+                                                        int(r_mysql["capacidadeteu"]), empresa))
+        membros["localizacao"].setdefault(naturais["localizacao"], naturais["localizacao"])
+        for dimensao in ("tipo_viagem", "tempo", "classeduracao"):
+            membros[dimensao].setdefault(naturais[dimensao], (naturais[dimensao],))
+    return membros
+
+
+def resolve_membros(sqlsrv_cur, membros, chaves=None, hashes=None):
+    """
+    Devolve {dimensão: {chave natural: SK}} para os membros dados.
+    Com ETL_CARGA_CONJUNTOS usa staging + MERGE (um lote de comandos por dimensão) e
+    chaves/hashes são a cache da execução ({dimensão: {chave natural: SK}} e, nas dimensões
+    versionadas, {dimensão: {chave natural: hash}}), atualizadas no local: só os membros
+    novos ou com atributos alterados vão ao SQL Server. Caso contrário, os get_or_create
+    por membro. Com ETL_TEMPO_CALENDARIO a dimensão tempo não é resolvida (a SK é
+    calculada a partir da data).
+    """
+    if ETL_TEMPO_CALENDARIO:
+        membros = dict(membros, tempo={})
+
+    if ETL_CARGA_CONJUNTOS:
+        chaves = {} if chaves is None else chaves
+        hashes = {} if hashes is None else hashes
+        for nome in ("tempo", "localizacao", "condutor", "tipo_viagem", "classeduracao", "empresabarco"):
+            resolve_dimensao_em_cache(sqlsrv_cur, DIMENSOES_DW[nome], membros[nome], chaves.setdefault(nome, {}),
+                                      hashes.setdefault(nome, {}))
+        barcos = {natural: (*m[:-1], chaves["empresabarco"][m[-1]]) for natural, m in membros["barco"].items()}
+        resolve_dimensao_em_cache(sqlsrv_cur, DIMENSOES_DW["barco"], barcos, chaves.setdefault("barco", {}),
+                                  hashes.setdefault("barco", {}))
+        return chaves
+
+    chaves = {dimensao: {} for dimensao in DIMENSOES_DW}
+    for natural, (nome, certificacao, idade) in membros["condutor"].items():
+        chaves["condutor"][natural] = get_or_create_dim_condutor(
+            sqlsrv_cur, {"nome": nome, "idade": idade, "certificacao": certificacao})
+    for natural, (nome, pais) in membros["empresabarco"].items():
+        chaves["empresabarco"][natural] = get_or_create_dim_empresabarco(
+            sqlsrv_cur, {"nomeempresabarco": nome, "paisempresabarco": pais})
+    for natural, (nome, tamanho, tipo, capacidade, empresa) in membros["barco"].items():
+        chaves["barco"][natural] = get_or_create_dim_barco(sqlsrv_cur, {
+            "nomebarco": nome, "tamanho": tamanho, "tipobarco": tipo, "capacidadeteu": capacidade,
+            "empresabarco_idempresabarco": chaves["empresabarco"][empresa]})
+    for natural, (pais, cidade) in membros["localizacao"].items():
+        chaves["localizacao"][natural] = get_or_create_dim_localizacao(sqlsrv_cur, {"pais": pais, "cidade": cidade})
+    for natural in membros["tipo_viagem"]:
+        chaves["tipo_viagem"][natural] = get_or_create_dim_tipo_viagem(sqlsrv_cur, natural)
+    for natural in membros["tempo"]:
+        chaves["tempo"][natural] = get_or_create_dim_tempo(sqlsrv_cur, natural)
+    for natural in membros["classeduracao"]:
+        chaves["classeduracao"][natural] = get_or_create_dim_classeduracao(sqlsrv_cur,
+                                                                          DURACAO_REPRESENTATIVA[natural])
+    return chaves
+
+
+def ids_dimensoes_viagem(chaves, r_mysql):
+    """Devolve (duracao, SKs pela ordem de valores_facto_viagem) de uma linha, a partir das chaves resolvidas."""
+    duracao, naturais = chaves_naturais_viagem(r_mysql)
+    id_tempo = chave_tempo(naturais["tempo"]) if ETL_TEMPO_CALENDARIO else chaves["tempo"][naturais["tempo"]]
+    return duracao, tuple(chaves[dimensao][naturais[dimensao]] for dimensao in
+                          ("classeduracao", "localizacao", "tipo_viagem", "condutor", "barco")) + (id_tempo,)
+
+
+def carrega_factos_conjuntos(sqlsrv_conn, sqlsrv_cur, rows_mysql, primeiro_idviagens=1, commit_por_lote=True,
+                             tabela="viagens", chaves=None):
+    """
+    Carga por conjuntos: por cada lote de LOTE_CONJUNTOS linhas resolve as dimensões com
+    resolve_membros() e insere os factos num só executemany. Devolve o nº de factos inseridos.
+    Os idviagens começam em primeiro_idviagens; com commit_por_lote=False o commit fica
+    a cargo de quem chama (ex.: uma partição inteira numa só transação). Os factos vão para
+    tabela (por omissão viagens; a tabela de carga na troca de partições). Com chaves já
+    resolvidas (workers do modo particionado) não se resolvem dimensões: só se inserem factos.
+    """
+    sqlsrv_cur.fast_executemany = True
+    sql_insert = SQL_INSERT_FACTO_VIAGEM if tabela == "viagens" else sql_insert_facto_viagem(tabela)
+    resolver_membros = chaves is None
+    # Cache de chaves (e de hashes das dimensões versionadas) partilhada por todos os lotes
+    chaves, hashes = chaves if chaves is not None else {}, {}
+    linhas_processadas = 0
+    for inicio in range(0, len(rows_mysql), LOTE_CONJUNTOS):
+        lote = rows_mysql[inicio:inicio + LOTE_CONJUNTOS]
+        if resolver_membros:
+            with METRICAS.etapa("dimensoes"):
+                chaves = resolve_membros(sqlsrv_cur, membros_das_linhas(lote), chaves, hashes)
+            METRICAS.conta("dimensoes", linhas=len(lote))
+
+        with METRICAS.etapa("transformacao"):
+            valores = []
+            for r_mysql in lote:
+                duracao, ids_dimensoes = ids_dimensoes_viagem(chaves, r_mysql)
+                valores.append(valores_facto_viagem(primeiro_idviagens + linhas_processadas + len(valores),
+                                                    r_mysql, duracao, ids_dimensoes))
+        METRICAS.conta("transformacao", linhas=len(valores))
+
+        with METRICAS.etapa("carga"):
+            sqlsrv_cur.executemany(sql_insert, valores)
+            aplica_deltas(sqlsrv_cur)
+            if commit_por_lote:
+                sqlsrv_conn.commit()
+        METRICAS.conta("carga", linhas=len(valores))
+        linhas_processadas += len(valores)
+        print(f"... {linhas_processadas} registos de Factos processados")
+        METRICAS.progresso(linhas_processadas)
+    return linhas_processadas
+
+
+# ---------------------------------------------------------
+# MODO PARTICIONADO (N processos, uma partição por mês de datachegada)
+# ---------------------------------------------------------
+
+def chaves_naturais_viagem(r_mysql):
+    """Devolve (duracao, {dimensão: chave natural}) de uma linha extraída do MySQL."""
+    duracao = (r_mysql["data_chegada"] - r_mysql["data_partida"]).days
+    return duracao, {
+        "classeduracao": mapeia_duracao_para_texto(duracao),
+        "localizacao": (r_mysql["pais_origem"], r_mysql["cidade_origem"]),
+        "tipo_viagem": r_mysql["tipoviagem"],
+        "condutor": (r_mysql["nomecondutor"], r_mysql["certificacao"]),
+        "barco": (r_mysql["nomebarco"], r_mysql["tamanho"]),
+        "tempo": r_mysql["data_chegada"],
+    }
+
+
+def resolve_chaves_dimensoes(mysql_cur, sqlsrv_cur):
+    """
+    Lê do MySQL os membros distintos de cada dimensão e resolve as SKs de todos
+    (resolve_membros). Corre só no coordenador (uma ligação), pelo que a
+    geração de IDs (MAX + 1) não tem concorrência.
+    Devolve {dimensão: {chave natural: SK}}, com as chaves de chaves_naturais_viagem().
+    """
+
+    def query_membros(dimensao):
+        query = QUERIES_MEMBROS_DIMENSOES[dimensao].format(from_=FROM_VIAGENS_DESTINO,
+                                                          where=_where_viagens(False))
+        mysql_cur.execute(query, (CIDADE_DESTINO, PAIS_DESTINO))
+        return mysql_cur.fetchall()
+
+    membros = {dimensao: {} for dimensao in QUERIES_MEMBROS_DIMENSOES}
+
+    for m in query_membros("condutor"):
+        membros["condutor"][(m["nome"], m["certificacao"])] = (m["nome"], m["certificacao"], int(m["idade"]))
+    for m in query_membros("empresabarco"):
+        chave = (m["nomeempresabarco"], m["paisempresabarco"])
+        membros["empresabarco"][chave] = chave
+    for m in query_membros("barco"):
+        membros["barco"][(m["nomebarco"], m["tamanho"])] = (
+            m["nomebarco"], m["tamanho"], m["tipobarco"], int(m["capacidadeteu"]),
+            (m["nomeempresabarco"], m["paisempresabarco"]))
+    for m in query_membros("localizacao"):
+        membros["localizacao"][(m["pais"], m["cidade"])] = (m["pais"], m["cidade"])
+    for m in query_membros("tipo_viagem"):
+        membros["tipo_viagem"][m["tipoviagem"]] = (m["tipoviagem"],)
+    for m in query_membros("tempo"):
+        membros["tempo"][m["datachegada"]] = (m["datachegada"],)
+    for m in query_membros("classeduracao"):
+        nome_classe = mapeia_duracao_para_texto(m["duracao"])
+        membros["classeduracao"].setdefault(nome_classe, (nome_classe,))
+
+    return resolve_membros(sqlsrv_cur, membros)
+
+
+# Chaves das dimensões, entregues a cada worker no arranque do processo
+_chaves_worker = None
+
+
+def _inicializa_worker(chaves):
+    global _chaves_worker
+    _chaves_worker = chaves
+
+
+def carrega_particao_mes(particao):
+    """
+    Worker: extrai do MySQL as viagens de um mês e insere os factos, com ligações próprias.
+    Os idviagens são reservados depois da extração (reserva_ids), um por viagem extraída.
+    Com ETL_CARGA_CONJUNTOS o mês é inserido por lotes numa só transação (um erro anula a
+    partição inteira); sem ela, linha a linha, com os erros registados por viagem.
+    """
+    resultado = novo_resultado(particao)
+    mysql_conn = get_mysql_conn()
+    sqlsrv_conn = get_mssql_conn()
+
+    try:
+        mysql_cur = mysql_conn.cursor(dictionary=True)
+        sqlsrv_cur = sqlsrv_conn.cursor()
+
+        with METRICAS.etapa("extracao"):
+            mysql_cur.execute(constroi_query_extracao(por_intervalo=True),
+                              parametros_extracao(particao["inicio"], particao["fim"]))
+            rows_mysql = mysql_cur.fetchall()
+        METRICAS.conta("extracao", linhas=len(rows_mysql), round_trips=1)
+
+        id_viagens = reserva_ids(sqlsrv_conn, sqlsrv_cur, "viagens", len(rows_mysql))
+        if ETL_CARGA_CONJUNTOS:
+            resultado["linhas"] = carrega_factos_conjuntos(sqlsrv_conn, sqlsrv_cur, rows_mysql,
+                                                           primeiro_idviagens=id_viagens, commit_por_lote=False,
+                                                           chaves=_chaves_worker)
+            sqlsrv_conn.commit()
+        else:
+            with METRICAS.etapa("carga"):
+                for r_mysql in rows_mysql:
+                    try:
+                        duracao, ids_dimensoes = ids_dimensoes_viagem(_chaves_worker, r_mysql)
+                        sqlsrv_cur.execute(SQL_INSERT_FACTO_VIAGEM,
+                                           valores_facto_viagem(id_viagens, r_mysql, duracao, ids_dimensoes))
+                    except Exception as e:
+                        resultado["erros"].append({"particao": particao["nome"], "registo": r_mysql["idviagem"],
+                                                   "erro": repr(e)})
+                        continue
+                    finally:
+                        id_viagens += 1
+
+                    resultado["linhas"] += 1
+                    if resultado["linhas"] % 100 == 0:
+                        aplica_deltas(sqlsrv_cur)
+                        sqlsrv_conn.commit()
+
+                aplica_deltas(sqlsrv_cur)
                 sqlsrv_conn.commit()
-                print(f"... {linhas_processadas} registos de Factos processados")
+            METRICAS.conta("carga", linhas=resultado["linhas"], erros=len(resultado["erros"]))
+        # As chaves das dimensões vêm todas da cache entregue pelo coordenador
+        METRICAS.conta("dimensoes", acertos_cache=len(rows_mysql))
+        resultado["sql"] = ESTATISTICAS.exporta(limpar=True)
+        resultado["metricas"] = METRICAS.exporta(limpar=True)
+        return resultado
+    finally:
+        if mysql_conn and mysql_conn.is_connected():
+            mysql_conn.close()
+        if sqlsrv_conn:
+            sqlsrv_conn.close()
+
+
+def main_paralelo(n_workers=ETL_WORKERS):
+    """
+    Coordenador do modo particionado: conta as viagens por mês, resolve todas as chaves das
+    dimensões numa única ligação, inicia o contador de idviagens (cada worker reserva os seus)
+    e distribui os meses por n_workers processos (cada um com a sua ligação ao MySQL e ao
+    SQL Server).
+    """
+    verifica_requisitos(ETL_CARGA_CONJUNTOS)
+    print("1 - Ligação ao MySQL (Origem)")
+    mysql_conn = get_mysql_conn()
+    print("2 - Ligação ao MsSQL (Data Warehouse)")
+    sqlsrv_conn = get_mssql_conn()
 
+    try:
+        mysql_cur = mysql_conn.cursor(dictionary=True)
+        sqlsrv_cur = sqlsrv_conn.cursor()
+
+        with METRICAS.etapa("extracao"):
+            relatorio_indices_extracao(mysql_cur)
+
+            mysql_cur.execute(constroi_query_particoes(), (CIDADE_DESTINO, PAIS_DESTINO))
+            contagens = {(r["ano"], r["mes"]): r["n"] for r in mysql_cur.fetchall()}
+        METRICAS.conta("extracao", round_trips=2)
+        print(f"Viagens a extrair: {sum(contagens.values())} em {len(contagens)} meses")
+
+        print("Resolução das chaves das dimensões (coordenador)...")
+        with METRICAS.etapa("dimensoes"):
+            chaves = resolve_chaves_dimensoes(mysql_cur, sqlsrv_cur)
+            particoes = particiona_meses(contagens.keys())
+            if ETL_TEMPO_CALENDARIO and particoes:
+                prepara_calendario(sqlsrv_cur, particoes[0]["inicio"], particoes[-1]["fim"] - timedelta(days=1))
+            sqlsrv_conn.commit()
+        METRICAS.conta("dimensoes", round_trips=len(QUERIES_MEMBROS_DIMENSOES))  # leitura dos membros no MySQL
+
+        # Intervalos de idviagens disjuntos: reservados por cada worker depois de extrair o mês
+        inicia_reserva_ids(sqlsrv_cur, "viagens", "idviagens")
         sqlsrv_conn.commit()
-        print(f"ETL concluído. Total de Viagens Carregadas: {linhas_processadas}")
     finally:
         if mysql_conn and mysql_conn.is_connected():
             mysql_conn.close()
         if sqlsrv_conn:
             sqlsrv_conn.close()
 
+    print(f"Iniciando Carga (Factos) em {n_workers} processos...")
+    resumo = executa_particoes(carrega_particao_mes, particoes, n_workers,
+                               inicializador=_inicializa_worker, initargs=(chaves,))
+    imprime_resumo(resumo)
+    ESTATISTICAS.relatorio()
+    METRICAS.resumo(modo="particionado", workers=n_workers, factos=resumo["linhas"])
+
+
+# ---------------------------------------------------------
+# ZONA DE ATERRAGEM (extração e carga em separado, via Parquet)
+# ---------------------------------------------------------
+
+ORIGEM_ZONA = "mysql"
+
+# Métricas vindas do MySQL como DECIMAL, guardadas como float no Parquet
+COLUNAS_DECIMAIS = ["totaltaxas_eur", "num_contentores_total", "peso_total_kg", "teu_total_calc"]
+
+
+def transforma_para_zona(rows_mysql):
+    """DataFrame com as linhas extraídas e os campos derivados (duracao, classe_duracao)."""
+    df = pd.DataFrame(rows_mysql)
+    df[COLUNAS_DECIMAIS] = df[COLUNAS_DECIMAIS].astype(float)
+    # As datas ficam como vieram do MySQL (date); a diferença é calculada em datetime64
+    df["duracao"] = (pd.to_datetime(df["data_chegada"]) - pd.to_datetime(df["data_partida"])).dt.days
+    df["classe_duracao"] = df["duracao"].map(mapeia_duracao_para_texto)
+    return df
+
+
+def extrai_para_zona():
+    """
+    Fase de extração: lê do MySQL as viagens mês a mês e escreve-as na zona de aterragem
+    (substituindo a extração anterior). Não usa o SQL Server.
+    """
+    print("1 - Ligação ao MySQL (Origem)")
+    mysql_conn = get_mysql_conn()
+    try:
+        mysql_cur = mysql_conn.cursor(dictionary=True)
+        with METRICAS.etapa("extracao"):
+            relatorio_indices_extracao(mysql_cur)
+            mysql_cur.execute(constroi_query_particoes(), (CIDADE_DESTINO, PAIS_DESTINO))
+            meses = [(r["ano"], r["mes"]) for r in mysql_cur.fetchall()]
+        METRICAS.conta("extracao", round_trips=2)
+
+        limpa_origem(ORIGEM_ZONA)
+        escritas = 0
+        for particao in particiona_meses(meses):
+            with METRICAS.etapa("extracao"):
+                mysql_cur.execute(constroi_query_extracao(por_intervalo=True),
+                                  parametros_extracao(particao["inicio"], particao["fim"]))
+                rows_mysql = mysql_cur.fetchall()
+            METRICAS.conta("extracao", linhas=len(rows_mysql), round_trips=1)
+            if not rows_mysql:
+                continue
+
+            with METRICAS.etapa("transformacao"):
+                escritas += escreve_particoes(transforma_para_zona(rows_mysql), ORIGEM_ZONA, particao["nome"])
+            METRICAS.conta("transformacao", linhas=len(rows_mysql))
+            print(f"... {particao['nome']}: {len(rows_mysql)} viagens escritas na zona de aterragem")
+
+        print(f"Extração concluída. Total de Viagens na zona de aterragem: {escritas}")
+        METRICAS.resumo(modo="extracao", viagens=escritas)
+    finally:
+        if mysql_conn and mysql_conn.is_connected():
+            mysql_conn.close()
+
+
+def carrega_da_zona():
+    """
+    Fase de carga: carrega no DW as partições da zona de aterragem ainda não carregadas
+    (carga por conjuntos, uma transação por partição). Não usa o MySQL.
+    Com ETL_TROCA_PARTICOES, cada mês é carregado em TABELA_CARGA e entra em viagens por
+    troca de partição (substitui o mês; requer desenho_fisico.aplica_desenho e o calendário).
+    """
+    verifica_requisitos(ETL_CARGA_CONJUNTOS)
+    if ETL_TROCA_PARTICOES and not ETL_TEMPO_CALENDARIO:
+        raise ValueError("ETL_TROCA_PARTICOES requer ETL_TEMPO_CALENDARIO=1 (partições por chave yyyymmdd)")
+    print("2 - Ligação ao MsSQL (Data Warehouse)")
+    sqlsrv_conn = get_mssql_conn()
+    try:
+        sqlsrv_cur = sqlsrv_conn.cursor()
+        if ETL_TEMPO_CALENDARIO:
+            with METRICAS.etapa("dimensoes"):
+                prepara_calendario(sqlsrv_cur)
+                sqlsrv_conn.commit()
+        linhas_processadas = 0
+        for particao in particoes(ORIGEM_ZONA):
+            if particao_carregada(particao, MSSQL_DB):
+                print(f"... {particao['nome']}: já carregada (ignorada)")
+                continue
+
+            with METRICAS.etapa("extracao"):
+                rows_mysql = le_particao(particao).to_dict("records")
+            METRICAS.conta("extracao", linhas=len(rows_mysql))
+
+            if ETL_TEMPO_CALENDARIO:
+                with METRICAS.etapa("dimensoes"):
+                    garante_datas(sqlsrv_cur, rows_mysql[0]["data_chegada"], rows_mysql[-1]["data_chegada"])
+            try:
+                id_tempo_mes = particao["ano"] * 10000 + particao["mes"] * 100 + 1
+                if ETL_TROCA_PARTICOES:
+                    cria_tabela_troca(sqlsrv_cur, TABELA_CARGA, id_tempo_mes)
+                inseridas = carrega_factos_conjuntos(sqlsrv_conn, sqlsrv_cur, rows_mysql,
+                                                     primeiro_idviagens=get_next_id(sqlsrv_cur, "viagens",
+                                                                                    "idviagens"),
+                                                     commit_por_lote=False,
+                                                     tabela=TABELA_CARGA if ETL_TROCA_PARTICOES else "viagens")
+                if ETL_TROCA_PARTICOES:
+                    with METRICAS.etapa("carga"):
+                        substituidas, descartadas = troca_particao_mes(sqlsrv_cur, TABELA_CARGA, id_tempo_mes)
+                        sqlsrv_cur.execute(f"DROP TABLE {TABELA_CARGA};")
+                    if substituidas:
+                        print(f"... {particao['nome']}: {substituidas} factos anteriores do mês substituídos")
+                    if descartadas:
+                        print(f"... {particao['nome']}: {descartadas} factos descartados "
+                              f"(viagem_id_origem já carregada)")
+                        inseridas -= descartadas
+                sqlsrv_conn.commit()
+            except Exception:
+                sqlsrv_conn.rollback()
+                raise
+            marca_carregada(particao, MSSQL_DB, inseridas)
+            linhas_processadas += inseridas
+            print(f"... {particao['nome']}: {inseridas} factos carregados (total {linhas_processadas})")
+
+        print(f"Carga concluída. Total de Viagens Carregadas: {linhas_processadas}")
+        ESTATISTICAS.relatorio()
+        METRICAS.resumo(modo="carga", factos=linhas_processadas)
+    finally:
+        if sqlsrv_conn:
+            sqlsrv_conn.close()
+
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    if ETL_FASE == FASE_EXTRACAO:
+        extrai_para_zona()
+    elif ETL_FASE == FASE_CARGA:
+        carrega_da_zona()
+    elif ETL_WORKERS > 1:
+        main_paralelo()
+    else:
+        main()
\ No newline at end of file
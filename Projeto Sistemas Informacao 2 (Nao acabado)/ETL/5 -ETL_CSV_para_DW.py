@@ -1,14 +1,30 @@
 import os
 import sys
+import pandas as pd
 import pyodbc
-import csv
-from datetime import datetime
+
+from acesso_bd import ESTATISTICAS, PoolLigacoes
+from agregados import ETL_AGREGADOS, aplica_deltas, clausula_output_delta, prepara_ligacao
+from carga_conjuntos import DERIVADAS_TEMPO, ETL_CARGA_CONJUNTOS, define_dimensao, resolve_dimensao_em_cache
+from dimensao_historica import ETL_SCD2, prepara_historico, verifica_requisitos, versao_atual
+from dimensao_tempo import ETL_TEMPO_CALENDARIO, chave_tempo_vetorizada, garante_datas, prepara_calendario
+from etl_paralelo import (ETL_WORKERS, executa_particoes, imprime_resumo, le_linhas_bloco, novo_resultado,
+                          particiona_ficheiro)
+from instrumentacao import METRICAS
+from manifesto import (ESTADO_CARREGADO, ESTADO_FALHOU, conclui_ficheiro, descobre_ficheiros,
+                       garante_chave_origem_viagens, garante_manifesto, hash_e_linhas, regista_ficheiro)
+from quarentena import Quarentena, caminho_quarentena, rejeitadas_da_carga, rejeitadas_do_bloco
+from transformacao_csv import (COLUNAS_DIMENSOES, chave_natural, le_bloco_de_linhas, le_csv_em_blocos,
+                               mapeia_chaves, membros_dimensoes, transforma_bloco)
+from zona_aterragem import (ETL_FASE, FASE_CARGA, FASE_EXTRACAO, escreve_particoes, le_particao, limpa_origem,
+                            marca_carregada, particao_carregada, particoes)
 
 # ---------------------------------------------------------
 # 1. Configuração
 # ---------------------------------------------------------
 
 CSV_PATH = os.getenv("FP7", r"dados_atualizado.csv")  # Nome do ficheiro CSV
+PASTA_CSV = os.getenv("ETL_PASTA_CSV", "")  # Modo pasta: carrega todos os CSV novos desta pasta
 MSSQL_HOST = os.getenv("MSSQL_HOST", "127.0.0.1")
 MSSQL_PORT = int(os.getenv("MSSQL_PORT", "1433"))
 MSSQL_USER = os.getenv("MSSQL_USER", "sa")
@@ -21,14 +37,28 @@ MSSQL_DRIVER = os.getenv("MSSQL_DRIVER", "ODBC Driver 18 for SQL Server")
 # 2. Ligações
 # ---------------------------------------------------------
 
-def get_mssql_conn():
-    """Liga ao SQL Server via pyodbc (schema padrão: dbo)."""
+def _liga_mssql():
+    """Abre uma nova ligação ao SQL Server via pyodbc (schema padrão: dbo)."""
     conn_str = (
         f"DRIVER={{{MSSQL_DRIVER}}};SERVER={MSSQL_HOST},{MSSQL_PORT};"
         f"DATABASE={MSSQL_DB};UID={MSSQL_USER};PWD={MSSQL_PWD};"
-        f"TrustServerCertificate=Yes;"
+        f"TrustServerCertificate=Yes;MARS_Connection=Yes;"  # MARS: vários cursores preparados ativos
     )
-    return pyodbc.connect(conn_str)
+    conn = pyodbc.connect(conn_str)
+    if ETL_AGREGADOS:
+        prepara_ligacao(conn)
+    if ETL_SCD2:
+        prepara_historico(conn, DIMENSOES_DW.values())
+    return conn
+
+
+# Pool do processo atual (cada worker cria as suas ligações na primeira utilização)
+POOL_MSSQL = PoolLigacoes(_liga_mssql)
+
+
+def get_mssql_conn():
+    """Ligação ao SQL Server obtida do pool; close() devolve-a ao pool."""
+    return POOL_MSSQL.obtem()
 
 
 # ---------------------------------------------------------
@@ -124,23 +154,20 @@ def get_or_create_dim_condutor(cur, condutor_data):
     certificacao = condutor_data["certificacao"]
 
     # 1. Procura pela Chave Natural Composta (Nome + Certificação)
-    cur.execute("SELECT idcondutor FROM condutor WHERE nome = ? AND certificacao = ?", (nome, certificacao))
+    cur.execute(f"SELECT idcondutor FROM condutor WHERE nome = ? AND certificacao = ?{versao_atual()}",
+                (nome, certificacao))
     row = cur.fetchone()
     if row: return row[0]
 
-    # 2. Insere, omitindo a PK (idcondutor). Usamos um ID de origem fictício.
+    # 2. Insere, omitindo a PK (idcondutor).
     try:
-        id_origem_ficticio = f"CSV_{nome.replace(' ', '_')}_{certificacao}"
-
         cur.execute("""
                     INSERT INTO condutor (nome, idade, certificacao)
-                    VALUES (?, ?, ?, ?, ?);
+                    VALUES (?, ?, ?);
                     """, (
                         nome,
                         condutor_data["idade"],
                         certificacao,
-                        condutor_data["sexo"],
-                        id_origem_ficticio
                     ))
         # 3. Obtém o novo ID gerado
         cur.execute("SELECT SCOPE_IDENTITY();")
@@ -150,7 +177,8 @@ def get_or_create_dim_condutor(cur, condutor_data):
         else:
             raise RuntimeError("Falha ao obter IdCondutor após INSERT.")
     except Exception as e:
-        cur.execute("SELECT idcondutor FROM condutor WHERE nome = ? AND certificacao = ?", (nome, certificacao))
+        cur.execute(f"SELECT idcondutor FROM condutor WHERE nome = ? AND certificacao = ?{versao_atual()}",
+                    (nome, certificacao))
         row = cur.fetchone()
         if row:
             return row[0]
@@ -216,11 +244,11 @@ def lookup_dim_empresabarco_by_barco_name(cur, nome_barco):
     Função DUMMY: Tenta encontrar a FK da Empresa através do Barco (já carregado pelo MySQL).
     Se o Barco não foi carregado pelo ETL MySQL, isto falha.
     """
-    cur.execute("""
+    cur.execute(f"""
                 SELECT eb.idempresa_barco
                 FROM barco b
                          JOIN empresabarco eb ON b.empresabarco_idempresa_barco = eb.idempresa_barco
-                WHERE b.nome = ?
+                WHERE b.nome = ?{versao_atual("b")}
                 """, (nome_barco,))
     row = cur.fetchone()
     if row: return row[0]
@@ -234,7 +262,7 @@ def lookup_dim_barco(cur, nome_barco):
     Função DUMMY: Tenta encontrar a SK do Barco pelo nome.
     Se o Barco não foi carregado pelo ETL MySQL, isto falha.
     """
-    cur.execute("SELECT idbarco FROM barco WHERE nome = ?", (nome_barco,))
+    cur.execute(f"SELECT idbarco FROM barco WHERE nome = ?{versao_atual()}", (nome_barco,))
     row = cur.fetchone()
     if row: return row[0]
     # Se falhar, devolve um ID fictício para o "Barco Desconhecido" (ID=1)
@@ -242,123 +270,628 @@ def lookup_dim_barco(cur, nome_barco):
     return 1
 
 
+# ---------------------------------------------------------
+# RESOLUÇÃO DAS DIMENSÕES E CARGA DOS FACTOS (POR BLOCO)
+# ---------------------------------------------------------
+
+# Dimensões do DW para a carga por conjuntos (SKs IDENTITY; o barco só é lido)
+DIMENSOES_DW = {
+    "tempo": define_dimensao("tempo", "idtempo", ["data_completa"], derivadas=DERIVADAS_TEMPO, identity=True),
+    "localizacao": define_dimensao("localizacao", "idlocalizacao", ["cidade", "pais"], ["localizacao_id_origem"],
+                                   identity=True),
+    "condutor": define_dimensao("condutor", "idcondutor", ["nome", "certificacao"], ["idade"], identity=True,
+                                historico=True),
+    "tipo_viagem": define_dimensao("tipo_viagem", "idtipoviagem", ["tipo"], identity=True),
+    "classeduracao": define_dimensao("classeduracao", "idclasseduracao", ["duracao"], identity=True),
+    "barco": define_dimensao("barco", "idbarco", ["nome"], so_leitura=True, historico=True),
+}
+
+
+def linha_staging(dimensao, natural, membro):
+    """Colunas de staging (naturais + atributos de DIMENSOES_DW) de um membro."""
+    if dimensao == "localizacao":
+        cidade, pais = natural
+        return cidade, pais, f"CSV_{cidade}_{pais}".replace(' ', '_')
+    if dimensao == "condutor":
+        return (*natural, int(membro["idade"]))
+    return (natural,)
+
+
+def resolve_membros_conjunto(cur, membros, chaves, hashes):
+    """
+    Versão por conjuntos de resolve_membros(): os membros novos de cada dimensão são
+    resolvidos com staging + MERGE + JOIN (carga_conjuntos.resolve_dimensao_em_cache). Nas
+    dimensões versionadas (ETL_SCD2), um membro já em cache volta a ser resolvido se o hash
+    dos seus atributos mudou (hashes: {dimensão: {chave natural: hash da versão atual}}).
+    """
+    for dimensao, tabela in membros.items():
+        linhas = {}
+        for membro in tabela.to_dict("records"):
+            natural = chave_natural(dimensao, membro)
+            if natural not in linhas:
+                linhas[natural] = linha_staging(dimensao, natural, membro)
+        novos = resolve_dimensao_em_cache(cur, DIMENSOES_DW[dimensao], linhas, chaves[dimensao],
+                                          hashes.setdefault(dimensao, {}))
+        METRICAS.conta("dimensoes", acertos_cache=len(tabela) - len(novos), falhas_cache=len(novos))
+        if dimensao == "barco":
+            # Barco não carregado pelo ETL MySQL -> "Barco Desconhecido" (ID=1), como em lookup_dim_barco
+            for natural in novos:
+                if chaves["barco"][natural] is None:
+                    chaves["barco"][natural] = 1
+
+
+def resolve_membros(cur, membros, chaves, hashes=None):
+    """
+    Cria/obtém a SK dos membros (de membros_dimensoes()) que ainda não estão em chaves
+    ({dimensão: {chave natural: SK}}, atualizado no local). Cada membro só é
+    pesquisado no SQL Server uma vez por execução. hashes é a cache dos hashes das
+    dimensões versionadas, ao lado de chaves (só na carga por conjuntos com ETL_SCD2;
+    sem ela, os membros versionados são resolvidos de novo em cada bloco).
+    """
+    if ETL_CARGA_CONJUNTOS:
+        resolve_membros_conjunto(cur, membros, chaves, {} if hashes is None else hashes)
+        return
+
+    for dimensao, tabela in membros.items():
+        for membro in tabela.to_dict("records"):
+            natural = chave_natural(dimensao, membro)
+            if natural in chaves[dimensao]:
+                METRICAS.conta("dimensoes", acertos_cache=1)
+                continue
+            METRICAS.conta("dimensoes", falhas_cache=1)
+
+            if dimensao == "classeduracao":
+                sk = get_or_create_dim_classeduracao(cur, int(membro["duracao"]))
+            elif dimensao == "localizacao":
+                sk = get_or_create_dim_localizacao(cur, {"cidade": natural[0], "pais": natural[1]})
+            elif dimensao == "tipo_viagem":
+                sk = get_or_create_dim_tipo_viagem(cur, natural)
+            elif dimensao == "condutor":
+                sk = get_or_create_dim_condutor(cur, {"nome": natural[0], "idade": int(membro["idade"]),
+                                                      "certificacao": natural[1]})
+            elif dimensao == "barco":
+                # As SKs do Barco são encontradas por lookup (assumindo pré-carregamento pelo ETL MySQL)
+                sk = lookup_dim_barco(cur, natural)
+            else:
+                sk = get_or_create_dim_tempo(cur, natural)
+            chaves[dimensao][natural] = sk
+
+
+# Dimensões resolvidas por lookup/MERGE (com o calendário, a SK de tempo é calculada a partir da data)
+DIMENSOES_RESOLVIDAS = [d for d in COLUNAS_DIMENSOES if not (ETL_TEMPO_CALENDARIO and d == "tempo")]
+
+
+def resolve_chaves_bloco(cur, bloco, chaves, hashes=None):
+    """
+    Resolve as SKs dos membros novos de um bloco. Com o calendário, gera também as datas do bloco
+    que fiquem fora do intervalo configurado (o intervalo é gerado à entrada, por prepara_calendario).
+    """
+    if ETL_TEMPO_CALENDARIO and len(bloco):
+        garante_datas(cur, bloco["data_chegada"].min().date(), bloco["data_chegada"].max().date())
+    resolve_membros(cur, membros_dimensoes(bloco, DIMENSOES_RESOLVIDAS), chaves, hashes)
+
+
+def atribui_chaves(bloco, chaves):
+    """Acrescenta ao bloco as colunas id_<dimensão> (id_tempo = yyyymmdd no modo calendário)."""
+    bloco = mapeia_chaves(bloco, chaves, DIMENSOES_RESOLVIDAS)
+    if ETL_TEMPO_CALENDARIO:
+        bloco["id_tempo"] = chave_tempo_vetorizada(bloco["data_chegada"])
+    return bloco
+
+
+# NOTA: O CSV só tem taxa. Os outros factos são preenchidos com 0.
+SQL_INSERT_FACTO_VIAGEM = f"""
+                          INSERT INTO viagens (viagem_id_origem, duracaoviagem, totaltaxas, numerocontentores,
+                                               pesototalcontentores, teutotal, classeduracao_idclasseduracao,
+                                               localizacao_idlocalizacao, tipo_viagem_idtipoviagem,
+                                               condutor_idcondutor, barco_idbarco, tempo_idtempo)
+                          {clausula_output_delta()}
+                          VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?);
+                          """
+
+
+def valores_factos_bloco(bloco):
+    """Parâmetros do INSERT na tabela de factos para todas as linhas de um bloco com as SKs já mapeadas."""
+    n = len(bloco)
+    colunas = [
+        bloco["idviagem"].tolist(),  # Chave Natural da Viagem (ID de Origem)
+        bloco["duracao"].astype(int).tolist(),  # Facto: Duração
+        bloco["taxa_eur"].astype(float).tolist(),  # Facto: Receita (Convertida de USD/CSV)
+        [0] * n,  # Facto: Contentores (0 - Faltam dados no CSV)
+        [0] * n,  # Facto: Peso (0 - Faltam dados no CSV)
+        [0] * n,  # Facto: TEU (0 - Faltam dados no CSV)
+    ]
+    # FKs Substitutas: classeduracao, localizacao, tipo_viagem, condutor, barco, tempo
+    for dimensao in ("classeduracao", "localizacao", "tipo_viagem", "condutor", "barco", "tempo"):
+        colunas.append(bloco[f"id_{dimensao}"].astype(int).tolist())
+    return list(zip(*colunas))
+
+
+# Upsert dos factos pela chave natural da viagem (modo pasta): os valores do bloco são copiados
+# para #stg_viagens e um único MERGE atualiza as viagens existentes e insere as novas.
+COLUNAS_FACTO_VIAGEM = ["viagem_id_origem", "duracaoviagem", "totaltaxas", "numerocontentores",
+                        "pesototalcontentores", "teutotal", "classeduracao_idclasseduracao",
+                        "localizacao_idlocalizacao", "tipo_viagem_idtipoviagem", "condutor_idcondutor",
+                        "barco_idbarco", "tempo_idtempo"]
+
+SQL_CRIA_STAGING_FACTOS = """
+    IF OBJECT_ID('tempdb..#stg_viagens') IS NOT NULL DROP TABLE #stg_viagens;
+    CREATE TABLE #stg_viagens (
+        viagem_id_origem nvarchar(64) PRIMARY KEY, duracaoviagem int, totaltaxas float,
+        numerocontentores int, pesototalcontentores int, teutotal int,
+        classeduracao_idclasseduracao int, localizacao_idlocalizacao int, tipo_viagem_idtipoviagem bigint,
+        condutor_idcondutor int, barco_idbarco int, tempo_idtempo int
+    );
+"""
+
+SQL_INSERT_STAGING_FACTOS = (f"INSERT INTO #stg_viagens ({', '.join(COLUNAS_FACTO_VIAGEM)}) "
+                             f"VALUES ({', '.join('?' * len(COLUNAS_FACTO_VIAGEM))});")
+
+
+def sql_merge_factos(origem):
+    """MERGE (upsert em viagem_id_origem) das viagens de origem (#stg_viagens)."""
+    return f"""
+        MERGE INTO viagens WITH (HOLDLOCK) AS d
+        USING {origem} AS s ({", ".join(COLUNAS_FACTO_VIAGEM)})
+        ON d.viagem_id_origem = s.viagem_id_origem
+        WHEN MATCHED THEN
+            UPDATE SET {", ".join(f"{c} = s.{c}" for c in COLUNAS_FACTO_VIAGEM[1:])}
+        WHEN NOT MATCHED BY TARGET THEN
+            INSERT ({", ".join(COLUNAS_FACTO_VIAGEM)})
+            VALUES ({", ".join(f"s.{c}" for c in COLUNAS_FACTO_VIAGEM)})
+        {clausula_output_delta(upsert=True)};
+    """
+
+
+SQL_MERGE_STAGING_FACTOS = sql_merge_factos(f"(SELECT {', '.join(COLUNAS_FACTO_VIAGEM)} FROM #stg_viagens)")
+
+
+def carrega_lote_factos(conn, cur, valores, upsert=False):
+    """Carrega um lote de factos numa transação (executemany); se falhar, faz rollback e relança o erro."""
+    try:
+        if upsert:
+            cur.execute(SQL_CRIA_STAGING_FACTOS)
+            cur.executemany(SQL_INSERT_STAGING_FACTOS, valores)
+            cur.execute(SQL_MERGE_STAGING_FACTOS)
+        else:
+            cur.executemany(SQL_INSERT_FACTO_VIAGEM, valores)
+        aplica_deltas(cur)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def carrega_lote_por_bissecao(conn, cur, linhas, valores, upsert=False):
+    """
+    Carrega o lote; se falhar, divide-o ao meio e repete em cada metade (cada uma com o seu
+    executemany e commit) até isolar as linhas com erro. Com k linhas com erro num lote de n,
+    são cerca de 2·k·log2(n) lotes em vez de n inserts linha a linha.
+    Devolve (linhas carregadas, [(linha do ficheiro, erro), ...]).
+    """
+    try:
+        carrega_lote_factos(conn, cur, valores, upsert)
+        return len(valores), []
+    except Exception as e:
+        if len(valores) == 1:
+            return 0, [(linhas[0], repr(e))]
+    meio = len(valores) // 2
+    inseridas_1, erros_1 = carrega_lote_por_bissecao(conn, cur, linhas[:meio], valores[:meio], upsert)
+    inseridas_2, erros_2 = carrega_lote_por_bissecao(conn, cur, linhas[meio:], valores[meio:], upsert)
+    return inseridas_1 + inseridas_2, erros_1 + erros_2
+
+
+def carrega_factos_bloco(conn, cur, bloco, upsert=False):
+    """
+    Insere os factos de um bloco numa só chamada (executemany) e faz commit.
+    Com upsert=True, as viagens já existentes (mesmo viagem_id_origem) são atualizadas em vez
+    de duplicadas; dentro do bloco fica a última ocorrência de cada idviagem.
+    Se o lote falhar, é dividido por bisseção para isolar as linhas com erro, que seguem
+    para a quarentena (rejeitadas_da_carga).
+    Devolve (linhas inseridas/atualizadas, [(linha do ficheiro, erro), ...]).
+    """
+    if upsert:
+        bloco = bloco.drop_duplicates(subset="idviagem", keep="last")
+    valores = valores_factos_bloco(bloco)
+    if not valores:
+        return 0, []
+    return carrega_lote_por_bissecao(conn, cur, bloco["linha"].tolist(), valores, upsert)
+
+
+def separa_linhas_invalidas(bloco):
+    """Devolve (linhas válidas, linhas rejeitadas para a quarentena) de um bloco transformado."""
+    return bloco[bloco["valida"]].copy(), rejeitadas_do_bloco(bloco)
+
+
 # ---------------------------------------------------------
 # 5. FUNÇÃO PRINCIPAL
 # ---------------------------------------------------------
 
 def main_csv_processor():
     """
-    Processa o ficheiro CSV e insere as Dimensões e a Tabela de Factos.
+    Processa o ficheiro CSV por blocos e insere as Dimensões e a Tabela de Factos.
     Insere 0 para os factos agregados (containers, peso, TEU) que faltam no CSV.
     """
+    verifica_requisitos(ETL_CARGA_CONJUNTOS)
     print("--- 1. Iniciando ETL de Dimensões e Factos via CSV ---")
+    if not os.path.exists(CSV_PATH):
+        print(f"ERRO: ficheiro CSV não encontrado: {CSV_PATH}")
+        sys.exit(1)
+
     sqlsrv_conn = get_mssql_conn()
 
     try:
         sqlsrv_cur = sqlsrv_conn.cursor()
+        sqlsrv_cur.fast_executemany = True
+        if ETL_TEMPO_CALENDARIO:
+            prepara_calendario(sqlsrv_cur)
+            sqlsrv_conn.commit()
+
+        chaves = {dimensao: {} for dimensao in DIMENSOES_RESOLVIDAS}
+        hashes = {}
+        quarentena = Quarentena(caminho_quarentena(CSV_PATH), CSV_PATH)
+        linhas_lidas = 0
+        linhas_processadas = 0
+
+        for bloco in METRICAS.mede_blocos("extracao", le_csv_em_blocos(CSV_PATH)):
+            # --- TRANSFORMAÇÃO (VETORIZADA) DO BLOCO ---
+            with METRICAS.etapa("transformacao"):
+                bloco = transforma_bloco(bloco)
+                linhas_lidas += len(bloco)
+                bloco, rejeitadas = separa_linhas_invalidas(bloco)
+            METRICAS.conta("transformacao", linhas=len(bloco), erros=len(rejeitadas))
+            quarentena.regista(rejeitadas)
+
+            # --- OBTENÇÃO DAS CHAVES SUBSTITUTAS (SKs) ---
+            with METRICAS.etapa("dimensoes"):
+                resolve_chaves_bloco(sqlsrv_cur, bloco, chaves, hashes)
+                sqlsrv_conn.commit()
+                bloco = atribui_chaves(bloco, chaves)
+            METRICAS.conta("dimensoes", linhas=len(bloco))
+
+            # --- INSERÇÃO NA TABELA DE FACTOS (VIAGENS) ---
+            with METRICAS.etapa("carga"):
+                inseridas, erros_carga = carrega_factos_bloco(sqlsrv_conn, sqlsrv_cur, bloco)
+            METRICAS.conta("carga", linhas=inseridas, erros=len(erros_carga))
+            quarentena.regista(rejeitadas_da_carga(bloco, erros_carga))
+            linhas_processadas += inseridas
+
+            print(f"... {linhas_processadas} linhas de factos (CSV) processadas ({linhas_lidas} lidas, "
+                  f"{quarentena.n_linhas} rejeitadas)...")
+            METRICAS.progresso(linhas_processadas, lidas=linhas_lidas)
+
+        print(f"ETL CSV concluído. Total de Factos inseridos: {linhas_processadas}")
+        ESTATISTICAS.relatorio()
+        METRICAS.resumo(modo="sequencial", factos=linhas_processadas, lidas=linhas_lidas,
+                        rejeitadas=quarentena.n_linhas)
+
+    finally:
+        quarentena.fecha()
+        if sqlsrv_conn:
+            sqlsrv_conn.close()
+
+
+# ---------------------------------------------------------
+# 6. MODO PARTICIONADO (N processos, um bloco do ficheiro por tarefa)
+# ---------------------------------------------------------
+
+def resolve_chaves_dimensoes_csv(cur, caminho, chaves=None, hashes=None):
+    """
+    Percorre o CSV uma vez por blocos e cria/obtém as SKs de todos os membros das dimensões
+    (só no coordenador, numa ligação). Devolve {dimensão: {chave natural: SK}}; com chaves,
+    acrescenta os membros novos a esse dicionário (ex.: vários ficheiros), e com hashes
+    mantém entre chamadas a cache de hashes das dimensões versionadas. O calendário deve já ter
+    sido preparado (prepara_calendario).
+    """
+    if chaves is None:
+        chaves = {dimensao: {} for dimensao in DIMENSOES_RESOLVIDAS}
+    if hashes is None:
+        hashes = {}
+    for bloco in METRICAS.mede_blocos("extracao", le_csv_em_blocos(caminho)):
+        with METRICAS.etapa("transformacao"):
+            bloco, _ = separa_linhas_invalidas(transforma_bloco(bloco))
+        with METRICAS.etapa("dimensoes"):
+            resolve_chaves_bloco(cur, bloco, chaves, hashes)
+    return chaves
+
+
+# Chaves das dimensões e cabeçalho do CSV, entregues a cada worker no arranque do processo
+_chaves_worker = None
+_cabecalho_worker = None
+
+
+def _inicializa_worker(chaves, cabecalho):
+    global _chaves_worker, _cabecalho_worker
+    _chaves_worker = chaves
+    _cabecalho_worker = cabecalho
+
+
+def carrega_particao_csv(particao):
+    """Worker: lê um bloco de linhas do CSV e insere os factos, com a sua própria ligação ao SQL Server."""
+    resultado = novo_resultado(particao)
+    with METRICAS.etapa("extracao"):
+        linhas = le_linhas_bloco(CSV_PATH, particao)
+    METRICAS.conta("extracao", linhas=len(linhas))
+
+    with METRICAS.etapa("transformacao"):
+        bloco = transforma_bloco(le_bloco_de_linhas(linhas, _cabecalho_worker, particao["linha_inicial"]))
+        bloco, rejeitadas = separa_linhas_invalidas(bloco)
+    METRICAS.conta("transformacao", linhas=len(bloco), erros=len(rejeitadas))
+    with METRICAS.etapa("dimensoes"):
+        bloco = atribui_chaves(bloco, _chaves_worker)
+
+    sqlsrv_conn = get_mssql_conn()
+    try:
+        sqlsrv_cur = sqlsrv_conn.cursor()
+        sqlsrv_cur.fast_executemany = True
+        with METRICAS.etapa("carga"):
+            resultado["linhas"], erros_carga = carrega_factos_bloco(sqlsrv_conn, sqlsrv_cur, bloco)
+    finally:
+        if sqlsrv_conn:
+            sqlsrv_conn.close()
+    METRICAS.conta("carga", linhas=resultado["linhas"], erros=len(erros_carga))
+
+    # As linhas rejeitadas seguem para o coordenador, que as escreve na quarentena
+    rejeitadas = pd.concat([rejeitadas, rejeitadas_da_carga(bloco, erros_carga)])
+    resultado["rejeitados"] = rejeitadas.to_dict("records")
+    resultado["erros"] = [{"particao": particao["nome"], "registo": n_linha, "erro": motivo}
+                          for n_linha, motivo in zip(rejeitadas["linha"].tolist(),
+                                                     rejeitadas["motivo_rejeicao"].tolist())]
+    resultado["sql"] = ESTATISTICAS.exporta(limpar=True)
+    resultado["metricas"] = METRICAS.exporta(limpar=True)
+    return resultado
+
+
+def main_csv_paralelo(n_workers=ETL_WORKERS):
+    """
+    Coordenador do modo particionado: resolve as chaves das dimensões numa única ligação,
+    divide o ficheiro em blocos de linhas e distribui-os por n_workers processos.
+    """
+    verifica_requisitos(ETL_CARGA_CONJUNTOS)
+    print("--- 1. Iniciando ETL de Dimensões e Factos via CSV (modo particionado) ---")
+    if not os.path.exists(CSV_PATH):
+        print(f"ERRO: ficheiro CSV não encontrado: {CSV_PATH}")
+        sys.exit(1)
+
+    sqlsrv_conn = get_mssql_conn()
+    try:
+        sqlsrv_cur = sqlsrv_conn.cursor()
+        if ETL_TEMPO_CALENDARIO:
+            prepara_calendario(sqlsrv_cur)
+        print("Resolução das chaves das dimensões (coordenador)...")
+        chaves = resolve_chaves_dimensoes_csv(sqlsrv_cur, CSV_PATH)
+        sqlsrv_conn.commit()
+    finally:
+        if sqlsrv_conn:
+            sqlsrv_conn.close()
+
+    cabecalho, particoes = particiona_ficheiro(CSV_PATH)
+    print(f"Iniciando Carga (Factos) de {len(particoes)} blocos em {n_workers} processos...")
+    quarentena = Quarentena(caminho_quarentena(CSV_PATH), CSV_PATH)
+    try:
+        resumo = executa_particoes(carrega_particao_csv, particoes, n_workers, inicializador=_inicializa_worker,
+                                   initargs=(chaves, cabecalho.split(';')),
+                                   ao_concluir=lambda resultado: quarentena.regista(resultado["rejeitados"]))
+    finally:
+        quarentena.fecha()
+    imprime_resumo(resumo)
+    ESTATISTICAS.relatorio()
+    METRICAS.resumo(modo="particionado", workers=n_workers, factos=resumo["linhas"])
+
 
-        # Leitura e conversão inicial do CSV
-        csv_data = []
+# ---------------------------------------------------------
+# 7. MODO PASTA (vários ficheiros, manifesto + upsert, um ficheiro por tarefa)
+# ---------------------------------------------------------
+
+def carrega_ficheiro_csv(ficheiro):
+    """
+    Worker do modo pasta: carrega um ficheiro inteiro por blocos com upsert dos factos e
+    regista no manifesto o resultado (carregado / falhou). As rejeições vão para a
+    quarentena do próprio ficheiro.
+    """
+    resultado = novo_resultado(ficheiro)
+    quarentena = Quarentena(caminho_quarentena(ficheiro["caminho"]), ficheiro["caminho"])
+    sqlsrv_conn = get_mssql_conn()
+    try:
+        sqlsrv_cur = sqlsrv_conn.cursor()
+        sqlsrv_cur.fast_executemany = True
         try:
-            # O ficheiro do utilizador tem delimitador ';'
-            with open(CSV_PATH, mode='r', encoding='utf-8') as file:
-                reader = csv.DictReader(file, delimiter=';')
-                for row_csv in reader:
-                    csv_data.append(row_csv)
-        except FileNotFoundError:
-            print(f"ERRO: ficheiro CSV não encontrado: {CSV_PATH}")
-            sys.exit(1)
+            for bloco in METRICAS.mede_blocos("extracao", le_csv_em_blocos(ficheiro["caminho"])):
+                with METRICAS.etapa("transformacao"):
+                    bloco, rejeitadas = separa_linhas_invalidas(transforma_bloco(bloco))
+                METRICAS.conta("transformacao", linhas=len(bloco), erros=len(rejeitadas))
+                quarentena.regista(rejeitadas)
+
+                with METRICAS.etapa("dimensoes"):
+                    bloco = atribui_chaves(bloco, _chaves_worker)
+
+                with METRICAS.etapa("carga"):
+                    inseridas, erros_carga = carrega_factos_bloco(sqlsrv_conn, sqlsrv_cur, bloco, upsert=True)
+                METRICAS.conta("carga", linhas=inseridas, erros=len(erros_carga))
+                quarentena.regista(rejeitadas_da_carga(bloco, erros_carga))
+                resultado["linhas"] += inseridas
+        except Exception as e:
+            sqlsrv_conn.rollback()
+            conclui_ficheiro(sqlsrv_cur, ficheiro["idficheiro"], ESTADO_FALHOU, resultado["linhas"],
+                             quarentena.n_linhas, repr(e))
+            sqlsrv_conn.commit()
+            raise
+
+        conclui_ficheiro(sqlsrv_cur, ficheiro["idficheiro"], ESTADO_CARREGADO, resultado["linhas"],
+                         quarentena.n_linhas)
+        sqlsrv_conn.commit()
+    finally:
+        quarentena.fecha()
+        if sqlsrv_conn:
+            sqlsrv_conn.close()
 
-        print(f"Total de {len(csv_data)} linhas lidas do CSV.")
+    if quarentena.n_linhas:
+        resultado["erros"].append({"particao": ficheiro["nome"], "registo": None,
+                                   "erro": f"{quarentena.n_linhas} linhas rejeitadas (ver {quarentena.caminho})"})
+    resultado["sql"] = ESTATISTICAS.exporta(limpar=True)
+    resultado["metricas"] = METRICAS.exporta(limpar=True)
+    return resultado
 
-        linhas_processadas = 0
 
-        for r_csv in csv_data:
-
-            # --- TRANSFORMAÇÃO DE CAMPOS BRUTOS DO CSV ---
-            try:
-                # Conversão de Data e Cálculo da Duração
-                data_chegada = datetime.strptime(r_csv['datachegada'], '%d/%m/%Y').date()
-                data_partida = datetime.strptime(r_csv['datapartida'], '%d/%m/%Y').date()
-                duracao = (data_chegada - data_partida).days
-
-                # Conversão da Taxa (A coluna 'taxa' está com ',' como separador decimal)
-                taxa_eur = float(r_csv['taxa'].replace(',', '.'))
-
-
-                # Prepara dados para Condutor
-                data_condutor = {
-                    "nome": r_csv['nomecondutor'],
-                    "idade": int(r_csv['idadecondutor']),
-                    "certificacao": r_csv['certificacao']
-                }
-
-                # Prepara dados para Localização
-                data_localizacao = {
-                    "pais": r_csv['pais_origem'],
-                    "cidade": r_csv['cidade_origem'],
-                }
-
-                # --- OBTENÇÃO DAS CHAVES SUBSTITUTAS (SKs) ---
-
-                # As SKs do Barco e Empresa são encontradas por lookup (assumindo pré-carregamento)
-                id_barco = lookup_dim_barco(sqlsrv_cur, r_csv['nomebarco'])
-
-                # Se o Barco foi encontrado, a empresa deve ser procurada a partir dele.
-                # Como o lookup_dim_barco devolve o SK, usamos o nome do barco para obter o SK da empresa.
-                # Devido à limitação do CSV, vamos usar a função DUMMY.
-                id_empresa_barco = lookup_dim_empresabarco_by_barco_name(sqlsrv_cur, r_csv['nomebarco'])
-
-                # Chaves restantes
-                id_tempo = get_or_create_dim_tempo(sqlsrv_cur, data_chegada)
-                id_condutor = get_or_create_dim_condutor(sqlsrv_cur, data_condutor)
-                id_localizacao = get_or_create_dim_localizacao(sqlsrv_cur, data_localizacao)
-                id_tipo_viagem = get_or_create_dim_tipo_viagem(sqlsrv_cur, r_csv['tipobarco'])
-                id_classe_duracao = get_or_create_dim_classeduracao(sqlsrv_cur, duracao)
-
-                # --- INSERÇÃO NA TABELA DE FACTOS (VIAGENS) ---
-
-                # NOTA: O CSV só tem taxa. Os outros factos são preenchidos com 0.
-                sqlsrv_cur.execute("""
-                                   INSERT INTO viagens (viagem_id_origem, duracaoviagem, totaltaxas, numerocontentores,
-                                                        pesototalcontentores, teutotal, classeduracao_idclasseduracao,
-                                                        localizacao_idlocalizacao, tipo_viagem_idtipoviagem,
-                                                        condutor_idcondutor, barco_idbarco, tempo_idtempo)
-                                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?);
-                                   """, (
-                                       r_csv['idviagem'],  # Chave Natural da Viagem (ID de Origem)
-                                       duracao,  # Facto: Duração
-                                       taxa_eur,  # Facto: Receita (Convertida de USD/CSV)
-                                       0,  # Facto: Contentores (0 - Faltam dados no CSV)
-                                       0,  # Facto: Peso (0 - Faltam dados no CSV)
-                                       0,  # Facto: TEU (0 - Faltam dados no CSV)
-                                       id_classe_duracao,  # FK Classe Duracao
-                                       id_localizacao,  # FK Localizacao
-                                       id_tipo_viagem,  # FK Tipo Viagem
-                                       id_condutor,  # FK Condutor
-                                       id_barco,  # FK Barco (Lookup SK)
-                                       id_tempo,  # FK Tempo
-                                   ))
-
-                linhas_processadas += 1
-                if linhas_processadas % 100 == 0:
-                    sqlsrv_conn.commit()
-                    print(f"... {linhas_processadas} linhas de factos (CSV) processadas...")
-
-            except ValueError as ve:
-                print(f"Erro de conversão de tipo na linha {r_csv.get('idviagem', 'N/A')}. Erro: {ve}")
+def main_csv_pasta(pasta=PASTA_CSV, n_workers=max(ETL_WORKERS, 1)):
+    """
+    Coordenador do modo pasta: regista no manifesto os CSV da pasta (SHA-256 e nº de linhas),
+    ignora os já carregados, resolve numa única ligação as chaves das dimensões de todos os
+    ficheiros novos e distribui os ficheiros por n_workers processos (upsert dos factos).
+    """
+    verifica_requisitos(ETL_CARGA_CONJUNTOS)
+    print(f"--- 1. Iniciando ETL de Dimensões e Factos via CSV (pasta {pasta}) ---")
+    if not os.path.isdir(pasta):
+        print(f"ERRO: pasta não encontrada: {pasta}")
+        sys.exit(1)
+
+    ficheiros = []
+    sqlsrv_conn = get_mssql_conn()
+    try:
+        sqlsrv_cur = sqlsrv_conn.cursor()
+        garante_manifesto(sqlsrv_cur)
+        if ETL_TEMPO_CALENDARIO:
+            prepara_calendario(sqlsrv_cur)
+        sqlsrv_conn.commit()
+
+        conteudos_vistos = set()  # SHA-256 dos ficheiros desta pasta
+        for caminho in descobre_ficheiros(pasta):
+            nome = os.path.basename(caminho)
+            hash_sha256, linhas = hash_e_linhas(caminho)
+            if hash_sha256 in conteudos_vistos:
+                print(f"{nome}: conteúdo repetido noutro ficheiro desta pasta (ignorado)")
                 continue
-            except Exception as e:
-                print(f"Erro inesperado ao processar linha {r_csv.get('idviagem', 'N/A')}: {e}")
+            conteudos_vistos.add(hash_sha256)
+            idficheiro = regista_ficheiro(sqlsrv_cur, nome, hash_sha256, linhas)
+            if idficheiro is None:
+                print(f"{nome}: já carregado (ignorado)")
                 continue
+            ficheiros.append({"nome": nome, "caminho": caminho, "idficheiro": idficheiro})
+        sqlsrv_conn.commit()
+
+        if not ficheiros:
+            print("Nenhum ficheiro novo para carregar.")
+            return
+
+        print(f"Resolução das chaves das dimensões de {len(ficheiros)} ficheiros (coordenador)...")
+        chaves, hashes = None, {}
+        for ficheiro in ficheiros:
+            chaves = resolve_chaves_dimensoes_csv(sqlsrv_cur, ficheiro["caminho"], chaves, hashes)
+            sqlsrv_conn.commit()
+    finally:
+        if sqlsrv_conn:
+            sqlsrv_conn.close()
 
+    print(f"Iniciando Carga (Factos, upsert) de {len(ficheiros)} ficheiros em {n_workers} processos...")
+    resumo = executa_particoes(carrega_ficheiro_csv, ficheiros, n_workers, inicializador=_inicializa_worker,
+                               initargs=(chaves, None))
+    imprime_resumo(resumo)
+    ESTATISTICAS.relatorio()
+    METRICAS.resumo(modo="pasta", workers=n_workers, ficheiros=len(ficheiros), factos=resumo["linhas"])
+
+
+# ---------------------------------------------------------
+# 8. ZONA DE ATERRAGEM (extração e carga em separado, via Parquet)
+# ---------------------------------------------------------
+
+def origem_zona(caminho_csv):
+    """Origem na zona de aterragem de um ficheiro CSV (csv/<nome sem extensão>)."""
+    return "csv/" + os.path.splitext(os.path.basename(caminho_csv))[0]
+
+
+def extrai_csv_para_zona(caminho=CSV_PATH):
+    """
+    Fase de extração: lê e transforma o CSV por blocos e escreve as linhas válidas na zona de
+    aterragem (as rejeitadas vão para a quarentena). Não usa o SQL Server.
+    """
+    print(f"--- 1. Extração do CSV {caminho} para a zona de aterragem ---")
+    if not os.path.exists(caminho):
+        print(f"ERRO: ficheiro CSV não encontrado: {caminho}")
+        sys.exit(1)
+
+    origem = origem_zona(caminho)
+    limpa_origem(origem)
+    quarentena = Quarentena(caminho_quarentena(caminho), caminho)
+    escritas = 0
+    try:
+        for n_bloco, bloco in enumerate(METRICAS.mede_blocos("extracao", le_csv_em_blocos(caminho))):
+            with METRICAS.etapa("transformacao"):
+                bloco, rejeitadas = separa_linhas_invalidas(transforma_bloco(bloco))
+                escritas += escreve_particoes(bloco.drop(columns=["valida", "motivo_rejeicao"]), origem,
+                                              f"b{n_bloco:05d}")
+            METRICAS.conta("transformacao", linhas=len(bloco), erros=len(rejeitadas))
+            quarentena.regista(rejeitadas)
+            print(f"... {escritas} linhas escritas na zona de aterragem ({quarentena.n_linhas} rejeitadas)...")
+    finally:
+        quarentena.fecha()
+
+    print(f"Extração concluída. Total de linhas na zona de aterragem: {escritas}")
+    METRICAS.resumo(modo="extracao", linhas=escritas, rejeitadas=quarentena.n_linhas)
+
+
+def carrega_csv_da_zona(caminho=CSV_PATH):
+    """
+    Fase de carga: carrega no DW (upsert em viagem_id_origem) as partições da zona de aterragem
+    do CSV ainda não carregadas, uma partição (mês) por bloco. Não relê o CSV.
+    """
+    verifica_requisitos(ETL_CARGA_CONJUNTOS)
+    print(f"--- 1. Carga da zona de aterragem ({origem_zona(caminho)}) para o DW ---")
+    quarentena = Quarentena(caminho_quarentena(caminho, fase="carga"), caminho)
+    sqlsrv_conn = get_mssql_conn()
+    try:
+        sqlsrv_cur = sqlsrv_conn.cursor()
+        sqlsrv_cur.fast_executemany = True
+        garante_chave_origem_viagens(sqlsrv_cur)
+        if ETL_TEMPO_CALENDARIO:
+            prepara_calendario(sqlsrv_cur)
         sqlsrv_conn.commit()
-        print(f"ETL CSV concluído. Total de Factos inseridos: {linhas_processadas}")
 
+        chaves = {dimensao: {} for dimensao in DIMENSOES_RESOLVIDAS}
+        hashes = {}
+        linhas_processadas = 0
+        for particao in particoes(origem_zona(caminho)):
+            if particao_carregada(particao, MSSQL_DB):
+                print(f"... {particao['nome']}: já carregada (ignorada)")
+                continue
+
+            with METRICAS.etapa("extracao"):
+                bloco = le_particao(particao)
+                bloco["valida"] = True  # só as linhas válidas chegam à zona de aterragem
+            METRICAS.conta("extracao", linhas=len(bloco))
+
+            with METRICAS.etapa("dimensoes"):
+                resolve_chaves_bloco(sqlsrv_cur, bloco, chaves, hashes)
+                sqlsrv_conn.commit()
+                bloco = atribui_chaves(bloco, chaves)
+            METRICAS.conta("dimensoes", linhas=len(bloco))
+
+            with METRICAS.etapa("carga"):
+                inseridas, erros_carga = carrega_factos_bloco(sqlsrv_conn, sqlsrv_cur, bloco, upsert=True)
+            METRICAS.conta("carga", linhas=inseridas, erros=len(erros_carga))
+            # As linhas que falharam ficam na quarentena (a partição é marcada como carregada)
+            quarentena.regista(rejeitadas_da_carga(bloco, erros_carga))
+
+            marca_carregada(particao, MSSQL_DB, inseridas)
+            linhas_processadas += inseridas
+            print(f"... {particao['nome']}: {inseridas} factos carregados (total {linhas_processadas})")
+
+        print(f"Carga concluída. Total de Factos carregados: {linhas_processadas}")
+        ESTATISTICAS.relatorio()
+        METRICAS.resumo(modo="carga", factos=linhas_processadas, rejeitadas=quarentena.n_linhas)
     finally:
+        quarentena.fecha()
         if sqlsrv_conn:
             sqlsrv_conn.close()
 
 
 if __name__ == "__main__":
-    main_csv_processor()
\ No newline at end of file
+    if ETL_FASE == FASE_EXTRACAO:
+        extrai_csv_para_zona()
+    elif ETL_FASE == FASE_CARGA:
+        carrega_csv_da_zona()
+    elif PASTA_CSV:
+        main_csv_pasta()
+    elif ETL_WORKERS > 1:
+        main_csv_paralelo()
+    else:
+        main_csv_processor()
\ No newline at end of file
@@ -0,0 +1,233 @@
+import atexit
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+
+# ---------------------------------------------------------
+# Camada de acesso ao SGBD partilhada pelos ETL
+# ---------------------------------------------------------
+# - PoolLigacoes: reutiliza ligações entre partições/tarefas do mesmo processo
+#   (cada processo tem o seu pool; as ligações nunca atravessam um fork).
+# - CursorPreparado: um cursor DB-API por texto SQL. O pyodbc só volta a preparar
+#   um comando quando o texto muda no mesmo cursor, por isso cada consulta "quente"
+#   (lookup/insert das dimensões) fica preparada uma única vez por ligação.
+# - EstatisticasSQL: nº de chamadas e tempo por comando SQL.
+
+POOL_TAMANHO = int(os.getenv("ETL_POOL_TAMANHO", "4"))
+MAX_COMANDOS_PREPARADOS = int(os.getenv("ETL_MAX_COMANDOS_PREPARADOS", "64"))
+
+
+def rotulo_sql(sql, tamanho=90):
+    """Texto SQL numa só linha (espaços colapsados), truncado, para os relatórios."""
+    texto = " ".join(sql.split())
+    return texto if len(texto) <= tamanho else texto[:tamanho - 3] + "..."
+
+
+class EstatisticasSQL(object):
+    """Nº de chamadas, linhas (executemany) e tempo acumulado/máximo por comando SQL."""
+
+    def __init__(self):
+        self.__comandos = {}
+        self.__lock = threading.Lock()
+
+    def regista(self, sql, segundos, linhas=1):
+        with self.__lock:
+            est = self.__comandos.setdefault(rotulo_sql(sql), {"chamadas": 0, "linhas": 0, "tempo": 0.0,
+                                                               "tempo_max": 0.0})
+            est["chamadas"] += 1
+            est["linhas"] += linhas
+            est["tempo"] += segundos
+            est["tempo_max"] = max(est["tempo_max"], segundos)
+
+    def junta(self, outras):
+        """Acumula estatísticas exportadas por outro processo (ex.: um worker)."""
+        with self.__lock:
+            for rotulo, est in outras.items():
+                atual = self.__comandos.setdefault(rotulo, {"chamadas": 0, "linhas": 0, "tempo": 0.0,
+                                                            "tempo_max": 0.0})
+                atual["chamadas"] += est["chamadas"]
+                atual["linhas"] += est["linhas"]
+                atual["tempo"] += est["tempo"]
+                atual["tempo_max"] = max(atual["tempo_max"], est["tempo_max"])
+
+    def exporta(self, limpar=False):
+        """Cópia das estatísticas ({rótulo: {...}}); com limpar=True recomeça a contagem."""
+        with self.__lock:
+            copia = {rotulo: dict(est) for rotulo, est in self.__comandos.items()}
+            if limpar:
+                self.__comandos.clear()
+        return copia
+
+    def total_chamadas(self):
+        with self.__lock:
+            return sum(est["chamadas"] for est in self.__comandos.values())
+
+    def relatorio(self, top=15):
+        """Imprime os comandos com mais tempo acumulado."""
+        comandos = sorted(self.exporta().items(), key=lambda item: item[1]["tempo"], reverse=True)
+        if not comandos:
+            return
+        print(f"Comandos SQL ({sum(e['chamadas'] for _, e in comandos)} chamadas), por tempo acumulado:")
+        for rotulo, est in comandos[:top]:
+            media_ms = 1000 * est["tempo"] / est["chamadas"]
+            print(f"    {est['tempo']:9.3f}s {est['chamadas']:>9} x {media_ms:8.3f}ms  {rotulo}")
+
+
+# Estatísticas do processo atual (todas as ligações do pool)
+ESTATISTICAS = EstatisticasSQL()
+
+
+class CursorPreparado(object):
+    """
+    Cursor com a interface DB-API usada pelos get_or_create (execute/executemany/fetchone/
+    fetchall/rowcount) que guarda um cursor real por texto SQL (LRU, até MAX_COMANDOS_PREPARADOS)
+    e regista o tempo de cada chamada.
+    """
+
+    def __init__(self, conn, estatisticas=ESTATISTICAS):
+        self.__conn = conn
+        self.__estatisticas = estatisticas
+        self.__cursores = OrderedDict()
+        self.__atual = None
+        self.fast_executemany = False
+
+    def __cursor_para(self, sql):
+        cursor = self.__cursores.pop(sql, None)
+        if cursor is None:
+            cursor = self.__conn.cursor()
+            if len(self.__cursores) >= MAX_COMANDOS_PREPARADOS:
+                _, antigo = self.__cursores.popitem(last=False)
+                antigo.close()
+        self.__cursores[sql] = cursor
+        self.__atual = cursor
+        return cursor
+
+    def execute(self, sql, params=()):
+        cursor = self.__cursor_para(sql)
+        inicio = time.perf_counter()
+        cursor.execute(sql, params)
+        self.__estatisticas.regista(sql, time.perf_counter() - inicio)
+        return self
+
+    def executemany(self, sql, seq_params):
+        seq_params = list(seq_params)
+        cursor = self.__cursor_para(sql)
+        if hasattr(cursor, "fast_executemany"):
+            cursor.fast_executemany = self.fast_executemany
+        inicio = time.perf_counter()
+        cursor.executemany(sql, seq_params)
+        self.__estatisticas.regista(sql, time.perf_counter() - inicio, linhas=len(seq_params))
+        return self
+
+    def fetchone(self):
+        return self.__atual.fetchone()
+
+    def fetchall(self):
+        return self.__atual.fetchall()
+
+    @property
+    def rowcount(self):
+        return self.__atual.rowcount
+
+    def close(self):
+        for cursor in self.__cursores.values():
+            cursor.close()
+        self.__cursores.clear()
+        self.__atual = None
+
+
+class LigacaoPreparada(object):
+    """
+    Ligação do pool. cursor() devolve sempre o mesmo CursorPreparado (os comandos preparados
+    duram o tempo de vida da ligação); close() devolve a ligação ao pool em vez de a fechar.
+    """
+
+    def __init__(self, conn, pool):
+        self.conn = conn
+        self.__pool = pool
+        self.__cursor = CursorPreparado(conn)
+
+    def cursor(self):
+        return self.__cursor
+
+    def commit(self):
+        self.conn.commit()
+
+    def rollback(self):
+        self.conn.rollback()
+
+    def close(self):
+        self.__pool.devolve(self)
+
+    def fecha_definitivamente(self):
+        self.__cursor.close()
+        self.conn.close()
+
+
+class PoolLigacoes(object):
+    """
+    Pool de ligações por processo. As ligações são criadas por fabrica() à medida que são
+    precisas (até tamanho) e reutilizadas depois de close(). Se o pool for herdado por um
+    processo filho (fork), as ligações do pai são descartadas sem serem usadas.
+    """
+
+    def __init__(self, fabrica, tamanho=POOL_TAMANHO):
+        self.__fabrica = fabrica
+        self.__tamanho = tamanho
+        self.__livres = queue.LifoQueue()
+        self.__criadas = 0
+        self.__lock = threading.Lock()
+        self.__pid = os.getpid()
+        atexit.register(self.fecha)
+
+    def __verifica_processo(self):
+        if self.__pid != os.getpid():
+            self.__livres = queue.LifoQueue()
+            self.__criadas = 0
+            self.__pid = os.getpid()
+
+    def obtem(self, timeout=None):
+        """Devolve uma LigacaoPreparada livre (cria uma nova se ainda houver lugar; senão espera)."""
+        with self.__lock:
+            self.__verifica_processo()
+            try:
+                return self.__livres.get_nowait()
+            except queue.Empty:
+                if self.__criadas < self.__tamanho:
+                    self.__criadas += 1
+                    criar = True
+                else:
+                    criar = False
+        if criar:
+            try:
+                return LigacaoPreparada(self.__fabrica(), self)
+            except Exception:
+                with self.__lock:
+                    self.__criadas -= 1
+                raise
+        return self.__livres.get(timeout=timeout)
+
+    def devolve(self, ligacao):
+        try:
+            ligacao.rollback()  # não deixar transações abertas no pool
+        except Exception:
+            with self.__lock:
+                self.__criadas -= 1
+            return
+        self.__livres.put(ligacao)
+
+    def fecha(self):
+        """Fecha as ligações livres (chamado também no fim do processo)."""
+        if self.__pid != os.getpid():
+            return
+        while True:
+            try:
+                ligacao = self.__livres.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                ligacao.fecha_definitivamente()
+            except Exception:
+                pass
@@ -0,0 +1,186 @@
+import os
+
+# ---------------------------------------------------------
+# Tabelas agregadas da tabela de factos (manutenção incremental)
+# ---------------------------------------------------------
+# Com ETL_AGREGADOS=1, cada INSERT/MERGE em viagens copia (OUTPUT ... INTO) as linhas
+# escritas para a tabela temporária #delta_viagens da ligação; antes do commit,
+# aplica_deltas() soma esse delta às tabelas agregadas com um MERGE por agregado
+# (+ valores novos, - valores anteriores das viagens atualizadas pelo upsert), na mesma
+# transação dos factos. Nunca há recálculo completo, exceto quando uma tabela agregada
+# é criada com factos já carregados.
+#
+# Ex. (BI): SELECT ano, mes, SUM(totaltaxas) FROM agg_viagens_mes_empresa_classe GROUP BY ano, mes;
+
+ETL_AGREGADOS = os.getenv("ETL_AGREGADOS", "0") == "1"
+
+TABELA_DELTA = "#delta_viagens"
+
+# Colunas de viagens guardadas no delta: chaves usadas pelos agregados + métricas aditivas
+COLUNAS_DELTA = {
+    "idviagens": "int",
+    "classeduracao_idclasseduracao": "int",
+    "localizacao_idlocalizacao": "int",
+    "tipo_viagem_idtipoviagem": "bigint",
+    "barco_idbarco": "int",
+    "tempo_idtempo": "int",
+    "totaltaxas": "float",
+    "numerocontentores": "int",
+    "pesototalcontentores": "int",
+    "teutotal": "int",
+}
+
+# Métricas de cada agregado: {coluna: (tipo, expressão sobre o delta f com sinal +1/-1)}
+METRICAS_AGREGADAS = {
+    "n_viagens": ("bigint", "SUM(f.sinal)"),
+    "totaltaxas": ("float", "SUM(f.sinal * f.totaltaxas)"),
+    "numerocontentores": ("bigint", "SUM(f.sinal * CAST(f.numerocontentores AS bigint))"),
+    "pesototalcontentores": ("bigint", "SUM(f.sinal * CAST(f.pesototalcontentores AS bigint))"),
+    "teutotal": ("bigint", "SUM(f.sinal * CAST(f.teutotal AS bigint))"),
+}
+
+
+def define_agregado(tabela, chaves, juncoes=()):
+    """
+    Descreve uma tabela agregada.
+    :param chaves: [(coluna, tipo SQL, expressão)] - colunas da chave (grão) do agregado; as
+                   expressões usam f (linhas do delta) e os aliases das juncoes
+    :param juncoes: JOINs às dimensões necessários às expressões (ex.: tempo t, barco b)
+    """
+    return {"tabela": tabela, "chaves": list(chaves), "juncoes": list(juncoes)}
+
+
+AGREGADOS = [
+    # mês (tempo) x empresa (barco -> empresabarco) x classe de duração
+    define_agregado("agg_viagens_mes_empresa_classe",
+                    [("ano", "int", "t.ano"),
+                     ("mes", "int", "t.mes"),
+                     ("empresabarco_idempresa_barco", "int", "b.empresabarco_idempresa_barco"),
+                     ("classeduracao_idclasseduracao", "int", "f.classeduracao_idclasseduracao")],
+                    ["JOIN tempo t ON t.idtempo = f.tempo_idtempo",
+                     "JOIN barco b ON b.idbarco = f.barco_idbarco"]),
+    # localização de origem x tipo de viagem
+    define_agregado("agg_viagens_localizacao_tipo",
+                    [("localizacao_idlocalizacao", "int", "f.localizacao_idlocalizacao"),
+                     ("tipo_viagem_idtipoviagem", "bigint", "f.tipo_viagem_idtipoviagem")]),
+]
+
+
+def clausula_output_delta(upsert=False):
+    """
+    Cláusula OUTPUT ... INTO #delta_viagens a incluir nos INSERT/MERGE de viagens ("" sem ETL_AGREGADOS).
+    No MERGE (upsert=True) guarda também os valores anteriores (deleted.*) das viagens atualizadas.
+    """
+    if not ETL_AGREGADOS:
+        return ""
+    colunas = list(COLUNAS_DELTA)
+    valores = [f"inserted.{c}" for c in colunas]
+    if upsert:
+        colunas += [f"anterior_{c}" for c in COLUNAS_DELTA]
+        valores += [f"deleted.{c}" for c in COLUNAS_DELTA]
+    return f"OUTPUT {', '.join(valores)} INTO {TABELA_DELTA} ({', '.join(colunas)})"
+
+
+def _origem_delta():
+    """Linhas do delta com sinal: +1 valores escritos, -1 valores anteriores (upsert)."""
+    colunas = ", ".join(COLUNAS_DELTA)
+    anteriores = ", ".join(f"anterior_{c}" for c in COLUNAS_DELTA)
+    return f"""
+            SELECT 1 AS sinal, {colunas} FROM {TABELA_DELTA}
+            UNION ALL
+            SELECT -1, {anteriores} FROM {TABELA_DELTA} WHERE anterior_idviagens IS NOT NULL"""
+
+
+def _origem_completa():
+    """Todas as viagens com sinal +1 (preenchimento inicial de um agregado)."""
+    return f"SELECT 1 AS sinal, {', '.join(COLUNAS_DELTA)} FROM viagens"
+
+
+def sql_cria_agregado(spec):
+    colunas = [f"{c} {tipo} NOT NULL" for c, tipo, _ in spec["chaves"]]
+    colunas += [f"{c} {tipo} NOT NULL" for c, (tipo, _) in METRICAS_AGREGADAS.items()]
+    chave = ", ".join(c for c, _, _ in spec["chaves"])
+    return f"CREATE TABLE {spec['tabela']} ({', '.join(colunas)}, PRIMARY KEY ({chave}));"
+
+
+def sql_merge_agregado(spec, origem):
+    """
+    MERGE que agrega as linhas de origem (com sinal) pelo grão do agregado e soma o resultado
+    à tabela: grupos novos são inseridos, os existentes somados e os que ficam sem viagens apagados.
+    """
+    chaves = [c for c, _, _ in spec["chaves"]]
+    expressoes = [e for _, _, e in spec["chaves"]]
+    metricas = list(METRICAS_AGREGADAS)
+    juncao = " AND ".join(f"a.{c} = s.{c}" for c in chaves)
+    return f"""
+        MERGE INTO {spec['tabela']} WITH (HOLDLOCK) AS a
+        USING (
+            SELECT {", ".join(expressoes)}, {", ".join(e for _, e in METRICAS_AGREGADAS.values())}
+            FROM ({origem}) f
+            {" ".join(spec["juncoes"])}
+            GROUP BY {", ".join(expressoes)}
+        ) AS s ({", ".join(chaves + metricas)})
+        ON {juncao}
+        WHEN MATCHED AND a.n_viagens + s.n_viagens = 0 THEN
+            DELETE
+        WHEN MATCHED THEN
+            UPDATE SET {", ".join(f"{c} = a.{c} + s.{c}" for c in metricas)}
+        WHEN NOT MATCHED BY TARGET THEN
+            INSERT ({", ".join(chaves + metricas)})
+            VALUES ({", ".join(f"s.{c}" for c in chaves + metricas)});
+    """
+
+
+SQL_CRIA_DELTA = f"""
+    IF OBJECT_ID('tempdb..{TABELA_DELTA}') IS NULL
+    CREATE TABLE {TABELA_DELTA} (
+        {", ".join(f"{c} {tipo}" for c, tipo in COLUNAS_DELTA.items())},
+        {", ".join(f"anterior_{c} {tipo} NULL" for c, tipo in COLUNAS_DELTA.items())}
+    );
+"""
+
+SQL_MERGE_DELTAS = [sql_merge_agregado(spec, _origem_delta()) for spec in AGREGADOS]
+
+
+def garante_agregados(cur):
+    """
+    Cria as tabelas agregadas que ainda não existam; uma tabela nova é preenchida a partir
+    de todas as viagens já carregadas (único recálculo completo).
+    """
+    for spec in AGREGADOS:
+        cur.execute("SELECT OBJECT_ID(?);", (spec["tabela"],))
+        if cur.fetchone()[0] is None:
+            cur.execute(sql_cria_agregado(spec))
+            cur.execute(sql_merge_agregado(spec, _origem_completa()))
+
+
+def prepara_ligacao(conn):
+    """Prepara uma nova ligação ao DW: tabelas agregadas e #delta_viagens (vive enquanto durar a ligação)."""
+    cur = conn.cursor()
+    garante_agregados(cur)
+    cur.execute(SQL_CRIA_DELTA)
+    conn.commit()  # a criação de #delta_viagens não pode ficar na transação (seria desfeita no rollback)
+    cur.close()
+
+
+def aplica_deltas(cur):
+    """Soma o delta acumulado desde o último commit às tabelas agregadas e limpa-o (chamar antes do commit)."""
+    if not ETL_AGREGADOS:
+        return
+    for sql in SQL_MERGE_DELTAS:
+        cur.execute(sql)
+    cur.execute(f"TRUNCATE TABLE {TABELA_DELTA};")
+
+
+def subtrai_tabela(cur, tabela):
+    """Subtrai às tabelas agregadas as viagens de uma tabela com as colunas de viagens (ex.: mês trocado)."""
+    origem = f"SELECT -1 AS sinal, {', '.join(COLUNAS_DELTA)} FROM {tabela}"
+    for spec in AGREGADOS:
+        cur.execute(sql_merge_agregado(spec, origem))
+
+
+def reconstroi_agregados(cur):
+    """Recalcula todas as tabelas agregadas a partir da tabela de factos (reparação/verificação)."""
+    for spec in AGREGADOS:
+        cur.execute(f"TRUNCATE TABLE {spec['tabela']};")
+        cur.execute(sql_merge_agregado(spec, _origem_completa()))
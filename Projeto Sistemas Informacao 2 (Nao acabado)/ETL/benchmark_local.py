@@ -0,0 +1,407 @@
+import importlib.util
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+import types
+from functools import lru_cache
+
+import pandas as pd
+
+# As métricas JSON lines do ETL não interessam no benchmark (só o resumo abaixo)
+os.environ.setdefault("ETL_METRICAS_JSONL", "")
+
+from acesso_bd import ESTATISTICAS, PoolLigacoes
+from dimensao_historica import ETL_SCD2
+from gerador_dados import GeradorViagens
+from instrumentacao import METRICAS
+
+try:
+    import duckdb
+except ImportError:  # opcional: sem DuckDB só corre o SQLite (estratégias linha a linha)
+    duckdb = None
+
+# ---------------------------------------------------------
+# Benchmark local das estratégias de carga (sem MySQL / SQL Server)
+# ---------------------------------------------------------
+# O DW é criado numa BD embebida (DuckDB ou SQLite, em memória) a partir do
+# ModeloEstrelaSQL.txt; os scripts do ETL são carregados com importlib e o
+# get_mssql_conn() é trocado por um pool de ligações a essa BD. Os comandos T-SQL
+# usados pelos scripts são traduzidos para o dialeto local (traduz_sql).
+# Para cada estratégia e volume: tempo, factos/s e round trips (comandos executados).
+#
+# Configuração (variáveis de ambiente):
+#   BENCH_BD           duckdb | sqlite
+#   BENCH_LINHAS       volumes separados por vírgula (ex.: 10000,1000000,10000000)
+#   BENCH_ESTRATEGIAS  subconjunto de ESTRATEGIAS (por omissão, todas as suportadas pela BD)
+#   BENCH_PASTA        pasta dos CSV sintéticos (reutilizados entre execuções)
+#   BENCH_RESULTADOS   ficheiro JSON com os resultados
+
+PASTA_ETL = os.path.dirname(os.path.abspath(__file__))
+MODELO_ESTRELA = os.path.join(PASTA_ETL, os.pardir, "ModeloEstrelaSQL.txt")
+SCRIPT_CSV = "5 -ETL_CSV_para_DW.py"
+SCRIPT_BD = "3-ETL_BDRelacional_para_DW.py"
+
+BENCH_BD = os.getenv("BENCH_BD", "duckdb" if duckdb else "sqlite")
+BENCH_LINHAS = [int(n) for n in os.getenv("BENCH_LINHAS", "10000").split(",")]
+BENCH_ESTRATEGIAS = [e for e in os.getenv("BENCH_ESTRATEGIAS", "").split(",") if e]
+BENCH_PASTA = os.getenv("BENCH_PASTA", os.path.join(PASTA_ETL, "bench_dados"))
+BENCH_RESULTADOS = os.getenv("BENCH_RESULTADOS", "benchmark_resultados.json")
+BENCH_SEMENTE = int(os.getenv("BENCH_SEMENTE", "2025"))
+
+# Linhas por chamada a carrega_factos_conjuntos nas estratégias do ETL relacional
+LINHAS_POR_CHAMADA_BD = 100_000
+
+# Estratégias de carga: script, valor de ETL_CARGA_CONJUNTOS e BDs locais que a suportam
+# (o SQLite não tem MERGE, usado pela carga por conjuntos).
+ESTRATEGIAS = {
+    "csv_linha": {"script": SCRIPT_CSV, "conjuntos": False, "bds": ("duckdb", "sqlite")},
+    "csv_conjuntos": {"script": SCRIPT_CSV, "conjuntos": True, "bds": ("duckdb",)},
+    "bd_membros": {"script": SCRIPT_BD, "conjuntos": False, "bds": ("duckdb", "sqlite")},
+    "bd_conjuntos": {"script": SCRIPT_BD, "conjuntos": True, "bds": ("duckdb",)},
+}
+
+# Diferenças entre o ModeloEstrelaSQL.txt e o que os scripts escrevem
+COLUNAS_EXTRA = {
+    "viagens": [("viagem_id_origem", "varchar(64)")],
+    "localizacao": [("localizacao_id_origem", "varchar(512)")],
+}
+TIPOS_ALTERADOS = {
+    ("classeduracao", "duracao"): "varchar(10)",  # os scripts guardam a classe ("0-7", "8-15", ...)
+    ("viagens", "totaltaxas"): "float",
+}
+
+
+# ---------------------------------------------------------
+# Esquema do DW a partir do ModeloEstrelaSQL.txt
+# ---------------------------------------------------------
+
+def le_modelo(caminho=MODELO_ESTRELA):
+    """Lê os CREATE TABLE do modelo: {tabela: {"colunas": [(nome, tipo)], "pk": [colunas]}} (as FKs são ignoradas)."""
+    with open(caminho, encoding="utf-8") as ficheiro:
+        texto = ficheiro.read()
+    modelo = {}
+    for tabela, corpo in re.findall(r"CREATE TABLE (\w+) \((.*?)\n\);", texto, flags=re.S):
+        colunas, pk = [], None
+        for linha in corpo.splitlines():
+            linha = linha.strip().rstrip(",")
+            if not linha:
+                continue
+            chave = re.match(r"PRIMARY KEY\(([\w, ]+)\)", linha)
+            if chave:
+                pk = [c.strip() for c in chave.group(1).split(",")]
+                continue
+            nome, tipo = linha.split()[:2]
+            colunas.append((nome, TIPOS_ALTERADOS.get((tabela, nome), tipo)))
+        colunas.extend(COLUNAS_EXTRA.get(tabela, []))
+        modelo[tabela] = {"colunas": colunas, "pk": pk}
+    return modelo
+
+
+def _tipo_local(tipo, dialeto):
+    tipo = tipo.lower()
+    if tipo in ("int", "bigint"):
+        return "INTEGER" if dialeto == "sqlite" else tipo.upper()
+    if tipo.startswith("varchar"):
+        return "TEXT" if dialeto == "sqlite" else "VARCHAR"
+    if tipo.startswith("binary"):
+        return "BLOB"
+    return {"bit": "BOOLEAN", "float": "DOUBLE", "date": "DATE"}.get(tipo, tipo.upper())
+
+
+def ddl_local(modelo, dialeto):
+    """
+    CREATE TABLE no dialeto local. Uma PK de uma só coluna passa a ser gerada automaticamente
+    (como IDENTITY): INTEGER PRIMARY KEY no SQLite, DEFAULT nextval(seq_<tabela>) no DuckDB.
+    """
+    comandos = []
+    for tabela, definicao in modelo.items():
+        colunas = []
+        for nome, tipo in definicao["colunas"]:
+            coluna = f"{nome} {_tipo_local(tipo, dialeto)}"
+            if [nome] == definicao["pk"]:
+                if dialeto == "duckdb":
+                    comandos.append(f"CREATE SEQUENCE seq_{tabela};")
+                    coluna += f" DEFAULT nextval('seq_{tabela}')"
+                coluna += " PRIMARY KEY"
+            colunas.append(coluna)
+        if len(definicao["pk"]) > 1:
+            colunas.append(f"PRIMARY KEY ({', '.join(definicao['pk'])})")
+        comandos.append(f"CREATE TABLE {tabela} ({', '.join(colunas)});")
+    # "Barco Desconhecido" (ID=1), usado pelo ETL CSV quando o barco não existe no DW
+    comandos.append("INSERT INTO empresabarco (idempresa_barco, nome, pais) VALUES (1, 'Desconhecida', '-');")
+    comandos.append("INSERT INTO barco (idbarco, nome, tamanho, tipo, capacidade, empresabarco_idempresa_barco) "
+                    "VALUES (1, 'Barco Desconhecido', 0, '-', 0, 1);")
+    return comandos
+
+
+# ---------------------------------------------------------
+# Ligação local com a interface pyodbc usada pelos scripts
+# ---------------------------------------------------------
+
+TRADUCOES_TSQL = [
+    (r"IF OBJECT_ID\('tempdb\.\.#(\w+)'\) IS NOT NULL DROP TABLE #\w+;", r"DROP TABLE IF EXISTS \1;"),
+    (r"CREATE TABLE #(\w+)", r"CREATE TEMP TABLE \1"),
+    (r"#(\w+)", r"\1"),
+    (r"WITH \((UPDLOCK, )?HOLDLOCK\)", ""),
+    (r"\bISNULL\(", "COALESCE("),
+    (r"\bnvarchar\((\d+|max)\)", "VARCHAR"),
+    (r"\bfloat\b", "DOUBLE"),
+    (r"\bbinary\(\d+\)", "BLOB"),
+]
+
+
+@lru_cache(maxsize=256)
+def traduz_sql(sql, dialeto):
+    """
+    Traduz o T-SQL dos scripts para o dialeto local. Devolve None para os comandos
+    condicionais de DDL (IF COL_LENGTH/IF NOT EXISTS ...), já cobertos por ddl_local().
+    """
+    if sql.lstrip().startswith("IF ") and "DROP TABLE" not in sql:
+        return None
+    for padrao, substituto in TRADUCOES_TSQL:
+        sql = re.sub(padrao, substituto, sql)
+    if dialeto == "sqlite":
+        if re.search(r"\bMERGE\b", sql):
+            raise NotImplementedError("MERGE não é suportado pelo SQLite (usar BENCH_BD=duckdb)")
+        sql = sql.replace("DOUBLE", "REAL").replace("SCOPE_IDENTITY()", "last_insert_rowid()")
+    return sql
+
+
+class CursorLocal(object):
+    """Cursor mínimo (execute/executemany/fetchone/fetchall) sobre a ligação local partilhada."""
+
+    def __init__(self, ligacao):
+        self.__ligacao = ligacao
+        self.__linhas = []
+        self.rowcount = -1
+
+    def execute(self, sql, params=()):
+        self.__linhas = self.__ligacao.executa(sql, params)
+        return self
+
+    def executemany(self, sql, seq_params):
+        self.__ligacao.executa(sql, list(seq_params), muitos=True)
+        self.__linhas = []
+        return self
+
+    def fetchone(self):
+        return self.__linhas.pop(0) if self.__linhas else None
+
+    def fetchall(self):
+        linhas, self.__linhas = self.__linhas, []
+        return linhas
+
+    def close(self):
+        self.__linhas = []
+
+
+class LigacaoLocal(object):
+    """
+    Ligação a uma BD embebida com a interface pyodbc (cursor/commit/rollback/close).
+    Todos os cursores usam a mesma ligação (as tabelas temporárias do DuckDB são por
+    ligação) e os resultados são lidos de imediato. A transação abre no primeiro comando,
+    como no pyodbc com autocommit desligado.
+    """
+
+    def __init__(self, dialeto):
+        self.dialeto = dialeto
+        self.conn = duckdb.connect() if dialeto == "duckdb" else sqlite3.connect(":memory:")
+        self.__em_transacao = False
+        self.__ultima_tabela = None
+        for comando in ddl_local(le_modelo(), dialeto):
+            self.conn.execute(comando)
+        self.conn.commit()
+
+    def executa(self, sql, params, muitos=False):
+        sql_local = traduz_sql(sql, self.dialeto)
+        if sql_local is None:
+            return []
+        inserida = re.match(r"\s*INSERT INTO (\w+)", sql_local)
+        if inserida:
+            self.__ultima_tabela = inserida.group(1)
+        if self.dialeto == "duckdb" and "SCOPE_IDENTITY()" in sql_local:
+            sql_local = sql_local.replace("SCOPE_IDENTITY()", f"currval('seq_{self.__ultima_tabela}')")
+
+        if self.dialeto == "duckdb" and not self.__em_transacao:
+            self.conn.execute("BEGIN TRANSACTION")
+            self.__em_transacao = True
+        if muitos:
+            if params:
+                self.__executa_muitos(sql_local, params)
+            return []
+        resultado = self.conn.execute(sql_local, tuple(params))
+        return [tuple(linha) for linha in resultado.fetchall()] if resultado.description else []
+
+    def __executa_muitos(self, sql_local, params):
+        """
+        executemany. No DuckDB, os INSERT ... VALUES (?, ...) passam a um único INSERT ... SELECT
+        sobre um DataFrame (o executemany do DuckDB executa linha a linha, ao contrário do
+        fast_executemany do pyodbc que os scripts usam no SQL Server).
+        """
+        insert = re.match(r"\s*INSERT INTO (\w+)\s*\(([^)]*)\)\s*VALUES\s*\([?,\s]*\);?\s*$", sql_local)
+        if self.dialeto != "duckdb" or not insert:
+            self.conn.executemany(sql_local, params)
+            return
+        colunas = [c.strip() for c in insert.group(2).split(",")]
+        parametros = pd.DataFrame(params, columns=colunas)
+        self.conn.execute(f"INSERT INTO {insert.group(1)} ({', '.join(colunas)}) SELECT * FROM parametros")
+
+    def cursor(self):
+        return CursorLocal(self)
+
+    def commit(self):
+        if self.dialeto == "sqlite":
+            self.conn.commit()
+        elif self.__em_transacao:
+            self.conn.execute("COMMIT")
+            self.__em_transacao = False
+
+    def rollback(self):
+        if self.dialeto == "sqlite":
+            self.conn.rollback()
+        elif self.__em_transacao:
+            self.conn.execute("ROLLBACK")
+            self.__em_transacao = False
+
+    def close(self):
+        self.conn.close()
+
+
+# ---------------------------------------------------------
+# Carregamento dos scripts do ETL
+# ---------------------------------------------------------
+
+def carrega_script(nome_ficheiro, pool):
+    """
+    Importa um script do ETL (os nomes têm espaços/hífens) e troca o get_mssql_conn() pelo pool local.
+    Os conectores que não estejam instalados são substituídos por módulos vazios (nunca são usados).
+    """
+    for modulo in ("pyodbc", "mysql", "mysql.connector"):
+        try:
+            importlib.import_module(modulo)
+        except ImportError:
+            sys.modules[modulo] = types.ModuleType(modulo)
+    if not hasattr(sys.modules["mysql"], "connector"):
+        sys.modules["mysql"].connector = sys.modules["mysql.connector"]
+
+    nome_modulo = "etl_" + re.sub(r"\W", "_", os.path.splitext(nome_ficheiro)[0])
+    spec = importlib.util.spec_from_file_location(nome_modulo, os.path.join(PASTA_ETL, nome_ficheiro))
+    modulo = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modulo)
+    modulo.get_mssql_conn = pool.obtem
+    return modulo
+
+
+# ---------------------------------------------------------
+# Dados sintéticos
+# ---------------------------------------------------------
+
+def csv_sintetico(n_linhas):
+    """Caminho do CSV sintético com n_linhas (gerado por gerador_dados só se ainda não existir)."""
+    caminho = os.path.join(BENCH_PASTA, f"viagens_{n_linhas}_{BENCH_SEMENTE}.csv")
+    if not os.path.exists(caminho):
+        print(f"A gerar {caminho}...")
+        os.makedirs(BENCH_PASTA, exist_ok=True)
+        GeradorViagens(n_linhas, BENCH_SEMENTE).escreve_csv(caminho)
+    return caminho
+
+
+def linhas_origem_bd(n_linhas, linhas_por_bloco=LINHAS_POR_CHAMADA_BD):
+    """
+    Viagens sintéticas (as mesmas do CSV com a mesma semente) com a forma das linhas
+    devolvidas pela query de extração do MySQL, por blocos.
+    """
+    for bloco in GeradorViagens(n_linhas, BENCH_SEMENTE).blocos(linhas_por_bloco):
+        yield pd.DataFrame({
+            "idviagem": bloco["idviagem"],
+            "data_partida": bloco["data_partida"].dt.date,
+            "data_chegada": bloco["data_chegada"].dt.date,
+            "tipoviagem": bloco["tipobarco"],
+            "pais_origem": bloco["pais_origem"],
+            "cidade_origem": bloco["cidade_origem"],
+            "nomecondutor": bloco["nomecondutor"],
+            "idade": bloco["idadecondutor"],
+            "certificacao": bloco["certificacao"],
+            "nomebarco": bloco["nomebarco"],
+            "tamanho": bloco["tamanhobarco"],
+            "tipobarco": bloco["tipobarco"],
+            "capacidadeteu": bloco["capacidadeteu"],
+            "nomeempresabarco": bloco["nomeempresabarco"],
+            "paisempresabarco": bloco["paisempresabarco"],
+            "totaltaxas_eur": bloco["taxa"],
+            "num_contentores_total": bloco["numerocontentares"],
+            "peso_total_kg": bloco["peso"],
+            "teu_total_calc": bloco["teu"],
+        }).to_dict("records")
+
+
+# ---------------------------------------------------------
+# Execução
+# ---------------------------------------------------------
+
+def executa_estrategia(nome, n_linhas, dialeto=BENCH_BD):
+    """Corre uma estratégia sobre um DW local novo e devolve o resultado (tempo, factos/s, round trips)."""
+    estrategia = ESTRATEGIAS[nome]
+    caminho_csv = csv_sintetico(n_linhas)
+    ligacao = LigacaoLocal(dialeto)
+    pool = PoolLigacoes(lambda: ligacao, tamanho=1)
+    modulo = carrega_script(estrategia["script"], pool)
+    modulo.ETL_CARGA_CONJUNTOS = estrategia["conjuntos"]
+
+    ESTATISTICAS.exporta(limpar=True)
+    METRICAS.exporta(limpar=True)
+    inicio = time.perf_counter()
+    if estrategia["script"] == SCRIPT_CSV:
+        modulo.CSV_PATH = caminho_csv
+        modulo.main_csv_processor()
+    else:
+        sqlsrv_conn = pool.obtem()
+        try:
+            carregadas = 0
+            for rows in linhas_origem_bd(n_linhas):
+                carregadas += modulo.carrega_factos_conjuntos(sqlsrv_conn, sqlsrv_conn.cursor(), rows,
+                                                              primeiro_idviagens=carregadas + 1)
+        finally:
+            sqlsrv_conn.close()
+    segundos = time.perf_counter() - inicio
+
+    factos = ligacao.conn.execute("SELECT COUNT(*) FROM viagens").fetchone()[0]
+    round_trips = ESTATISTICAS.total_chamadas()
+    ligacao.close()
+    return {"estrategia": nome, "bd": dialeto, "linhas": n_linhas, "factos": factos,
+            "segundos": round(segundos, 3), "factos_s": round(factos / segundos, 1) if segundos else None,
+            "round_trips": round_trips, "round_trips_por_facto": round(round_trips / factos, 4) if factos else None}
+
+
+def main_benchmark():
+    if BENCH_BD == "duckdb" and duckdb is None:
+        print("ERRO: BENCH_BD=duckdb mas o pacote duckdb não está instalado.")
+        sys.exit(1)
+    estrategias = BENCH_ESTRATEGIAS or [n for n, e in ESTRATEGIAS.items() if BENCH_BD in e["bds"]]
+    resultados = []
+    for n_linhas in BENCH_LINHAS:
+        for nome in estrategias:
+            if BENCH_BD not in ESTRATEGIAS[nome]["bds"]:
+                print(f"{nome}: não suportada em {BENCH_BD} (ignorada)")
+                continue
+            if ETL_SCD2 and not ESTRATEGIAS[nome]["conjuntos"]:
+                print(f"{nome}: ETL_SCD2 requer a carga por conjuntos (ignorada)")
+                continue
+            print(f"=== {nome} / {n_linhas} linhas / {BENCH_BD} ===")
+            resultados.append(executa_estrategia(nome, n_linhas))
+
+    print(f"{'estratégia':<16}{'linhas':>11}{'factos':>11}{'tempo(s)':>10}{'factos/s':>11}{'round trips':>13}"
+          f"{'rt/facto':>10}")
+    for r in resultados:
+        print(f"{r['estrategia']:<16}{r['linhas']:>11}{r['factos']:>11}{r['segundos']:>10.2f}"
+              f"{r['factos_s'] or 0:>11.0f}{r['round_trips']:>13}{r['round_trips_por_facto'] or 0:>10.3f}")
+    with open(BENCH_RESULTADOS, mode="w", encoding="utf-8") as ficheiro:
+        json.dump(resultados, ficheiro, indent=2)
+    print(f"Resultados escritos em {BENCH_RESULTADOS}")
+
+
+if __name__ == "__main__":
+    main_benchmark()
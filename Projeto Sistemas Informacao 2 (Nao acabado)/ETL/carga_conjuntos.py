@@ -0,0 +1,176 @@
+import os
+
+from dimensao_historica import DATA_VERSAO, ETL_SCD2, hash_membro, sql_expira_versoes, versao_atual
+
+# ---------------------------------------------------------
+# Resolução das dimensões por conjuntos (staging + MERGE)
+# ---------------------------------------------------------
+# Em vez de SELECT / INSERT / SCOPE_IDENTITY() por linha, os membros distintos de
+# um lote são copiados em massa (fast_executemany) para uma tabela temporária,
+# um único MERGE insere os que faltam e um único JOIN devolve todas as SKs.
+# Nº de round trips por lote = O(dimensões), em vez de O(linhas x dimensões).
+
+ETL_CARGA_CONJUNTOS = os.getenv("ETL_CARGA_CONJUNTOS", "0") == "1"
+
+# Tipo SQL das colunas de staging (as restantes são texto)
+TIPOS_SQL = {
+    "data_completa": "date",
+    "idade": "int",
+    "tamanho": "int",
+    "capacidade": "int",
+    "empresabarco_idempresa_barco": "int",
+    "valido_de": "date",
+    "hash_atributos": "binary(16)",
+}
+TIPO_SQL_TEXTO = "nvarchar(512)"
+
+
+def define_dimensao(tabela, sk, naturais, atributos=(), derivadas=None, identity=False, so_leitura=False,
+                    historico=False):
+    """
+    Descreve uma dimensão do DW para a carga por conjuntos.
+    :param tabela: nome da tabela da dimensão
+    :param sk: coluna da chave substituta
+    :param naturais: colunas da chave natural (pela ordem dos tuplos das chaves)
+    :param atributos: restantes colunas copiadas da staging no INSERT
+    :param derivadas: {coluna: expressão SQL sobre s.<coluna>} calculadas no próprio MERGE
+    :param identity: True se a SK é IDENTITY; caso contrário é gerada como MAX(sk) + ROW_NUMBER()
+    :param so_leitura: só faz o JOIN (membros inexistentes ficam sem SK), sem MERGE
+    :param historico: dimensão SCD tipo 2 (dimensao_historica): só a versão atual é lida e,
+                      com ETL_SCD2, os membros com atributos alterados ganham uma nova versão
+    """
+    return {
+        "tabela": tabela, "sk": sk, "naturais": tuple(naturais), "atributos": tuple(atributos),
+        "derivadas": dict(derivadas or {}), "identity": identity, "so_leitura": so_leitura,
+        "historico": historico,
+    }
+
+
+# Atributos derivados da data na dimensão tempo
+DERIVADAS_TEMPO = {
+    "ano": "YEAR(s.data_completa)",
+    "mes": "MONTH(s.data_completa)",
+    "semestre": "CASE WHEN MONTH(s.data_completa) <= 6 THEN 1 ELSE 2 END",
+    "trimestre": "(MONTH(s.data_completa) - 1) / 3 + 1",
+}
+
+
+def _staging(spec):
+    return f"#stg_{spec['tabela']}"
+
+
+def _versiona(spec):
+    return spec["historico"] and ETL_SCD2 and not spec["so_leitura"]
+
+
+def _colunas_staging(spec):
+    versao = ("hash_atributos", "valido_de") if _versiona(spec) else ()
+    return spec["naturais"] + spec["atributos"] + versao
+
+
+def _juncao_naturais(spec):
+    """Condição dimensão d x staging s pela chave natural (só a versão atual, nas dimensões com histórico)."""
+    juncao = " AND ".join(f"d.{c} = s.{c}" for c in spec["naturais"])
+    return juncao + versao_atual("d") if spec["historico"] else juncao
+
+
+def cria_staging(cur, spec):
+    """(Re)cria a tabela temporária de staging da dimensão (vive enquanto durar a ligação)."""
+    staging = _staging(spec)
+    colunas = ", ".join(f"{c} {TIPOS_SQL.get(c, TIPO_SQL_TEXTO)}" for c in _colunas_staging(spec))
+    cur.execute(f"IF OBJECT_ID('tempdb..{staging}') IS NOT NULL DROP TABLE {staging};")
+    cur.execute(f"CREATE TABLE {staging} ({colunas});")
+
+
+def sql_merge(spec):
+    """MERGE que insere na dimensão os membros da staging que ainda não existem (sem versão atual)."""
+    tabela, sk, staging = spec["tabela"], spec["sk"], _staging(spec)
+    juncao = _juncao_naturais(spec)
+    colunas_destino = list(_colunas_staging(spec)) + list(spec["derivadas"])
+    valores = [f"s.{c}" for c in _colunas_staging(spec)] + list(spec["derivadas"].values())
+
+    if spec["identity"]:
+        origem = f"SELECT DISTINCT * FROM {staging}"
+    else:
+        # PK explícita: novas SKs contíguas a seguir ao MAX atual (com lock para não colidir)
+        colunas_stg = ", ".join(f"s.{c}" for c in _colunas_staging(spec))
+        origem = f"""
+            SELECT {colunas_stg},
+                   base.max_id + ROW_NUMBER() OVER (ORDER BY (SELECT NULL)) AS {sk}
+            FROM (SELECT DISTINCT * FROM {staging}) s
+            CROSS JOIN (SELECT ISNULL(MAX({sk}), 0) AS max_id FROM {tabela} WITH (UPDLOCK, HOLDLOCK)) base
+            WHERE NOT EXISTS (SELECT 1 FROM {tabela} d WHERE {juncao})"""
+        colunas_destino.insert(0, sk)
+        valores.insert(0, f"s.{sk}")
+
+    return f"""
+        MERGE INTO {tabela} AS d
+        USING ({origem}) AS s
+        ON {juncao}
+        WHEN NOT MATCHED BY TARGET THEN
+            INSERT ({", ".join(colunas_destino)})
+            VALUES ({", ".join(valores)});
+    """
+
+
+def sql_leitura_chaves(spec):
+    """JOIN staging x dimensão que devolve (naturais..., sk) de todos os membros do lote."""
+    juncao = _juncao_naturais(spec)
+    naturais = ", ".join(f"s.{c}" for c in spec["naturais"])
+    return f"""
+        SELECT DISTINCT {naturais}, d.{spec['sk']}
+        FROM {_staging(spec)} s
+        JOIN {spec['tabela']} d ON {juncao};
+    """
+
+
+def resolve_dimensao(cur, spec, membros):
+    """
+    Resolve as SKs de um conjunto de membros de uma dimensão com 3 comandos
+    (cópia para staging, MERGE, leitura por JOIN). Nas dimensões versionadas (ETL_SCD2), um
+    4.º comando fecha antes do MERGE as versões atuais dos membros com atributos alterados.
+    :param membros: lista de tuplos com as colunas naturais seguidas dos atributos
+    :return: {chave natural: SK}; a chave é um tuplo ou, com uma só coluna natural, o valor
+    """
+    if not membros:
+        return {}
+
+    cria_staging(cur, spec)
+    colunas = _colunas_staging(spec)
+    if _versiona(spec):
+        membros = [(*m, hash_membro(spec, m), DATA_VERSAO) for m in membros]
+    cur.executemany(f"INSERT INTO {_staging(spec)} ({', '.join(colunas)}) VALUES ({', '.join('?' * len(colunas))});",
+                    [tuple(m) for m in membros])
+    if _versiona(spec):
+        cur.execute(sql_expira_versoes(spec, _staging(spec)), (DATA_VERSAO,))
+    if not spec["so_leitura"]:
+        cur.execute(sql_merge(spec))
+
+    cur.execute(sql_leitura_chaves(spec))
+    n_naturais = len(spec["naturais"])
+    chaves = {}
+    for row in cur.fetchall():
+        natural = tuple(row[:n_naturais]) if n_naturais > 1 else row[0]
+        chaves[natural] = row[n_naturais]
+    return chaves
+
+
+def resolve_dimensao_em_cache(cur, spec, membros, chaves, hashes):
+    """
+    resolve_dimensao() só dos membros que não estão na cache da execução. Nas dimensões
+    versionadas (ETL_SCD2), um membro em cache volta a ser resolvido se o hash dos seus
+    atributos mudou; os inalterados nem chegam ao SQL Server.
+    :param membros: {chave natural: tuplo de staging (naturais seguidas dos atributos)}
+    :param chaves: {chave natural: SK} da dimensão, atualizado no local (None se não resolvida)
+    :param hashes: {chave natural: hash da versão atual} da dimensão, atualizado no local
+    :return: {chave natural: tuplo} dos membros resolvidos agora
+    """
+    versionada = _versiona(spec)
+    novos = {natural: linha for natural, linha in membros.items()
+             if natural not in chaves or (versionada and hashes.get(natural) != hash_membro(spec, linha))}
+    resolvidas = resolve_dimensao(cur, spec, list(novos.values()))
+    for natural, linha in novos.items():
+        chaves[natural] = resolvidas.get(natural)
+        if versionada:
+            hashes[natural] = hash_membro(spec, linha)
+    return novos
@@ -0,0 +1,358 @@
+import json
+import os
+import statistics
+import time
+from datetime import date
+
+import pyodbc
+
+from agregados import ETL_AGREGADOS, subtrai_tabela
+from dimensao_tempo import CALENDARIO_FIM, CALENDARIO_INICIO, chave_tempo, verifica_chaves_calendario
+
+# ---------------------------------------------------------
+# Desenho físico da tabela de factos (SQL Server)
+# ---------------------------------------------------------
+# - Particionamento mensal de viagens por tempo_idtempo (função pf_viagens_mes, RANGE RIGHT
+#   no 1.º dia de cada mês). Requer as chaves yyyymmdd do calendário (ETL_TEMPO_CALENDARIO).
+# - Índice columnstore clustered alinhado com as partições. É criado primeiro um índice
+#   rowstore em tempo_idtempo e depois convertido (DROP_EXISTING), para os rowgroups ficarem
+#   ordenados por data e as consultas por intervalo eliminarem segmentos.
+# - A PK passa a NONCLUSTERED (idviagens, tempo_idtempo) e o índice único da chave de origem
+#   inclui tempo_idtempo: os índices únicos de uma tabela particionada têm de conter a coluna de
+#   partição para ficarem alinhados (condição para a troca de partições).
+#   Atenção: alinhado, o índice já não garante viagem_id_origem única na tabela (só por dia).
+#   O upsert dos factos (MERGE em viagem_id_origem) continua a não duplicar; na troca de
+#   partições, troca_particao_mes apaga da carga as origens repetidas antes do SWITCH.
+# - Troca de partições (ETL_TROCA_PARTICOES=1): o mês é carregado numa tabela de carga com a
+#   mesma estrutura e um CHECK do intervalo do mês, e entra em viagens com ALTER TABLE ... SWITCH
+#   (só metadados); o mês anterior sai para viagens_saida. Só deve ser usada num DW em que cada
+#   mês vem de uma única origem (a troca substitui o mês inteiro).
+#
+# Uso: DESENHO_ACAO=aplica python desenho_fisico.py   (consultas antes/depois + aplicação)
+#      DESENHO_ACAO=consultas python desenho_fisico.py (só o benchmark das consultas)
+
+ETL_TROCA_PARTICOES = os.getenv("ETL_TROCA_PARTICOES", "0") == "1"
+
+FUNCAO_PARTICAO = "pf_viagens_mes"
+ESQUEMA_PARTICAO = "ps_viagens_mes"
+INDICE_COLUMNSTORE = "cci_viagens"
+PK_VIAGENS = "pk_viagens"
+INDICE_ORIGEM = "ux_viagens_id_origem"
+TABELA_CARGA = "viagens_carga"  # mês a entrar por troca de partição
+TABELA_SAIDA = "viagens_saida"  # mês substituído (esvaziada a cada troca)
+
+# Tipos de índice em sys.indexes
+TIPO_CLUSTERED_COLUMNSTORE = 5
+
+
+def fronteiras_mensais(inicio, fim):
+    """Chaves yyyymmdd do 1.º dia de cada mês de inicio a fim (inclusive), para a função de partição."""
+    fronteiras = []
+    ano, mes = inicio.year, inicio.month
+    while (ano, mes) <= (fim.year, fim.month):
+        fronteiras.append(chave_tempo(date(ano, mes, 1)))
+        ano, mes = (ano + 1, 1) if mes == 12 else (ano, mes + 1)
+    return fronteiras
+
+
+def intervalo_mes(id_tempo):
+    """[início, fim[ em chaves yyyymmdd do mês de id_tempo."""
+    ano, mes = id_tempo // 10000, id_tempo // 100 % 100
+    seguinte = (ano + 1, 1) if mes == 12 else (ano, mes + 1)
+    return ano * 10000 + mes * 100 + 1, seguinte[0] * 10000 + seguinte[1] * 100 + 1
+
+
+def _existe(cur, sql, params=()):
+    cur.execute(sql, params)
+    return cur.fetchone() is not None
+
+
+def fronteiras_existentes(cur):
+    cur.execute("""
+                SELECT CAST(v.value AS int)
+                FROM sys.partition_range_values v
+                JOIN sys.partition_functions f ON f.function_id = v.function_id
+                WHERE f.name = ?
+                ORDER BY v.boundary_id
+                """, (FUNCAO_PARTICAO,))
+    return [r[0] for r in cur.fetchall()]
+
+
+def garante_particionamento(cur, inicio=CALENDARIO_INICIO, fim=CALENDARIO_FIM):
+    """Cria a função e o esquema de partição mensais, ou acrescenta os meses em falta até fim."""
+    fronteiras = fronteiras_mensais(inicio, fim)
+    if not _existe(cur, "SELECT 1 FROM sys.partition_functions WHERE name = ?", (FUNCAO_PARTICAO,)):
+        cur.execute(f"CREATE PARTITION FUNCTION {FUNCAO_PARTICAO} (int) "
+                    f"AS RANGE RIGHT FOR VALUES ({', '.join(map(str, fronteiras))});")
+        cur.execute(f"CREATE PARTITION SCHEME {ESQUEMA_PARTICAO} "
+                    f"AS PARTITION {FUNCAO_PARTICAO} ALL TO ([PRIMARY]);")
+        return len(fronteiras)
+    return estende_particoes(cur, fim)
+
+
+def estende_particoes(cur, fim):
+    """
+    Acrescenta (SPLIT) as fronteiras mensais depois da última existente até fim. A última
+    partição está vazia enquanto o calendário cobrir os dados, por isso o SPLIT não move linhas.
+    """
+    existentes = fronteiras_existentes(cur)
+    ultima = existentes[-1] if existentes else chave_tempo(CALENDARIO_INICIO)
+    novas = [f for f in fronteiras_mensais(date(ultima // 10000, ultima // 100 % 100, 1), fim) if f > ultima]
+    for fronteira in novas:
+        cur.execute(f"ALTER PARTITION SCHEME {ESQUEMA_PARTICAO} NEXT USED [PRIMARY];")
+        cur.execute(f"ALTER PARTITION FUNCTION {FUNCAO_PARTICAO}() SPLIT RANGE ({fronteira});")
+    return len(novas)
+
+
+def tem_columnstore(cur, tabela="viagens"):
+    return _existe(cur, "SELECT 1 FROM sys.indexes WHERE object_id = OBJECT_ID(?) AND type = ?",
+                   (tabela, TIPO_CLUSTERED_COLUMNSTORE))
+
+
+def _tem_coluna_origem(cur, tabela):
+    cur.execute("SELECT COL_LENGTH(?, 'viagem_id_origem');", (tabela,))
+    return cur.fetchone()[0] is not None
+
+
+def _cria_indices_alinhados(cur, tabela, sufixo="", esquema=True):
+    """
+    PK NONCLUSTERED e índice único da chave de origem, ambos com tempo_idtempo (alinhados).
+    O índice da chave de origem só impede repetições no mesmo tempo_idtempo.
+    """
+    destino = f" ON {ESQUEMA_PARTICAO}(tempo_idtempo)" if esquema else ""
+    cur.execute(f"ALTER TABLE {tabela} ADD CONSTRAINT {PK_VIAGENS}{sufixo} "
+                f"PRIMARY KEY NONCLUSTERED (idviagens, tempo_idtempo){destino};")
+    if _tem_coluna_origem(cur, tabela):
+        cur.execute(f"CREATE UNIQUE INDEX {INDICE_ORIGEM}{sufixo} ON {tabela} (viagem_id_origem, tempo_idtempo) "
+                    f"WHERE viagem_id_origem IS NOT NULL{destino};")
+
+
+def aplica_desenho(cur):
+    """
+    Converte viagens para columnstore clustered particionado por mês (idempotente).
+    Devolve False se a tabela já estava convertida.
+    """
+    verifica_chaves_calendario(cur)
+    cur.execute("SELECT MIN(tempo_idtempo), MAX(tempo_idtempo) FROM viagens;")
+    minimo, maximo = cur.fetchone()
+    inicio, fim = CALENDARIO_INICIO, CALENDARIO_FIM
+    if minimo is not None:
+        inicio = min(inicio, date(minimo // 10000, minimo // 100 % 100, 1))
+        fim = max(fim, date(maximo // 10000, maximo // 100 % 100, 1))
+    garante_particionamento(cur, inicio, fim)
+    if tem_columnstore(cur):
+        return False
+
+    # Índices não alinhados (o índice único da chave de origem e a PK clustered) saem primeiro
+    if _existe(cur, "SELECT 1 FROM sys.indexes WHERE object_id = OBJECT_ID('viagens') AND name = ?",
+               (INDICE_ORIGEM,)):
+        cur.execute(f"DROP INDEX {INDICE_ORIGEM} ON viagens;")
+    cur.execute("SELECT name FROM sys.key_constraints WHERE parent_object_id = OBJECT_ID('viagens') AND type = 'PK';")
+    pk = cur.fetchone()
+    if pk:
+        cur.execute(f"ALTER TABLE viagens DROP CONSTRAINT [{pk[0]}];")
+
+    cur.execute(f"CREATE CLUSTERED INDEX {INDICE_COLUMNSTORE} ON viagens (tempo_idtempo) "
+                f"ON {ESQUEMA_PARTICAO}(tempo_idtempo);")
+    cur.execute(f"CREATE CLUSTERED COLUMNSTORE INDEX {INDICE_COLUMNSTORE} ON viagens "
+                f"WITH (DROP_EXISTING = ON, MAXDOP = 1) ON {ESQUEMA_PARTICAO}(tempo_idtempo);")
+    _cria_indices_alinhados(cur, "viagens")
+    return True
+
+
+# ---------------------------------------------------------
+# Troca de partições (cargas por mês)
+# ---------------------------------------------------------
+
+def _chaves_estrangeiras(cur, tabela="viagens"):
+    """[(nome, coluna, tabela referenciada, coluna referenciada)] das FKs de uma tabela."""
+    cur.execute("""
+                SELECT fk.name, c.name, OBJECT_NAME(fkc.referenced_object_id), rc.name
+                FROM sys.foreign_keys fk
+                JOIN sys.foreign_key_columns fkc ON fkc.constraint_object_id = fk.object_id
+                JOIN sys.columns c ON c.object_id = fkc.parent_object_id AND c.column_id = fkc.parent_column_id
+                JOIN sys.columns rc ON rc.object_id = fkc.referenced_object_id
+                                   AND rc.column_id = fkc.referenced_column_id
+                WHERE fk.parent_object_id = OBJECT_ID(?)
+                """, (tabela,))
+    return [tuple(r) for r in cur.fetchall()]
+
+
+def cria_tabela_troca(cur, tabela, id_tempo):
+    """
+    (Re)cria uma tabela com a estrutura de viagens para trocar com a partição do mês de id_tempo:
+    mesmas colunas, columnstore, índices alinhados, FKs e um CHECK com o intervalo do mês.
+    """
+    inicio, fim = intervalo_mes(id_tempo)
+    cur.execute(f"IF OBJECT_ID('{tabela}') IS NOT NULL DROP TABLE {tabela};")
+    cur.execute(f"SELECT TOP (0) * INTO {tabela} FROM viagens;")
+    cur.execute(f"CREATE CLUSTERED COLUMNSTORE INDEX {INDICE_COLUMNSTORE}_{tabela} ON {tabela};")
+    _cria_indices_alinhados(cur, tabela, sufixo=f"_{tabela}", esquema=False)
+    for nome, coluna, referenciada, coluna_referenciada in _chaves_estrangeiras(cur):
+        cur.execute(f"ALTER TABLE {tabela} ADD CONSTRAINT {nome}_{tabela} FOREIGN KEY ({coluna}) "
+                    f"REFERENCES {referenciada} ({coluna_referenciada});")
+    cur.execute(f"ALTER TABLE {tabela} WITH CHECK ADD CONSTRAINT ck_{tabela}_mes "
+                f"CHECK (tempo_idtempo >= {inicio} AND tempo_idtempo < {fim} AND tempo_idtempo IS NOT NULL);")
+
+
+def numero_particao(cur, id_tempo):
+    cur.execute(f"SELECT $PARTITION.{FUNCAO_PARTICAO}(?);", (id_tempo,))
+    return cur.fetchone()[0]
+
+
+def remove_origens_repetidas(cur, tabela_carga, id_tempo):
+    """
+    Apaga de tabela_carga as viagens cuja viagem_id_origem já existe em viagens noutro mês (fica a
+    existente) ou se repete na própria carga (fica a de maior idviagens), porque o índice alinhado
+    não o impede. Devolve o nº de viagens apagadas.
+    """
+    if not _tem_coluna_origem(cur, tabela_carga):
+        return 0
+    inicio, fim = intervalo_mes(id_tempo)
+    cur.execute(f"""
+                DELETE c FROM {tabela_carga} c
+                WHERE c.viagem_id_origem IS NOT NULL
+                  AND EXISTS (SELECT 1 FROM viagens v
+                              WHERE v.viagem_id_origem = c.viagem_id_origem
+                                AND (v.tempo_idtempo < ? OR v.tempo_idtempo >= ?))
+                """, (inicio, fim))
+    apagadas = max(cur.rowcount, 0)
+    cur.execute(f"""
+                WITH repetidas AS (
+                    SELECT ROW_NUMBER() OVER (PARTITION BY viagem_id_origem ORDER BY idviagens DESC) AS ordem
+                    FROM {tabela_carga}
+                    WHERE viagem_id_origem IS NOT NULL)
+                DELETE FROM repetidas WHERE ordem > 1
+                """)
+    return apagadas + max(cur.rowcount, 0)
+
+
+def troca_particao_mes(cur, tabela_carga, id_tempo):
+    """
+    Substitui o mês de id_tempo em viagens pelo conteúdo de tabela_carga (criada com
+    cria_tabela_troca): o mês atual sai para TABELA_SAIDA e a carga entra, ambos por SWITCH.
+    Antes, as origens repetidas saem da carga (remove_origens_repetidas).
+    Com ETL_AGREGADOS, as viagens que saem são subtraídas das tabelas agregadas.
+    Devolve (nº de viagens substituídas, nº de viagens da carga descartadas por origem repetida).
+    O commit fica a cargo de quem chama.
+    """
+    descartadas = remove_origens_repetidas(cur, tabela_carga, id_tempo)
+    particao = numero_particao(cur, id_tempo)
+    cria_tabela_troca(cur, TABELA_SAIDA, id_tempo)
+    cur.execute(f"ALTER TABLE viagens SWITCH PARTITION {particao} TO {TABELA_SAIDA};")
+    cur.execute(f"SELECT COUNT(*) FROM {TABELA_SAIDA};")
+    substituidas = cur.fetchone()[0]
+    if ETL_AGREGADOS and substituidas:
+        subtrai_tabela(cur, TABELA_SAIDA)
+    cur.execute(f"ALTER TABLE {tabela_carga} SWITCH TO viagens PARTITION {particao};")
+    cur.execute(f"DROP TABLE {TABELA_SAIDA};")
+    return substituidas, descartadas
+
+
+# ---------------------------------------------------------
+# Benchmark das consultas analíticas
+# ---------------------------------------------------------
+
+# Consultas típicas dos dashboards ({tabela} = tabela de factos)
+CONSULTAS_ANALITICAS = {
+    "taxas_por_mes": """
+        SELECT t.ano, t.mes, COUNT(*), SUM(v.totaltaxas), SUM(v.teutotal)
+        FROM {tabela} v JOIN tempo t ON t.idtempo = v.tempo_idtempo
+        GROUP BY t.ano, t.mes""",
+    "empresa_x_classe": """
+        SELECT b.empresabarco_idempresa_barco, v.classeduracao_idclasseduracao,
+               COUNT(*), SUM(v.totaltaxas), SUM(v.numerocontentores)
+        FROM {tabela} v JOIN barco b ON b.idbarco = v.barco_idbarco
+        GROUP BY b.empresabarco_idempresa_barco, v.classeduracao_idclasseduracao""",
+    "localizacao_x_tipo_um_ano": """
+        SELECT v.localizacao_idlocalizacao, v.tipo_viagem_idtipoviagem, COUNT(*), SUM(v.totaltaxas)
+        FROM {tabela} v
+        WHERE v.tempo_idtempo >= 20240101 AND v.tempo_idtempo < 20250101
+        GROUP BY v.localizacao_idlocalizacao, v.tipo_viagem_idtipoviagem""",
+    "top_barcos_trimestre": """
+        SELECT TOP (10) v.barco_idbarco, SUM(v.totaltaxas) AS taxas
+        FROM {tabela} v
+        WHERE v.tempo_idtempo >= 20240401 AND v.tempo_idtempo < 20240701
+        GROUP BY v.barco_idbarco
+        ORDER BY taxas DESC""",
+}
+
+
+def tamanho_tabela(cur, tabela="viagens"):
+    """(linhas, KB reservados) segundo sp_spaceused."""
+    cur.execute("EXEC sp_spaceused ?;", (tabela,))
+    _, linhas, reservado = cur.fetchone()[:3]
+    return int(linhas), int(str(reservado).split()[0])
+
+
+def benchmark_consultas(cur, tabela="viagens", repeticoes=5):
+    """
+    Corre cada consulta de CONSULTAS_ANALITICAS repeticoes vezes (cache quente) e devolve
+    {consulta: {"mediana_ms", "minimo_ms", "linhas"}}.
+    """
+    resultados = {}
+    for nome, sql in CONSULTAS_ANALITICAS.items():
+        tempos = []
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            cur.execute(sql.format(tabela=tabela))
+            linhas = len(cur.fetchall())
+            tempos.append(1000 * (time.perf_counter() - inicio))
+        resultados[nome] = {"mediana_ms": round(statistics.median(tempos), 2), "minimo_ms": round(min(tempos), 2),
+                            "linhas": linhas}
+    return resultados
+
+
+def imprime_comparacao(antes, depois):
+    print(f"    {'consulta':<28}{'antes(ms)':>11}{'depois(ms)':>12}{'ganho':>8}")
+    for nome in CONSULTAS_ANALITICAS:
+        a, d = antes[nome]["mediana_ms"], depois[nome]["mediana_ms"]
+        print(f"    {nome:<28}{a:>11.1f}{d:>12.1f}{a / d if d else 0:>7.1f}x")
+
+
+# ---------------------------------------------------------
+# Execução direta (ligação própria ao DW, com as mesmas variáveis dos ETL)
+# ---------------------------------------------------------
+
+DESENHO_ACAO = os.getenv("DESENHO_ACAO", "consultas")
+DESENHO_RESULTADOS = os.getenv("DESENHO_RESULTADOS", "desenho_fisico_resultados.json")
+
+
+def liga_dw():
+    conn_str = (
+        f"DRIVER={{{os.getenv('MSSQL_DRIVER', 'ODBC Driver 18 for SQL Server')}}};"
+        f"SERVER={os.getenv('MSSQL_HOST', '127.0.0.1')},{os.getenv('MSSQL_PORT', '1433')};"
+        f"DATABASE={os.getenv('MSSQL_DB', 'TP_G2_Viagens')};UID={os.getenv('MSSQL_USER', 'sa')};"
+        f"PWD={os.getenv('MSSQL_PWD', 'root2025')};TrustServerCertificate=Yes;"
+    )
+    return pyodbc.connect(conn_str)
+
+
+def main_desenho(acao=DESENHO_ACAO):
+    conn = liga_dw()
+    try:
+        cur = conn.cursor()
+        linhas, kb = tamanho_tabela(cur)
+        print(f"viagens: {linhas} linhas, {kb} KB ({'columnstore' if tem_columnstore(cur) else 'rowstore'})")
+        resultados = {"antes": benchmark_consultas(cur), "tamanho_antes_kb": kb}
+        if acao == "aplica":
+            print("A converter viagens para columnstore particionado por mês...")
+            inicio = time.perf_counter()
+            convertida = aplica_desenho(cur)
+            conn.commit()
+            print(f"{'Convertida' if convertida else 'Já estava convertida'} em {time.perf_counter() - inicio:.1f}s")
+            resultados["depois"] = benchmark_consultas(cur)
+            resultados["tamanho_depois_kb"] = tamanho_tabela(cur)[1]
+            imprime_comparacao(resultados["antes"], resultados["depois"])
+            print(f"Tamanho: {kb} KB -> {resultados['tamanho_depois_kb']} KB")
+        else:
+            for nome, r in resultados["antes"].items():
+                print(f"    {nome:<28}{r['mediana_ms']:>11.1f} ms ({r['linhas']} linhas)")
+        with open(DESENHO_RESULTADOS, mode="w", encoding="utf-8") as ficheiro:
+            json.dump(resultados, ficheiro, indent=2)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main_desenho()
@@ -0,0 +1,93 @@
+import hashlib
+import os
+from datetime import date
+
+# ---------------------------------------------------------
+# Dimensões com histórico (SCD tipo 2): condutor e barco
+# ---------------------------------------------------------
+# Cada versão de um membro tem valido_de / valido_ate (NULL = versão atual) e o hash dos
+# seus atributos (hash_atributos, 16 bytes). Com ETL_SCD2=1, a carga por conjuntos
+# (carga_conjuntos.resolve_dimensao) copia para a staging o hash de cada membro do lote;
+# um único UPDATE fecha as versões atuais com hash diferente e o MERGE habitual insere
+# a nova versão dos membros alterados (os restantes mantêm a SK). Nos dois ETLs o hash da
+# versão atual fica numa cache própria ({dimensão: {chave natural: hash}}), passada ao lado
+# da cache de chaves (carga_conjuntos.resolve_dimensao_em_cache), pelo que os membros
+# inalterados nem chegam ao SQL Server.
+# Os factos carregados referenciam sempre a versão atual no momento da carga.
+
+ETL_SCD2 = os.getenv("ETL_SCD2", "0") == "1"
+
+# Data de início das novas versões (e de fim das substituídas); por omissão, a data da carga
+DATA_VERSAO = date.fromisoformat(os.getenv("ETL_SCD2_DATA", date.today().isoformat()))
+
+# Colunas de versão das dimensões com histórico (ModeloEstrelaSQL.txt)
+COLUNAS_VERSAO = {
+    "valido_de": "date",
+    "valido_ate": "date",
+    "hash_atributos": "binary(16)",
+}
+
+
+def verifica_requisitos(carga_conjuntos):
+    """Falha à entrada do ETL se ETL_SCD2 estiver ligado sem a carga por conjuntos."""
+    if ETL_SCD2 and not carga_conjuntos:
+        raise ValueError("ETL_SCD2 requer ETL_CARGA_CONJUNTOS=1 (as versões são criadas pela carga por conjuntos)")
+
+
+def hash_atributos(valores):
+    """Hash (16 bytes) dos atributos de um membro, pela ordem dos atributos da dimensão."""
+    texto = "\x1f".join("" if v is None else str(v) for v in valores)
+    return hashlib.blake2b(texto.encode("utf-8"), digest_size=16).digest()
+
+
+def hash_membro(spec, membro):
+    """Hash dos atributos de uma linha de staging (naturais seguidas dos atributos) de spec."""
+    return hash_atributos(membro[len(spec["naturais"]):])
+
+
+def versao_atual(alias=""):
+    """
+    Predicado " AND [alias.]valido_ate IS NULL" que restringe as consultas à versão atual dos membros.
+    Vazio sem ETL_SCD2: as colunas de versão só existem depois de prepara_historico (um DW sem histórico
+    não as tem). Um DW que já tem versões deve continuar a correr com ETL_SCD2=1.
+    """
+    prefixo = f"{alias}." if alias else ""
+    return f" AND {prefixo}valido_ate IS NULL" if ETL_SCD2 else ""
+
+
+def sql_expira_versoes(spec, staging):
+    """UPDATE que fecha (valido_ate = ?) as versões atuais cujo hash difere do membro na staging."""
+    tabela = spec["tabela"]
+    juncao = " AND ".join(f"s.{c} = {tabela}.{c}" for c in spec["naturais"])
+    return f"""
+        UPDATE {tabela} SET valido_ate = ?
+        WHERE valido_ate IS NULL
+          AND EXISTS (SELECT 1 FROM {staging} s
+                      WHERE {juncao} AND s.hash_atributos <> {tabela}.hash_atributos);
+    """
+
+
+def garante_historico(cur, spec):
+    """
+    Acrescenta as colunas de versão a uma dimensão criada antes do histórico e calcula o hash
+    das linhas que ainda não o têm (ex.: inseridas pelos get_or_create linha a linha).
+    """
+    tabela, sk = spec["tabela"], spec["sk"]
+    for coluna, tipo in COLUNAS_VERSAO.items():
+        cur.execute(f"IF COL_LENGTH('{tabela}', '{coluna}') IS NULL ALTER TABLE {tabela} ADD {coluna} {tipo} NULL;")
+    cur.execute(f"SELECT {sk}, {', '.join(spec['atributos'])} FROM {tabela} WHERE hash_atributos IS NULL;")
+    linhas = cur.fetchall()
+    if linhas:
+        cur.executemany(f"UPDATE {tabela} SET hash_atributos = ? WHERE {sk} = ?;",
+                        [(hash_atributos(linha[1:]), linha[0]) for linha in linhas])
+    return len(linhas)
+
+
+def prepara_historico(conn, specs):
+    """Prepara as dimensões versionadas de specs (com histórico, exceto as só de leitura) numa ligação nova."""
+    cur = conn.cursor()
+    for spec in specs:
+        if spec["historico"] and not spec["so_leitura"]:
+            garante_historico(cur, spec)
+    conn.commit()
+    cur.close()
@@ -0,0 +1,178 @@
+import os
+from datetime import date, timedelta
+
+# ---------------------------------------------------------
+# Dimensão Tempo pré-calculada (calendário)
+# ---------------------------------------------------------
+# A tabela tempo é preenchida de uma só vez para um intervalo de datas, com chaves
+# determinísticas yyyymmdd (ex.: 2024-05-02 -> 20240502). O carregamento dos factos
+# calcula tempo_idtempo diretamente a partir de data_chegada, sem qualquer lookup.
+# O intervalo [CALENDARIO_INICIO, CALENDARIO_FIM] é gerado uma vez, à entrada dos ETLs
+# (prepara_calendario) ou à parte (python dimensao_tempo.py); durante a carga só as datas
+# fora desse intervalo chegam ao SQL Server (garante_datas).
+
+ETL_TEMPO_CALENDARIO = os.getenv("ETL_TEMPO_CALENDARIO", "0") == "1"
+CALENDARIO_INICIO = date.fromisoformat(os.getenv("CALENDARIO_INICIO", "2020-01-01"))
+CALENDARIO_FIM = date.fromisoformat(os.getenv("CALENDARIO_FIM", "2030-12-31"))
+
+NOMES_MESES = ["janeiro", "fevereiro", "março", "abril", "maio", "junho", "julho",
+               "agosto", "setembro", "outubro", "novembro", "dezembro"]
+
+# Colunas acrescentadas à tabela tempo do ModeloEstrelaSQL.txt
+COLUNAS_CALENDARIO = {
+    "dia_semana": "int",  # 1 = segunda-feira ... 7 = domingo
+    "semana_iso": "int",
+    "nome_mes": "varchar(20)",
+    "feriado": "bit",  # feriado nacional em Portugal
+}
+
+
+def chave_tempo(data_ref):
+    """Chave substituta determinística (yyyymmdd) de uma data."""
+    return data_ref.year * 10000 + data_ref.month * 100 + data_ref.day
+
+
+def chave_tempo_vetorizada(datas):
+    """chave_tempo() sobre uma Series pandas de datetime64."""
+    return datas.dt.year * 10000 + datas.dt.month * 100 + datas.dt.day
+
+
+def domingo_pascoa(ano):
+    """Data do Domingo de Páscoa (algoritmo de Meeus/Jones/Butcher, calendário gregoriano)."""
+    a = ano % 19
+    b, c = divmod(ano, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    mes = (h + l - 7 * m + 114) // 31
+    dia = (h + l - 7 * m + 114) % 31 + 1
+    return date(ano, mes, dia)
+
+
+def feriados_portugal(ano):
+    """Feriados nacionais obrigatórios em Portugal num ano."""
+    pascoa = domingo_pascoa(ano)
+    fixos = [(1, 1), (4, 25), (5, 1), (6, 10), (8, 15), (10, 5), (11, 1), (12, 1), (12, 8), (12, 25)]
+    moveis = [pascoa - timedelta(days=2), pascoa, pascoa + timedelta(days=60)]  # Sexta Santa, Páscoa, Corpo de Deus
+    return sorted([date(ano, mes, dia) for mes, dia in fixos] + moveis)
+
+
+def garante_colunas_calendario(cur):
+    """Acrescenta à tabela tempo as colunas de COLUNAS_CALENDARIO que ainda não existam."""
+    for coluna, tipo in COLUNAS_CALENDARIO.items():
+        cur.execute(f"IF COL_LENGTH('tempo', '{coluna}') IS NULL ALTER TABLE tempo ADD {coluna} {tipo};")
+
+
+def verifica_chaves_calendario(cur):
+    """
+    Confirma que todas as linhas de tempo usam chaves yyyymmdd (i.e., que não há linhas
+    criadas pelo get_or_create_dim_tempo com IDs sequenciais), condição para o cálculo
+    aritmético de tempo_idtempo nos factos.
+    """
+    cur.execute("""
+                SELECT COUNT(*)
+                FROM tempo
+                WHERE idtempo <> YEAR(data_completa) * 10000 + MONTH(data_completa) * 100 + DAY(data_completa)
+                """)
+    n = cur.fetchone()[0]
+    if n:
+        raise RuntimeError(f"A tabela tempo tem {n} linhas com chaves não-calendário; "
+                           f"não é possível calcular tempo_idtempo a partir da data.")
+
+
+SQL_GERA_CALENDARIO = """
+    WITH numeros AS (
+        SELECT TOP (?) ROW_NUMBER() OVER (ORDER BY (SELECT NULL)) - 1 AS i
+        FROM sys.all_objects a CROSS JOIN sys.all_objects b
+    ),
+    datas AS (
+        SELECT DATEADD(day, i, CAST(? AS date)) AS data_completa FROM numeros
+    )
+    INSERT INTO tempo (idtempo, data_completa, ano, mes, semestre, trimestre,
+                       dia_semana, semana_iso, nome_mes, feriado)
+    SELECT YEAR(d.data_completa) * 10000 + MONTH(d.data_completa) * 100 + DAY(d.data_completa),
+           d.data_completa,
+           YEAR(d.data_completa),
+           MONTH(d.data_completa),
+           CASE WHEN MONTH(d.data_completa) <= 6 THEN 1 ELSE 2 END,
+           (MONTH(d.data_completa) - 1) / 3 + 1,
+           DATEDIFF(day, '19000101', d.data_completa) % 7 + 1,  -- 1900-01-01 foi segunda-feira
+           DATEPART(ISO_WEEK, d.data_completa),
+           CHOOSE(MONTH(d.data_completa), {nomes_meses}),
+           CASE WHEN f.data IS NULL THEN 0 ELSE 1 END
+    FROM datas d
+    LEFT JOIN #feriados f ON f.data = d.data_completa
+    WHERE NOT EXISTS (SELECT 1 FROM tempo t WHERE t.data_completa = d.data_completa);
+""".format(nomes_meses=", ".join(f"'{nome}'" for nome in NOMES_MESES))
+
+
+def gera_calendario(cur, inicio=CALENDARIO_INICIO, fim=CALENDARIO_FIM):
+    """
+    Preenche a dimensão tempo com todas as datas de [inicio, fim] num único INSERT ... SELECT
+    (as datas já existentes são mantidas). Os feriados são calculados em Python e
+    copiados para #feriados. Funciona com idtempo IDENTITY (IDENTITY_INSERT) ou explícito.
+    Devolve o nº de datas inseridas.
+    """
+    if fim < inicio:
+        return 0
+
+    garante_colunas_calendario(cur)
+
+    cur.execute("IF OBJECT_ID('tempdb..#feriados') IS NOT NULL DROP TABLE #feriados;")
+    cur.execute("CREATE TABLE #feriados (data date PRIMARY KEY);")
+    feriados = [(f,) for ano in range(inicio.year, fim.year + 1) for f in feriados_portugal(ano)]
+    cur.executemany("INSERT INTO #feriados (data) VALUES (?);", feriados)
+
+    cur.execute("SELECT COLUMNPROPERTY(OBJECT_ID('tempo'), 'idtempo', 'IsIdentity');")
+    identity = cur.fetchone()[0] == 1
+    if identity:
+        cur.execute("SET IDENTITY_INSERT tempo ON;")
+    try:
+        cur.execute(SQL_GERA_CALENDARIO, ((fim - inicio).days + 1, inicio))
+        inseridas = cur.rowcount
+    finally:
+        if identity:
+            cur.execute("SET IDENTITY_INSERT tempo OFF;")
+    return inseridas
+
+
+def prepara_calendario(cur, inicio=CALENDARIO_INICIO, fim=CALENDARIO_FIM):
+    """
+    Garante as datas de [inicio, fim], alargado ao intervalo configurado, e valida as chaves
+    yyyymmdd. Chamada uma vez à entrada dos ETLs. Devolve o nº de datas inseridas.
+    """
+    inicio, fim = min(inicio, CALENDARIO_INICIO), max(fim, CALENDARIO_FIM)
+    inseridas = gera_calendario(cur, inicio, fim)
+    verifica_chaves_calendario(cur)
+    print(f"Dimensão Tempo (calendário) {inicio} a {fim}: {inseridas} datas novas")
+    return inseridas
+
+
+def garante_datas(cur, inicio, fim):
+    """
+    Gera as datas de [inicio, fim] só se saírem do intervalo configurado (o resto foi gerado
+    por prepara_calendario), pelo que um bloco dentro do intervalo não custa round trips.
+    """
+    if inicio < CALENDARIO_INICIO or fim > CALENDARIO_FIM:
+        return gera_calendario(cur, inicio, fim)
+    return 0
+
+
+def main_calendario():
+    """Gera o calendário de CALENDARIO_INICIO a CALENDARIO_FIM no DW."""
+    from desenho_fisico import liga_dw  # desenho_fisico importa este módulo
+
+    conn = liga_dw()
+    try:
+        prepara_calendario(conn.cursor())
+        conn.commit()
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main_calendario()
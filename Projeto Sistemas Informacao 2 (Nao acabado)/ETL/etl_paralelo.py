@@ -0,0 +1,134 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date
+
+from acesso_bd import ESTATISTICAS
+from instrumentacao import METRICAS
+
+# ---------------------------------------------------------
+# Execução particionada dos ETL (coordenador + N processos)
+# ---------------------------------------------------------
+# Cada worker corre num processo próprio, com o SEU pool de ligações ao SQL Server
+# (reutilizado entre as partições que o processo carrega).
+# As chaves das dimensões são resolvidas antes pelo coordenador (numa só ligação)
+# e entregues aos workers no arranque, pelo que os workers só inserem factos:
+# não há concorrência na criação de membros das dimensões.
+
+ETL_WORKERS = int(os.getenv("ETL_WORKERS", "1"))
+LINHAS_POR_BLOCO = int(os.getenv("ETL_LINHAS_POR_BLOCO", "50000"))
+
+
+def particiona_meses(meses):
+    """
+    Converte uma lista de (ano, mes) em partições [inicio, fim[ por mês de datachegada.
+    Devolve uma lista de dicionários {"nome", "inicio", "fim"}.
+    """
+    particoes = []
+    for ano, mes in sorted(meses):
+        inicio = date(ano, mes, 1)
+        fim = date(ano + 1, 1, 1) if mes == 12 else date(ano, mes + 1, 1)
+        particoes.append({"nome": f"{ano:04d}-{mes:02d}", "inicio": inicio, "fim": fim})
+    return particoes
+
+
+def particiona_ficheiro(caminho, linhas_por_bloco=LINHAS_POR_BLOCO):
+    """
+    Divide um ficheiro CSV em blocos de bytes [inicio, fim[ alinhados ao fim de linha.
+    O cabeçalho fica de fora (cada worker recebe-o à parte).
+    Devolve (cabecalho, particoes), com particoes = [{"nome", "inicio", "fim", "linha_inicial"}].
+    A linha_inicial é o número da primeira linha do bloco no ficheiro (cabeçalho = linha 1).
+    Assume um registo por linha: campos com quebras de linha (entre aspas) não são suportados.
+    """
+    particoes = []
+    with open(caminho, mode="rb") as ficheiro:
+        cabecalho = ficheiro.readline().decode("utf-8-sig").rstrip("\r\n")
+        inicio = ficheiro.tell()
+        linha_inicial = 2
+        n_linhas = 0
+        while True:
+            linha = ficheiro.readline()
+            if linha:
+                n_linhas += 1
+            if n_linhas == linhas_por_bloco or (not linha and n_linhas):
+                fim = ficheiro.tell()
+                particoes.append({"nome": f"linhas {linha_inicial}-{linha_inicial + n_linhas - 1}",
+                                  "inicio": inicio, "fim": fim, "linha_inicial": linha_inicial})
+                inicio = fim
+                linha_inicial += n_linhas
+                n_linhas = 0
+            if not linha:
+                break
+    return cabecalho, particoes
+
+
+def le_linhas_bloco(caminho, particao):
+    """
+    Lê as linhas (texto, sem fim de linha) de um bloco devolvido por particiona_ficheiro.
+    Separa só em \\n (e retira o \\r de \\r\\n), como o readline da partição: str.splitlines
+    partiria também em \\x0b, \\x0c, \\x1c-\\x1e, \\x85 e \\u2028 dentro dos campos.
+    """
+    with open(caminho, mode="rb") as ficheiro:
+        ficheiro.seek(particao["inicio"])
+        dados = ficheiro.read(particao["fim"] - particao["inicio"])
+    linhas = dados.split(b"\n")
+    if linhas[-1] == b"":
+        linhas.pop()  # o bloco acaba em \n (exceto a última linha de um ficheiro sem \n final)
+    return [linha.removesuffix(b"\r").decode("utf-8") for linha in linhas]
+
+
+def novo_resultado(particao):
+    """Resultado que cada worker devolve ao coordenador."""
+    return {"particao": particao["nome"], "linhas": 0, "erros": []}
+
+
+def executa_particoes(worker, particoes, n_workers, inicializador=None, initargs=(), ao_concluir=None):
+    """
+    Coordenador: corre worker(particao) em n_workers processos e junta o progresso e os erros.
+
+    O worker deve devolver um dicionário criado por novo_resultado(), opcionalmente com
+    "sql" (estatísticas por comando) e "metricas" (contadores por etapa), que são juntas
+    às do coordenador. Uma exceção não tratada no worker conta como erro da partição
+    inteira (as restantes continuam). ao_concluir(resultado), se dado, é chamado no
+    coordenador por cada partição concluída (ex.: para escrever as linhas rejeitadas).
+    Devolve {"linhas": total, "erros": [...], "particoes": n}.
+    """
+    total_linhas = 0
+    erros = []
+    concluidas = 0
+
+    with ProcessPoolExecutor(max_workers=n_workers, initializer=inicializador, initargs=initargs) as executor:
+        futuros = {executor.submit(worker, particao): particao for particao in particoes}
+        for futuro in as_completed(futuros):
+            particao = futuros[futuro]
+            concluidas += 1
+            try:
+                resultado = futuro.result()
+            except Exception as e:
+                erros.append({"particao": particao["nome"], "registo": None, "erro": repr(e)})
+                METRICAS.emite("particao", particao=particao["nome"], falhou=True, erro=repr(e))
+                print(f"... [{concluidas}/{len(particoes)}] partição {particao['nome']} FALHOU: {e}")
+                continue
+
+            total_linhas += resultado["linhas"]
+            ESTATISTICAS.junta(resultado.get("sql", {}))
+            METRICAS.junta(resultado.get("metricas", {}))
+            METRICAS.emite("particao", particao=resultado["particao"], linhas=resultado["linhas"],
+                           erros=len(resultado["erros"]), total_linhas=total_linhas)
+            erros.extend(resultado["erros"])
+            if ao_concluir:
+                ao_concluir(resultado)
+            print(f"... [{concluidas}/{len(particoes)}] partição {resultado['particao']}: "
+                  f"{resultado['linhas']} factos ({len(resultado['erros'])} erros) - total {total_linhas}")
+
+    return {"linhas": total_linhas, "erros": erros, "particoes": len(particoes)}
+
+
+def imprime_resumo(resumo, max_erros=20):
+    """Imprime o resumo final do coordenador (total de factos e primeiros erros)."""
+    print(f"ETL paralelo concluído: {resumo['linhas']} factos em {resumo['particoes']} partições, "
+          f"{len(resumo['erros'])} erros.")
+    for erro in resumo["erros"][:max_erros]:
+        registo = f" registo {erro['registo']}" if erro.get("registo") is not None else ""
+        print(f"    [{erro['particao']}]{registo}: {erro['erro']}")
+    if len(resumo["erros"]) > max_erros:
+        print(f"    ... mais {len(resumo['erros']) - max_erros} erros.")
@@ -0,0 +1,456 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from transformacao_csv import FORMATO_DATA, TIPOS_COLUNAS
+
+# ---------------------------------------------------------
+# Gerador de dados sintéticos (origem do ETL) em grande escala
+# ---------------------------------------------------------
+# As distribuições são aprendidas do dados_atualizado.csv (perfil_origem): frequências das
+# cidades, certificações, tipos de barco, nomes e apelidos, e as distribuições empíricas
+# (quantis) da taxa, da duração, da idade e, por tipo de barco, da capacidade, do nº de
+# contentores e do peso por contentor. As viagens reutilizam uma frota e um conjunto de
+# condutores finitos, escolhidos com popularidade Zipf (poucos barcos/condutores fazem
+# muitas viagens), e as datas de partida têm sazonalidade (pico no verão).
+#
+# Tudo é gerado por blocos com numpy (sem ciclos Python por linha). Cada bloco usa o seu
+# próprio gerador aleatório (semente, bloco), por isso o resultado é determinístico para a
+# mesma semente e o mesmo tamanho de bloco.
+#
+# Saídas: CSV com as colunas do dados_atualizado.csv e dump SQL para MySQL com as tabelas
+# de origem lidas pela query de extração do 3-ETL (viagem, localizacao, condutor, barco,
+# empresabarco, taxas, contentores).
+#
+# Uso: GERADOR_LINHAS=1000000 GERADOR_FORMATOS=csv,sql python gerador_dados.py
+
+CSV_BASE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dados_atualizado.csv")
+
+GERADOR_LINHAS = int(os.getenv("GERADOR_LINHAS", "1000000"))
+GERADOR_SEMENTE = int(os.getenv("GERADOR_SEMENTE", "2025"))
+GERADOR_SAIDA = os.getenv("GERADOR_SAIDA", "viagens_sinteticas")
+GERADOR_FORMATOS = [f for f in os.getenv("GERADOR_FORMATOS", "csv,sql").split(",") if f]
+
+LINHAS_POR_BLOCO_GERADOR = 250_000
+LINHAS_POR_INSERT = 1000  # linhas por INSERT ... VALUES no dump SQL
+
+# Destino das viagens (o CSV só traz viagens para a Figueira da Foz; no MySQL o
+# nome da localização segue CIDADE_DESTINO/PAIS_DESTINO do 3-ETL)
+CIDADE_DESTINO_CSV = "FigueiraDaFoz"
+PAIS_DESTINO_CSV = "Portugal"
+CIDADE_DESTINO_SQL = os.getenv("CIDADE_DESTINO", "figfoz")
+PAIS_DESTINO_SQL = os.getenv("PAIS_DESTINO", "portugal")
+
+# Expoentes Zipf da popularidade (nº de viagens) de barcos e condutores, e dos barcos por empresa
+ZIPF_BARCOS = 0.8
+ZIPF_CONDUTORES = 0.6
+ZIPF_EMPRESAS = 1.2
+
+# Estados das viagens no MySQL (só as 'concluida' são extraídas)
+ESTADOS_VIAGEM = ["concluida", "em_curso", "cancelada"]
+PROB_ESTADOS_VIAGEM = [0.9, 0.06, 0.04]
+
+# O dump SQL tem uma linha por contentor; os porta-contentores trazem milhares por viagem,
+# por isso cada viagem fica limitada a MAX_CONTENTORES_SQL linhas (o peso total mantém-se).
+MAX_CONTENTORES_SQL = 20
+PROB_CONTENTOR_40_PES = 0.6
+
+FORMAS_EMPRESA = ["Transportes Marítimos", "Navegação", "Armadores", "Linhas", "Companhia de Navegação"]
+
+
+# ---------------------------------------------------------
+# Perfil da origem (distribuições do CSV real)
+# ---------------------------------------------------------
+
+def _frequencias(valores):
+    """Valores distintos e respetivas probabilidades (frequência relativa)."""
+    contagens = pd.Series(valores).value_counts(sort=False)
+    return contagens.index.to_numpy(dtype=object), (contagens / contagens.sum()).to_numpy()
+
+
+def _amostra_empirica(valores, n, rng, inteiro=False):
+    """Amostra de n valores da distribuição empírica de valores (interpolação entre quantis)."""
+    ordenados = np.sort(np.asarray(valores, dtype=float))
+    amostra = np.interp(rng.random(n) * (len(ordenados) - 1), np.arange(len(ordenados)), ordenados)
+    return np.rint(amostra).astype(np.int64) if inteiro else amostra
+
+
+def _formata_datas(datas, formato):
+    """strftime sobre os dias distintos (poucos) em vez de sobre cada linha."""
+    codigos, dias = pd.factorize(datas)
+    return pd.Series(pd.DatetimeIndex(dias).strftime(formato).to_numpy(dtype=object)[codigos], index=datas.index)
+
+
+def _pesos_zipf(n, expoente, rng):
+    """Probabilidades Zipf (1/k^s) atribuídas a n entidades por ordem aleatória."""
+    pesos = 1.0 / np.arange(1, n + 1) ** expoente
+    pesos = pesos[rng.permutation(n)]
+    return pesos / pesos.sum()
+
+
+def perfil_origem(caminho=CSV_BASE):
+    """Distribuições de cada coluna do CSV de viagens (ver o cabeçalho do módulo)."""
+    base = pd.read_csv(caminho, sep=";", dtype=str, keep_default_na=False)
+    partida = pd.to_datetime(base["datapartida"], format=FORMATO_DATA)
+    chegada = pd.to_datetime(base["datachegada"], format=FORMATO_DATA)
+    nomes = base["nomecondutor"].str.split()
+    barcos = base["nomebarco"].str.split()
+    numericas = base[["capacidadeteu", "numerocontentares", "peso"]].astype(float)
+    numericas["peso_contentor"] = numericas["peso"] / numericas["numerocontentares"].clip(lower=1)
+
+    origens = base.groupby(["cidade_origem", "pais_origem"]).size()
+    return {
+        "origens": (origens.index.to_frame(index=False).to_numpy(dtype=object),
+                    (origens / origens.sum()).to_numpy()),
+        "certificacoes": _frequencias(base["certificacao"]),
+        "tipos_barco": _frequencias(base["tipobarco"]),
+        "sexos": _frequencias(base["sexo"]),
+        "primeiros_nomes": _frequencias(nomes.str[0]),
+        "apelidos": _frequencias(nomes.str[-1]),
+        "prefixos_barco": _frequencias(barcos.str[0]),
+        "nomes_barco": _frequencias(barcos.str[1:-1].str.join(" ")),
+        "idades": base["idadecondutor"].astype(int).to_numpy(),
+        "duracoes": (chegada - partida).dt.days.to_numpy(),
+        "taxas": base["taxa"].str.replace(",", ".", regex=False).astype(float).to_numpy(),
+        "inicio": partida.min(),
+        "fim": partida.max(),
+        "por_tipo": {tipo: {coluna: grupo[coluna].to_numpy() for coluna in grupo.columns}
+                     for tipo, grupo in numericas.groupby(base["tipobarco"])},
+    }
+
+
+def _escolhe(frequencias, n, rng):
+    valores, probabilidades = frequencias
+    return valores[rng.choice(len(valores), size=n, p=probabilidades)]
+
+
+# ---------------------------------------------------------
+# Gerador
+# ---------------------------------------------------------
+
+class GeradorViagens(object):
+    """
+    Viagens sintéticas com entidades partilhadas (localizações, condutores, empresas, barcos).
+    O nº de condutores e de barcos cresce com o volume mas de forma sublinear (frota finita),
+    como numa origem real; fracao_destino é a fração de viagens para a Figueira da Foz
+    (as restantes vão para um dos portos de origem, e só aparecem no dump SQL).
+    """
+
+    def __init__(self, n_viagens, semente=GERADOR_SEMENTE, perfil=None, fracao_destino=1.0,
+                 n_condutores=None, n_barcos=None, n_empresas=None):
+        self.n_viagens = n_viagens
+        self.semente = semente
+        self.perfil = perfil or perfil_origem()
+        self.fracao_destino = fracao_destino
+        rng = np.random.default_rng([semente, 0])
+
+        n_condutores = n_condutores or max(1, int(min(0.57 * n_viagens, 5000 + 0.01 * n_viagens)))
+        n_barcos = n_barcos or max(1, int(min(0.99 * n_viagens, 2000 + 0.002 * n_viagens)))
+        n_empresas = n_empresas or max(5, n_barcos // 40)
+
+        self.localizacoes = self.__gera_localizacoes()
+        self.condutores = self.__gera_condutores(n_condutores, rng)
+        self.empresas = self.__gera_empresas(n_empresas, rng)
+        self.barcos = self.__gera_barcos(n_barcos, rng)
+        self.__pesos_condutores = _pesos_zipf(n_condutores, ZIPF_CONDUTORES, rng)
+        self.__pesos_barcos = _pesos_zipf(n_barcos, ZIPF_BARCOS, rng)
+
+        # Sazonalidade: dias de verão com até +25% de partidas
+        dias = pd.date_range(self.perfil["inicio"], self.perfil["fim"], freq="D")
+        sazonal = 1 + 0.25 * np.sin(2 * np.pi * (dias.dayofyear.to_numpy() - 100) / 365.25)
+        self.__dias = dias.to_numpy()
+        self.__pesos_dias = sazonal / sazonal.sum()
+
+    # --- entidades ---
+
+    def __gera_localizacoes(self):
+        valores, probabilidades = self.perfil["origens"]
+        origens = pd.DataFrame(valores, columns=["cidade", "pais"])
+        origens["probabilidade"] = probabilidades
+        destino = pd.DataFrame({"cidade": [CIDADE_DESTINO_SQL], "pais": [PAIS_DESTINO_SQL], "probabilidade": [0.0]})
+        localizacoes = pd.concat([origens, destino], ignore_index=True)
+        localizacoes.insert(0, "idlocalizacao", np.arange(1, len(localizacoes) + 1))
+        return localizacoes
+
+    def __gera_condutores(self, n, rng):
+        primeiros = _escolhe(self.perfil["primeiros_nomes"], n, rng)
+        apelidos = _escolhe(self.perfil["apelidos"], n, rng)
+        # Com mais condutores do que combinações nome+apelido, acrescenta-se um apelido do meio
+        combinacoes = len(self.perfil["primeiros_nomes"][0]) * len(self.perfil["apelidos"][0])
+        if n > combinacoes // 2:
+            meio = _escolhe(self.perfil["apelidos"], n, rng)
+            nomes = pd.Series(primeiros) + " " + pd.Series(meio) + " " + pd.Series(apelidos)
+        else:
+            nomes = pd.Series(primeiros) + " " + pd.Series(apelidos)
+        return pd.DataFrame({
+            "idcondutor": np.arange(1, n + 1),
+            "nomecondutor": nomes.to_numpy(dtype=object),
+            "idadecondutor": _amostra_empirica(self.perfil["idades"], n, rng, inteiro=True),
+            "certificacao": _escolhe(self.perfil["certificacoes"], n, rng),
+            "sexo": _escolhe(self.perfil["sexos"], n, rng),
+        })
+
+    def __gera_empresas(self, n, rng):
+        formas = np.array(FORMAS_EMPRESA, dtype=object)[rng.integers(0, len(FORMAS_EMPRESA), n)]
+        apelidos = _escolhe(self.perfil["apelidos"], n, rng)
+        paises = self.perfil["origens"][0][:, 1]
+        return pd.DataFrame({
+            "idempresabarco": np.arange(1, n + 1),
+            "nomeempresabarco": (pd.Series(formas) + " " + pd.Series(apelidos) + " "
+                                 + pd.Series(np.arange(1, n + 1)).astype(str)).to_numpy(dtype=object),
+            "paisempresabarco": paises[rng.integers(0, len(paises), n)],
+        })
+
+    def __gera_barcos(self, n, rng):
+        tipos = _escolhe(self.perfil["tipos_barco"], n, rng)
+        capacidade = np.zeros(n, dtype=np.int64)
+        for tipo, distribuicoes in self.perfil["por_tipo"].items():
+            mascara = tipos == tipo
+            capacidade[mascara] = _amostra_empirica(distribuicoes["capacidadeteu"], mascara.sum(), rng, inteiro=True)
+        nomes = (pd.Series(_escolhe(self.perfil["prefixos_barco"], n, rng)) + " "
+                 + pd.Series(_escolhe(self.perfil["nomes_barco"], n, rng)) + " "
+                 + pd.Series(rng.integers(1, 1000, n)).astype(str))
+        return pd.DataFrame({
+            "idbarco": np.arange(1, n + 1),
+            "nomebarco": nomes.to_numpy(dtype=object),
+            "tamanhobarco": (90 + capacidade // 60 + rng.integers(0, 60, n)).astype(np.int64),  # comprimento (m)
+            "tipobarco": tipos,
+            "capacidadeteu": capacidade,
+            "empresabarco_idempresabarco": 1 + rng.choice(len(self.empresas), size=n,
+                                                          p=_pesos_zipf(len(self.empresas), ZIPF_EMPRESAS, rng)),
+        })
+
+    # --- viagens ---
+
+    def gera_bloco(self, indice, primeiro_id, n):
+        """
+        Bloco indice (0, 1, ...) com n viagens (idviagem a partir de primeiro_id) e todas as colunas necessárias aos dois formatos:
+        as do CSV (sem destino), os IDs das entidades, a empresa, o tamanho, os TEU, o destino e o estado.
+        """
+        rng = np.random.default_rng([self.semente, 1, indice])
+        condutor = rng.choice(len(self.condutores), size=n, p=self.__pesos_condutores)
+        barco = rng.choice(len(self.barcos), size=n, p=self.__pesos_barcos)
+        origem = rng.choice(len(self.localizacoes) - 1, size=n, p=self.localizacoes["probabilidade"].to_numpy()[:-1])
+
+        partida = self.__dias[rng.choice(len(self.__dias), size=n, p=self.__pesos_dias)]
+        duracao = _amostra_empirica(self.perfil["duracoes"], n, rng, inteiro=True)
+
+        bloco = pd.DataFrame({
+            "idviagem": np.arange(primeiro_id, primeiro_id + n),
+            "taxa": np.round(_amostra_empirica(self.perfil["taxas"], n, rng), 2),
+            "data_partida": partida,
+            "data_chegada": partida + duracao.astype("timedelta64[D]"),
+            "id_localizacao": origem + 1,
+        })
+        for coluna in ("cidade", "pais"):
+            bloco[f"{coluna}_origem"] = self.localizacoes[coluna].to_numpy()[origem]
+        for tabela, indices in ((self.condutores, condutor), (self.barcos, barco)):
+            for coluna in tabela.columns:
+                bloco[coluna] = tabela[coluna].to_numpy()[indices]
+        empresa = bloco["empresabarco_idempresabarco"].to_numpy() - 1
+        for coluna in ("nomeempresabarco", "paisempresabarco"):
+            bloco[coluna] = self.empresas[coluna].to_numpy()[empresa]
+
+        # Contentores e peso seguem a distribuição do tipo do barco da viagem
+        contentores = np.zeros(n, dtype=np.int64)
+        peso = np.zeros(n, dtype=np.int64)
+        tipos = bloco["tipobarco"].to_numpy()
+        for tipo, distribuicoes in self.perfil["por_tipo"].items():
+            mascara = tipos == tipo
+            k = mascara.sum()
+            contentores[mascara] = np.maximum(1, _amostra_empirica(distribuicoes["numerocontentares"], k, rng,
+                                                                   inteiro=True))
+            peso[mascara] = np.rint(contentores[mascara]
+                                    * _amostra_empirica(distribuicoes["peso_contentor"], k, rng)).astype(np.int64)
+        bloco["numerocontentares"] = contentores
+        bloco["peso"] = peso
+        bloco["teu"] = contentores + rng.binomial(contentores, PROB_CONTENTOR_40_PES)  # 40 pés = 2 TEU
+
+        bloco["destino"] = rng.random(n) < self.fracao_destino
+        bloco["status"] = np.array(ESTADOS_VIAGEM, dtype=object)[rng.choice(len(ESTADOS_VIAGEM), size=n,
+                                                                            p=PROB_ESTADOS_VIAGEM)]
+        return bloco
+
+    def blocos(self, linhas_por_bloco=LINHAS_POR_BLOCO_GERADOR):
+        """Itera os blocos de viagens até n_viagens."""
+        for indice, inicio in enumerate(range(0, self.n_viagens, linhas_por_bloco)):
+            yield self.gera_bloco(indice, inicio + 1, min(linhas_por_bloco, self.n_viagens - inicio))
+
+    # --- saídas ---
+
+    def escreve_csv(self, caminho):
+        """CSV com as colunas e formatos do dados_atualizado.csv (só as viagens para a Figueira da Foz)."""
+        colunas = list(TIPOS_COLUNAS)
+        n_linhas = 0
+        with open(caminho, mode="w", encoding="utf-8", newline="") as ficheiro:
+            for bloco in self.blocos():
+                bloco = bloco[bloco["destino"]]
+                bloco = bloco.assign(
+                    datapartida=_formata_datas(bloco["data_partida"], FORMATO_DATA),
+                    datachegada=_formata_datas(bloco["data_chegada"], FORMATO_DATA),
+                    cidade_destino=CIDADE_DESTINO_CSV, pais_destino=PAIS_DESTINO_CSV,
+                )
+                bloco[colunas].to_csv(ficheiro, sep=";", decimal=",", index=False, header=n_linhas == 0)
+                n_linhas += len(bloco)
+        return n_linhas
+
+    def escreve_sql(self, caminho):
+        """
+        Dump SQL para MySQL: CREATE TABLE das tabelas de origem e INSERT ... VALUES com
+        LINHAS_POR_INSERT linhas cada, numa única transação (chaves estrangeiras desligadas
+        durante a carga). Devolve o nº de viagens escritas.
+        """
+        with open(caminho, mode="w", encoding="utf-8", newline="\n") as ficheiro:
+            ficheiro.write("SET NAMES utf8mb4;\nSET foreign_key_checks = 0;\nSET unique_checks = 0;\n"
+                           "SET autocommit = 0;\n\n")
+            ficheiro.write(SQL_CRIA_TABELAS_ORIGEM)
+            _escreve_inserts(ficheiro, "localizacao", self.localizacoes[["idlocalizacao", "cidade", "pais"]])
+            _escreve_inserts(ficheiro, "empresabarco", self.empresas)
+            _escreve_inserts(ficheiro, "barco", self.barcos)
+            _escreve_inserts(ficheiro, "condutor", self.condutores.drop(columns="sexo"))
+
+            destino = len(self.localizacoes)
+            for bloco in self.blocos():
+                rng = np.random.default_rng([self.semente, 2, int(bloco["idviagem"].iloc[0])])
+                outros_portos = rng.integers(1, destino, len(bloco))
+                viagens = pd.DataFrame({
+                    "idviagem": bloco["idviagem"],
+                    "datapartida": bloco["data_partida"],
+                    "datachegada": bloco["data_chegada"],
+                    "tipoviagem": bloco["tipobarco"],
+                    "status": bloco["status"],
+                    "localizacao_idlocalizacao": bloco["id_localizacao"],
+                    "localizacao_idlocalizacao1": np.where(bloco["destino"], destino, outros_portos),
+                    "condutor_idcondutor": bloco["idcondutor"],
+                    "barco_idbarco": bloco["idbarco"],
+                })
+                _escreve_inserts(ficheiro, "viagem", viagens)
+                _escreve_inserts(ficheiro, "taxas", _taxas_do_bloco(bloco, rng))
+                _escreve_inserts(ficheiro, "contentores", _contentores_do_bloco(bloco, rng))
+            ficheiro.write("COMMIT;\nSET foreign_key_checks = 1;\nSET unique_checks = 1;\n")
+        return self.n_viagens
+
+
+# ---------------------------------------------------------
+# Dump SQL (MySQL)
+# ---------------------------------------------------------
+
+# Tabelas de origem tal como são lidas pela query de extração do 3-ETL
+SQL_CRIA_TABELAS_ORIGEM = """
+CREATE TABLE IF NOT EXISTS localizacao (
+    idlocalizacao INT PRIMARY KEY,
+    cidade VARCHAR(100) NOT NULL,
+    pais VARCHAR(100) NOT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS empresabarco (
+    idempresabarco INT PRIMARY KEY,
+    nomeempresabarco VARCHAR(150) NOT NULL,
+    paisempresabarco VARCHAR(100) NOT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS barco (
+    idbarco INT PRIMARY KEY,
+    nomebarco VARCHAR(100) NOT NULL,
+    tamanhobarco INT,
+    tipobarco VARCHAR(50),
+    capacidadeteu INT,
+    empresabarco_idempresabarco INT NOT NULL,
+    FOREIGN KEY (empresabarco_idempresabarco) REFERENCES empresabarco (idempresabarco)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS condutor (
+    idcondutor INT PRIMARY KEY,
+    nomecondutor VARCHAR(150) NOT NULL,
+    idadecondutor INT,
+    certificacao VARCHAR(50)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS viagem (
+    idviagem INT PRIMARY KEY,
+    datapartida DATE NOT NULL,
+    datachegada DATE NOT NULL,
+    tipoviagem VARCHAR(50),
+    status VARCHAR(20) NOT NULL,
+    localizacao_idlocalizacao INT NOT NULL,
+    localizacao_idlocalizacao1 INT NOT NULL,
+    condutor_idcondutor INT NOT NULL,
+    barco_idbarco INT NOT NULL,
+    FOREIGN KEY (localizacao_idlocalizacao) REFERENCES localizacao (idlocalizacao),
+    FOREIGN KEY (localizacao_idlocalizacao1) REFERENCES localizacao (idlocalizacao),
+    FOREIGN KEY (condutor_idcondutor) REFERENCES condutor (idcondutor),
+    FOREIGN KEY (barco_idbarco) REFERENCES barco (idbarco)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS taxas (
+    idtaxa INT AUTO_INCREMENT PRIMARY KEY,
+    viagem_idviagem INT NOT NULL,
+    valor DECIMAL(12,2) NOT NULL,
+    FOREIGN KEY (viagem_idviagem) REFERENCES viagem (idviagem)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS contentores (
+    idcontentor INT AUTO_INCREMENT PRIMARY KEY,
+    viagem_idviagem INT NOT NULL,
+    pesocontentor INT NOT NULL,
+    tamanho INT NOT NULL,
+    FOREIGN KEY (viagem_idviagem) REFERENCES viagem (idviagem)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+"""
+
+
+def _literal_sql(coluna):
+    """Converte uma coluna num literal SQL por linha (texto entre plicas e escapado, datas ISO)."""
+    if pd.api.types.is_datetime64_any_dtype(coluna):
+        return "'" + _formata_datas(coluna, "%Y-%m-%d") + "'"
+    if pd.api.types.is_numeric_dtype(coluna):
+        return coluna.astype(str)
+    texto = coluna.astype(str).str.replace("\\", "\\\\", regex=False).str.replace("'", "\\'", regex=False)
+    return "'" + texto + "'"
+
+
+def _escreve_inserts(ficheiro, tabela, df):
+    """Escreve df como INSERT ... VALUES de LINHAS_POR_INSERT linhas."""
+    if df.empty:
+        return
+    literais = [_literal_sql(df[coluna]) for coluna in df.columns]
+    linhas = literais[0]
+    for literal in literais[1:]:
+        linhas = linhas + "," + literal
+    linhas = ("(" + linhas + ")").tolist()
+    cabecalho = f"INSERT INTO {tabela} ({', '.join(df.columns)}) VALUES\n"
+    for inicio in range(0, len(linhas), LINHAS_POR_INSERT):
+        ficheiro.write(cabecalho + ",\n".join(linhas[inicio:inicio + LINHAS_POR_INSERT]) + ";\n")
+
+
+def _taxas_do_bloco(bloco, rng):
+    """Divide a taxa total de cada viagem em 1 a 4 taxas (pesos aleatórios)."""
+    n_taxas = rng.integers(1, 5, len(bloco))
+    viagem = np.repeat(bloco["idviagem"].to_numpy(), n_taxas)
+    pesos = rng.random(len(viagem)) + 0.1
+    inicios = np.concatenate([[0], np.cumsum(n_taxas)[:-1]])
+    totais = np.repeat(np.add.reduceat(pesos, inicios), n_taxas)
+    valor = np.round(np.repeat(bloco["taxa"].to_numpy(), n_taxas) * pesos / totais, 2)
+    return pd.DataFrame({"viagem_idviagem": viagem, "valor": valor})
+
+
+def _contentores_do_bloco(bloco, rng):
+    """Uma linha por contentor (até MAX_CONTENTORES_SQL por viagem), repartindo o peso total da viagem."""
+    n_linhas = np.minimum(bloco["numerocontentares"].to_numpy(), MAX_CONTENTORES_SQL)
+    viagem = np.repeat(bloco["idviagem"].to_numpy(), n_linhas)
+    peso = np.repeat(bloco["peso"].to_numpy() // n_linhas, n_linhas)
+    tamanho = np.where(rng.random(len(viagem)) < PROB_CONTENTOR_40_PES, 40, 20)
+    return pd.DataFrame({"viagem_idviagem": viagem, "pesocontentor": peso, "tamanho": tamanho})
+
+
+if __name__ == "__main__":
+    gerador = GeradorViagens(GERADOR_LINHAS, GERADOR_SEMENTE)
+    for formato in GERADOR_FORMATOS:
+        inicio = time.perf_counter()
+        caminho = f"{GERADOR_SAIDA}.{formato}"
+        n_linhas = gerador.escreve_csv(caminho) if formato == "csv" else gerador.escreve_sql(caminho)
+        segundos = time.perf_counter() - inicio
+        print(f"{caminho}: {n_linhas} viagens em {segundos:.1f}s ({60 * n_linhas / segundos:,.0f} linhas/min)")
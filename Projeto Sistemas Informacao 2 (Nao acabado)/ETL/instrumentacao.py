@@ -0,0 +1,138 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from acesso_bd import ESTATISTICAS
+
+# ---------------------------------------------------------
+# Instrumentação das etapas do ETL
+# ---------------------------------------------------------
+# Por etapa (extracao, transformacao, dimensoes, carga): tempo de relógio, linhas,
+# linhas/s, round trips ao SGBD, acertos/falhas da cache de chaves e erros.
+# Os eventos são escritos como JSON lines (um objeto por linha) em ETL_METRICAS_JSONL
+# ("-" = stdout, "" = desligado) e o resumo final é também impresso na consola.
+# Round trips: os comandos no SQL Server são contados automaticamente (acesso_bd);
+# os do MySQL são somados explicitamente com conta(..., round_trips=n).
+
+ETL_METRICAS_JSONL = os.getenv("ETL_METRICAS_JSONL", "etl_metricas.jsonl")
+
+ETAPAS = ("extracao", "transformacao", "dimensoes", "carga")
+
+
+def _nova_etapa():
+    return {"segundos": 0.0, "linhas": 0, "round_trips": 0, "acertos_cache": 0, "falhas_cache": 0, "erros": 0}
+
+
+class Metricas(object):
+    """Contadores por etapa de uma execução do ETL (um objeto por processo)."""
+
+    def __init__(self, destino=ETL_METRICAS_JSONL):
+        self.destino = destino
+        self.execucao = f"{datetime.now():%Y%m%dT%H%M%S}-{os.getpid()}"
+        self.__inicio = time.perf_counter()
+        self.__etapas = {}
+        self.__lock = threading.Lock()
+
+    def __etapa(self, nome):
+        return self.__etapas.setdefault(nome, _nova_etapa())
+
+    @contextmanager
+    def etapa(self, nome):
+        """Mede o tempo (e os comandos SQL Server) do bloco with como parte da etapa nome. Não aninhar."""
+        inicio = time.perf_counter()
+        comandos = ESTATISTICAS.total_chamadas()
+        try:
+            yield
+        finally:
+            with self.__lock:
+                est = self.__etapa(nome)
+                est["segundos"] += time.perf_counter() - inicio
+                est["round_trips"] += ESTATISTICAS.total_chamadas() - comandos
+
+    def mede_blocos(self, nome, blocos):
+        """Itera blocos (ex.: DataFrames lidos do CSV) contando o tempo de cada leitura e as linhas na etapa nome."""
+        iterador = iter(blocos)
+        while True:
+            with self.etapa(nome):
+                bloco = next(iterador, None)
+            if bloco is None:
+                return
+            self.conta(nome, linhas=len(bloco))
+            yield bloco
+
+    def conta(self, nome, linhas=0, erros=0, round_trips=0, acertos_cache=0, falhas_cache=0):
+        """Soma contadores à etapa nome."""
+        with self.__lock:
+            est = self.__etapa(nome)
+            est["linhas"] += linhas
+            est["erros"] += erros
+            est["round_trips"] += round_trips
+            est["acertos_cache"] += acertos_cache
+            est["falhas_cache"] += falhas_cache
+
+    def emite(self, evento, **campos):
+        """Escreve um evento JSON line em self.destino."""
+        if not self.destino:
+            return
+        linha = json.dumps({"ts": datetime.now().isoformat(timespec="milliseconds"), "execucao": self.execucao,
+                            "pid": os.getpid(), "evento": evento, **campos}, default=str, ensure_ascii=False)
+        if self.destino == "-":
+            print(linha, flush=True)
+            return
+        with self.__lock, open(self.destino, mode="a", encoding="utf-8") as ficheiro:
+            ficheiro.write(linha + "\n")
+
+    def progresso(self, linhas, **campos):
+        """Evento de progresso (substitui o antigo print a cada 100 linhas como sinal estruturado)."""
+        segundos = time.perf_counter() - self.__inicio
+        self.emite("progresso", linhas=linhas, segundos=round(segundos, 3),
+                   linhas_s=round(linhas / segundos, 1) if segundos else None, **campos)
+
+    def exporta(self, limpar=False):
+        """Cópia dos contadores por etapa; com limpar=True recomeça (usado pelos workers)."""
+        with self.__lock:
+            copia = {nome: dict(est) for nome, est in self.__etapas.items()}
+            if limpar:
+                self.__etapas.clear()
+        return copia
+
+    def junta(self, outras):
+        """Acumula os contadores exportados por outro processo."""
+        with self.__lock:
+            for nome, est in outras.items():
+                atual = self.__etapa(nome)
+                for campo, valor in est.items():
+                    atual[campo] += valor
+
+    def resumo(self, **campos):
+        """
+        Emite um evento "etapa" por etapa e um evento "resumo", e imprime a tabela final.
+        No modo particionado os tempos das etapas são a soma dos tempos de todos os workers.
+        """
+        total = time.perf_counter() - self.__inicio
+        etapas = self.exporta()
+        nomes = [n for n in ETAPAS if n in etapas] + sorted(n for n in etapas if n not in ETAPAS)
+
+        print(f"Métricas por etapa (execução {self.execucao}, {total:.1f}s no total):")
+        print(f"    {'etapa':<14}{'tempo(s)':>10}{'linhas':>11}{'linhas/s':>11}{'round trips':>13}"
+              f"{'cache':>8}{'erros':>8}")
+        for nome in nomes:
+            est = etapas[nome]
+            est["linhas_s"] = round(est["linhas"] / est["segundos"], 1) if est["segundos"] else None
+            consultas_cache = est["acertos_cache"] + est["falhas_cache"]
+            est["taxa_acertos_cache"] = round(est["acertos_cache"] / consultas_cache, 4) if consultas_cache else None
+            self.emite("etapa", etapa=nome, **est)
+
+            cache = f"{100 * est['taxa_acertos_cache']:.0f}%" if consultas_cache else "-"
+            print(f"    {nome:<14}{est['segundos']:>10.2f}{est['linhas']:>11}{est['linhas_s'] or 0:>11.0f}"
+                  f"{est['round_trips']:>13}{cache:>8}{est['erros']:>8}")
+
+        self.emite("resumo", segundos=round(total, 3), etapas=etapas, **campos)
+        return etapas
+
+
+# Métricas do processo atual
+METRICAS = Metricas()
@@ -0,0 +1,111 @@
+import glob
+import hashlib
+import os
+
+# ---------------------------------------------------------
+# Manifesto dos ficheiros CSV ingeridos (modo pasta)
+# ---------------------------------------------------------
+# Cada ficheiro é identificado pelo SHA-256 do conteúdo: um ficheiro já "carregado"
+# é ignorado mesmo que chegue com outro nome; um ficheiro "em_curso" (execução
+# interrompida) ou "falhou" volta a ser processado. Como os factos são carregados
+# por upsert em viagem_id_origem, reprocessar um ficheiro não duplica viagens.
+
+ESTADO_EM_CURSO = "em_curso"
+ESTADO_CARREGADO = "carregado"
+ESTADO_FALHOU = "falhou"
+
+SQL_CRIA_MANIFESTO = """
+    IF OBJECT_ID('etl_manifesto') IS NULL
+    BEGIN
+        CREATE TABLE etl_manifesto (
+            idficheiro        int IDENTITY(1, 1) PRIMARY KEY,
+            nome              nvarchar(260) NOT NULL,
+            hash_sha256       char(64) NOT NULL,
+            linhas            int NOT NULL,
+            linhas_carregadas int NULL,
+            linhas_rejeitadas int NULL,
+            estado            varchar(20) NOT NULL,
+            inicio            datetime2 NOT NULL,
+            fim               datetime2 NULL,
+            erro              nvarchar(max) NULL
+        );
+        CREATE UNIQUE INDEX ux_etl_manifesto_hash ON etl_manifesto (hash_sha256);
+    END
+"""
+
+# Chave natural da viagem (para o upsert dos factos), caso o DW ainda não a tenha
+SQL_GARANTE_CHAVE_ORIGEM_VIAGENS = """
+    IF COL_LENGTH('viagens', 'viagem_id_origem') IS NULL
+        ALTER TABLE viagens ADD viagem_id_origem nvarchar(64) NULL;
+"""
+SQL_GARANTE_INDICE_ORIGEM_VIAGENS = """
+    IF NOT EXISTS (SELECT 1 FROM sys.indexes
+                   WHERE name = 'ux_viagens_id_origem' AND object_id = OBJECT_ID('viagens'))
+        CREATE UNIQUE INDEX ux_viagens_id_origem ON viagens (viagem_id_origem)
+            WHERE viagem_id_origem IS NOT NULL;
+"""
+
+
+def garante_chave_origem_viagens(cur):
+    """Cria a coluna viagens.viagem_id_origem e o respetivo índice único, se não existirem (upsert dos factos)."""
+    cur.execute(SQL_GARANTE_CHAVE_ORIGEM_VIAGENS)
+    cur.execute(SQL_GARANTE_INDICE_ORIGEM_VIAGENS)
+
+
+def garante_manifesto(cur):
+    """Cria a tabela etl_manifesto e a chave única viagens.viagem_id_origem, se não existirem."""
+    cur.execute(SQL_CRIA_MANIFESTO)
+    garante_chave_origem_viagens(cur)
+
+
+def descobre_ficheiros(pasta, padrao="*.csv"):
+    """Ficheiros CSV de uma pasta, por ordem de nome (os ficheiros de quarentena ficam de fora)."""
+    return sorted(caminho for caminho in glob.glob(os.path.join(pasta, padrao))
+                  if not os.path.basename(caminho).endswith("_rejeitados.csv"))
+
+
+def hash_e_linhas(caminho, tamanho_bloco=1 << 20):
+    """Devolve (SHA-256 em hexadecimal, nº de linhas de dados sem o cabeçalho) numa só leitura do ficheiro."""
+    sha = hashlib.sha256()
+    n_quebras = 0
+    ultimo = b"\n"
+    with open(caminho, mode="rb") as ficheiro:
+        for dados in iter(lambda: ficheiro.read(tamanho_bloco), b""):
+            sha.update(dados)
+            n_quebras += dados.count(b"\n")
+            ultimo = dados[-1:]
+    n_linhas = n_quebras + (ultimo != b"\n")  # última linha sem quebra
+    return sha.hexdigest(), max(n_linhas - 1, 0)
+
+
+def regista_ficheiro(cur, nome, hash_sha256, linhas):
+    """
+    Regista o início do processamento de um ficheiro no manifesto.
+    Devolve o idficheiro, ou None se um ficheiro com o mesmo conteúdo já foi carregado.
+    """
+    cur.execute("SELECT idficheiro, estado FROM etl_manifesto WHERE hash_sha256 = ?", (hash_sha256,))
+    row = cur.fetchone()
+    if row and row[1] == ESTADO_CARREGADO:
+        return None
+    if row:
+        cur.execute("""
+                    UPDATE etl_manifesto
+                    SET nome = ?, linhas = ?, estado = ?, inicio = SYSDATETIME(), fim = NULL, erro = NULL
+                    WHERE idficheiro = ?
+                    """, (nome, linhas, ESTADO_EM_CURSO, row[0]))
+        return row[0]
+    cur.execute("""
+                INSERT INTO etl_manifesto (nome, hash_sha256, linhas, estado, inicio)
+                OUTPUT INSERTED.idficheiro
+                VALUES (?, ?, ?, ?, SYSDATETIME());
+                """, (nome, hash_sha256, linhas, ESTADO_EM_CURSO))
+    return cur.fetchone()[0]
+
+
+def conclui_ficheiro(cur, idficheiro, estado, linhas_carregadas=None, linhas_rejeitadas=None, erro=None):
+    """Regista o fim do processamento de um ficheiro (estado carregado ou falhou)."""
+    cur.execute("""
+                UPDATE etl_manifesto
+                SET estado = ?, linhas_carregadas = ?, linhas_rejeitadas = ?, fim = SYSDATETIME(), erro = ?
+                WHERE idficheiro = ?
+                """, (estado, linhas_carregadas, linhas_rejeitadas, erro, idficheiro))
@@ -0,0 +1,91 @@
+import os
+from datetime import datetime
+
+import pandas as pd
+
+from transformacao_csv import TIPOS_COLUNAS
+
+# ---------------------------------------------------------
+# Quarentena (dead-letter) das linhas rejeitadas do CSV
+# ---------------------------------------------------------
+# As linhas que falham a validação (ou, raramente, a inserção) não chegam à carga em
+# massa: são escritas com as colunas originais, o número da linha no ficheiro de origem
+# e o motivo num ficheiro de quarentena (.csv com ';' ou .parquet), que pode ser
+# corrigido e recarregado. Na consola fica só a contagem por bloco.
+
+# Caminho do ficheiro de quarentena ("" = <csv de origem>_rejeitados.csv)
+ETL_QUARENTENA = os.getenv("ETL_QUARENTENA", "")
+
+COLUNAS_QUARENTENA = list(TIPOS_COLUNAS) + ["linha", "motivo_rejeicao"]
+
+
+def caminho_quarentena(caminho_csv, caminho=ETL_QUARENTENA, fase=""):
+    """
+    Caminho do ficheiro de quarentena de um CSV de origem. Com fase (ex.: "carga"), o nome
+    leva a fase, para a carga da zona de aterragem não recriar o ficheiro da extração.
+    """
+    sufixo = f"_{fase}" if fase else ""
+    if caminho:
+        base, extensao = os.path.splitext(caminho)
+        return f"{base}{sufixo}{extensao}"
+    base, _ = os.path.splitext(caminho_csv)
+    return f"{base}{sufixo}_rejeitados.csv"
+
+
+def rejeitadas_do_bloco(bloco):
+    """Linhas inválidas de um bloco transformado, com as colunas de COLUNAS_QUARENTENA."""
+    return bloco.loc[~bloco["valida"], COLUNAS_QUARENTENA]
+
+
+def rejeitadas_da_carga(bloco, erros):
+    """Converte os erros de inserção [(linha, erro), ...] em linhas de quarentena."""
+    if not erros:
+        return bloco.iloc[0:0][COLUNAS_QUARENTENA]
+    motivos = pd.Series(dict(erros), name="motivo_rejeicao")
+    rejeitadas = bloco[bloco["linha"].isin(motivos.index)].copy()
+    rejeitadas["motivo_rejeicao"] = "erro na inserção: " + rejeitadas["linha"].map(motivos).astype(str)
+    return rejeitadas[COLUNAS_QUARENTENA]
+
+
+class Quarentena(object):
+    """
+    Escritor do ficheiro de quarentena de uma execução. O ficheiro é recriado na primeira
+    escrita (não acumula execuções anteriores) e só é criado se houver rejeições.
+    O formato é escolhido pela extensão (.parquet requer pyarrow).
+    """
+
+    def __init__(self, caminho, ficheiro_origem):
+        self.caminho = caminho
+        self.ficheiro_origem = os.path.basename(ficheiro_origem)
+        self.parquet = caminho.lower().endswith(".parquet")
+        self.n_linhas = 0
+        self.__escritor_parquet = None
+
+    def regista(self, rejeitadas):
+        """Acrescenta ao ficheiro as linhas rejeitadas (DataFrame ou lista de registos com COLUNAS_QUARENTENA)."""
+        if rejeitadas is None or not len(rejeitadas):
+            return
+        if isinstance(rejeitadas, list):
+            rejeitadas = pd.DataFrame(rejeitadas, columns=COLUNAS_QUARENTENA)
+        rejeitadas = rejeitadas[COLUNAS_QUARENTENA].astype({c: object for c in TIPOS_COLUNAS})
+        rejeitadas.insert(0, "ficheiro", self.ficheiro_origem)
+        rejeitadas["rejeitado_em"] = datetime.now().isoformat(timespec="seconds")
+
+        if self.parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            tabela = pa.Table.from_pandas(rejeitadas.astype(str), preserve_index=False)
+            if self.__escritor_parquet is None:
+                self.__escritor_parquet = pq.ParquetWriter(self.caminho, tabela.schema, compression="zstd")
+            self.__escritor_parquet.write_table(tabela)
+        else:
+            rejeitadas.to_csv(self.caminho, sep=";", index=False, mode="w" if self.n_linhas == 0 else "a",
+                              header=self.n_linhas == 0, encoding="utf-8")
+        self.n_linhas += len(rejeitadas)
+
+    def fecha(self):
+        if self.__escritor_parquet is not None:
+            self.__escritor_parquet.close()
+            self.__escritor_parquet = None
+        if self.n_linhas:
+            print(f"{self.n_linhas} linhas rejeitadas escritas em {self.caminho}")
@@ -0,0 +1,180 @@
+import io
+
+import numpy as np
+import pandas as pd
+
+# ---------------------------------------------------------
+# Transformação colunar (vetorizada) do CSV de viagens
+# ---------------------------------------------------------
+# O CSV é lido por blocos de linhas já com tipos por coluna; as datas, a duração,
+# a classe de duração e a taxa são calculadas sobre colunas inteiras (sem ciclo
+# Python por linha). Cada bloco devolve também os membros distintos das dimensões.
+
+LINHAS_POR_BLOCO_CSV = 100_000
+
+# Texto com poucos valores distintos -> category (menos memória, distinct/merge mais rápidos)
+TIPOS_COLUNAS = {
+    "idviagem": str,
+    "taxa": str,
+    "datapartida": str,
+    "datachegada": str,
+    "cidade_origem": "category",
+    "pais_origem": "category",
+    "cidade_destino": "category",
+    "pais_destino": "category",
+    "nomecondutor": str,
+    "idadecondutor": str,
+    "certificacao": "category",
+    "nomebarco": str,
+    "tipobarco": "category",
+    "capacidadeteu": str,
+    "sexo": "category",
+    "numerocontentares": str,
+    "peso": str,
+}
+
+FORMATO_DATA = "%d/%m/%Y"
+
+# Limites superiores (inclusive) das classes de mapeia_duracao_para_texto()
+LIMITES_CLASSES_DURACAO = [-np.inf, 7, 15, 30, 60, np.inf]
+NOMES_CLASSES_DURACAO = ["0-7", "8-15", "16-30", "31-60", "60+"]
+
+# Colunas de texto que não podem vir vazias (chaves naturais das dimensões e da viagem)
+COLUNAS_OBRIGATORIAS = ["idviagem", "cidade_origem", "pais_origem", "nomecondutor", "certificacao",
+                        "nomebarco", "tipobarco"]
+
+# Colunas que formam a chave natural de cada dimensão (mesma ordem que os tuplos das chaves)
+COLUNAS_DIMENSOES = {
+    "classeduracao": ["classe_duracao"],
+    "localizacao": ["cidade_origem", "pais_origem"],
+    "tipo_viagem": ["tipobarco"],
+    "condutor": ["nomecondutor", "certificacao"],
+    "barco": ["nomebarco"],
+    "tempo": ["data_chegada"],
+}
+
+
+def le_csv_em_blocos(caminho_ou_buffer, linhas_por_bloco=LINHAS_POR_BLOCO_CSV, nomes_colunas=None):
+    """
+    Lê o CSV (delimitador ';') em blocos de DataFrames com os tipos de TIPOS_COLUNAS.
+    Com nomes_colunas, o ficheiro é lido sem cabeçalho (ex.: um bloco de bytes de etl_paralelo).
+    Cada bloco traz a coluna 'linha' com o número da linha no ficheiro (cabeçalho = linha 1).
+    """
+    leitor = pd.read_csv(
+        caminho_ou_buffer, sep=";", dtype=TIPOS_COLUNAS, chunksize=linhas_por_bloco,
+        header=None if nomes_colunas else "infer", names=nomes_colunas,
+        keep_default_na=False, encoding="utf-8",
+    )
+    primeira_linha = 2
+    for bloco in leitor:
+        bloco["linha"] = np.arange(primeira_linha, primeira_linha + len(bloco))
+        primeira_linha += len(bloco)
+        yield bloco
+
+
+def le_bloco_de_linhas(linhas, nomes_colunas, linha_inicial):
+    """Converte linhas de texto (sem cabeçalho) num único DataFrame tipado."""
+    bloco = pd.read_csv(io.StringIO("\n".join(linhas)), sep=";", dtype=TIPOS_COLUNAS, header=None,
+                        names=nomes_colunas, keep_default_na=False)
+    bloco["linha"] = np.arange(linha_inicial, linha_inicial + len(bloco))
+    return bloco
+
+
+def classe_duracao_vetorizada(duracao):
+    """Versão vetorizada de mapeia_duracao_para_texto() (devolve uma Series de texto)."""
+    return pd.cut(duracao, bins=LIMITES_CLASSES_DURACAO, labels=NOMES_CLASSES_DURACAO, right=True).astype(object)
+
+
+def transforma_bloco(bloco):
+    """
+    Calcula as colunas derivadas de um bloco:
+      data_chegada, data_partida (datetime64), duracao (dias), classe_duracao,
+      taxa_eur (float, vírgula decimal) e idade (inteiro).
+    A coluna 'motivo_rejeicao' traz os motivos de motivos_rejeicao() e a coluna booleana
+    'valida' indica as linhas sem nenhum motivo.
+    """
+    bloco["data_chegada"] = pd.to_datetime(bloco["datachegada"], format=FORMATO_DATA, errors="coerce")
+    bloco["data_partida"] = pd.to_datetime(bloco["datapartida"], format=FORMATO_DATA, errors="coerce")
+    bloco["duracao"] = (bloco["data_chegada"] - bloco["data_partida"]).dt.days
+    bloco["classe_duracao"] = classe_duracao_vetorizada(bloco["duracao"])
+
+    bloco["taxa_eur"] = pd.to_numeric(bloco["taxa"].str.replace(",", ".", regex=False), errors="coerce")
+    bloco["idade"] = pd.to_numeric(bloco["idadecondutor"], errors="coerce")
+
+    bloco["motivo_rejeicao"] = motivos_rejeicao(bloco)
+    bloco["valida"] = bloco["motivo_rejeicao"] == ""
+    return bloco
+
+
+def motivos_rejeicao(bloco):
+    """
+    Validação vetorizada de um bloco já convertido por transforma_bloco(): devolve uma Series
+    de texto com os motivos de rejeição de cada linha separados por "; " ("" = linha válida).
+    """
+    verificacoes = [
+        (bloco["data_chegada"].isna(), "datachegada inválida"),
+        (bloco["data_partida"].isna(), "datapartida inválida"),
+        (bloco["duracao"] < 0, "datachegada anterior à datapartida"),
+        (bloco["taxa_eur"].isna(), "taxa inválida"),
+        (bloco["idade"].isna(), "idadecondutor inválida"),
+        ((bloco["idade"] % 1).fillna(0) != 0, "idadecondutor não inteira"),
+    ]
+    for coluna in COLUNAS_OBRIGATORIAS:
+        verificacoes.append((bloco[coluna].astype(object).fillna("").astype(str).str.strip() == "",
+                             f"{coluna} vazio"))
+
+    motivos = pd.Series("", index=bloco.index, dtype=object)
+    for mascara, motivo in verificacoes:
+        mascara = mascara.fillna(False).to_numpy(dtype=bool)
+        motivos[mascara] = motivos[mascara] + motivo + "; "
+    return motivos.str[:-2].where(motivos != "", "")
+
+
+def membros_dimensoes(bloco, dimensoes=None):
+    """
+    Membros distintos de cada dimensão (por omissão, todas as de COLUNAS_DIMENSOES) nas
+    linhas válidas de um bloco transformado. Devolve {dimensão: DataFrame}; condutor traz
+    também a 'idade' e classeduracao uma 'duracao' representativa (necessárias aos get_or_create).
+    """
+    validas = bloco[bloco["valida"]]
+    membros = {}
+    for dimensao in dimensoes or COLUNAS_DIMENSOES:
+        colunas = COLUNAS_DIMENSOES[dimensao]
+        extra = {"condutor": ["idade"], "classeduracao": ["duracao"]}.get(dimensao, [])
+        membros[dimensao] = (validas[colunas + extra]
+                             .astype({c: object for c in colunas})
+                             .drop_duplicates(subset=colunas)
+                             .reset_index(drop=True))
+    return membros
+
+
+def chave_natural(dimensao, membro):
+    """Chave natural (tuplo ou valor) de um membro devolvido por membros_dimensoes()."""
+    colunas = COLUNAS_DIMENSOES[dimensao]
+    valores = tuple(membro[c] for c in colunas)
+    if dimensao == "tempo":
+        return valores[0].date()
+    return valores if len(valores) > 1 else valores[0]
+
+
+def mapeia_chaves(bloco, chaves, dimensoes=None):
+    """
+    Acrescenta ao bloco as colunas id_<dimensão> com as SKs de chaves ({dimensão: {chave natural: SK}}),
+    por JOIN (merge) vetorizado. Membros sem SK ficam a NaN.
+    """
+    for dimensao in dimensoes or COLUNAS_DIMENSOES:
+        colunas = COLUNAS_DIMENSOES[dimensao]
+        naturais = list(chaves[dimensao].keys())
+        if dimensao == "tempo":
+            valores = [pd.Timestamp(d) for d in naturais]
+            tabela = pd.DataFrame({colunas[0]: pd.to_datetime(valores) if valores else pd.to_datetime([])})
+        elif len(colunas) > 1:
+            tabela = pd.DataFrame(naturais, columns=colunas, dtype=object)
+        else:
+            tabela = pd.DataFrame({colunas[0]: pd.Series(naturais, dtype=object)})
+        tabela[f"id_{dimensao}"] = list(chaves[dimensao].values())
+
+        chaves_bloco = bloco[colunas].astype({c: object for c in colunas if c != "data_chegada"})
+        ids = chaves_bloco.merge(tabela, how="left", on=colunas)[f"id_{dimensao}"]
+        bloco[f"id_{dimensao}"] = ids.to_numpy()
+    return bloco
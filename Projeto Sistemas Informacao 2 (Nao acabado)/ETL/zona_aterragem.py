@@ -0,0 +1,83 @@
+import glob
+import os
+import shutil
+from datetime import datetime
+
+import pandas as pd
+
+# ---------------------------------------------------------
+# Zona de aterragem (landing zone) em Parquet
+# ---------------------------------------------------------
+# A extração (MySQL ou CSV) e a carga no DW podem correr em separado:
+#   ETL_FASE=extracao -> escreve as viagens extraídas/transformadas em Parquet comprimido,
+#                        particionado por ano/mês de chegada (<zona>/<origem>/ano=AAAA/mes=M/)
+#   ETL_FASE=carga    -> relê as partições e carrega-as no DW em massa, sem tocar na origem
+#   ETL_FASE vazio    -> extração e carga diretas, como antes
+# Cada partição carregada recebe um marcador _CARREGADO_<base de dados>; uma carga
+# interrompida retoma nas partições ainda sem marcador. Uma nova extração substitui
+# todas as partições da origem (e respetivos marcadores).
+
+ETL_FASE = os.getenv("ETL_FASE", "")
+FASE_EXTRACAO = "extracao"
+FASE_CARGA = "carga"
+
+ZONA_ATERRAGEM = os.getenv("ETL_ZONA_ATERRAGEM", "zona_aterragem")
+COMPRESSAO = os.getenv("ETL_ZONA_COMPRESSAO", "zstd")
+COLUNA_PARTICAO = "data_chegada"
+
+
+def pasta_origem(origem, raiz=ZONA_ATERRAGEM):
+    """Pasta da zona de aterragem de uma origem (ex.: "mysql", "csv/dados_atualizado")."""
+    return os.path.join(raiz, *origem.split("/"))
+
+
+def limpa_origem(origem, raiz=ZONA_ATERRAGEM):
+    """Apaga as partições de uma origem (no início de uma nova extração)."""
+    shutil.rmtree(pasta_origem(origem, raiz), ignore_errors=True)
+
+
+def escreve_particoes(df, origem, sufixo, raiz=ZONA_ATERRAGEM):
+    """
+    Acrescenta as linhas de df às partições ano=/mes= (de COLUNA_PARTICAO) da origem.
+    sufixo distingue os ficheiros de cada escrita (ex.: nº do bloco) dentro da mesma partição.
+    Devolve o nº de linhas escritas.
+    """
+    if not len(df):
+        return 0
+    datas = pd.to_datetime(df[COLUNA_PARTICAO])
+    df = df.assign(ano=datas.dt.year, mes=datas.dt.month)
+    df.to_parquet(pasta_origem(origem, raiz), engine="pyarrow", partition_cols=["ano", "mes"],
+                  compression=COMPRESSAO, index=False,
+                  basename_template=f"{datetime.now():%Y%m%dT%H%M%S}-{sufixo}-{{i}}.parquet",
+                  existing_data_behavior="overwrite_or_ignore")
+    return len(df)
+
+
+def particoes(origem, raiz=ZONA_ATERRAGEM):
+    """Partições de uma origem por ordem cronológica: [{"nome", "caminho", "ano", "mes"}]."""
+    encontradas = []
+    for caminho in glob.glob(os.path.join(pasta_origem(origem, raiz), "ano=*", "mes=*")):
+        ano = int(os.path.basename(os.path.dirname(caminho)).split("=")[1])
+        mes = int(os.path.basename(caminho).split("=")[1])
+        encontradas.append({"nome": f"{ano:04d}-{mes:02d}", "caminho": caminho, "ano": ano, "mes": mes})
+    return sorted(encontradas, key=lambda p: (p["ano"], p["mes"]))
+
+
+def le_particao(particao):
+    """Lê todos os ficheiros Parquet de uma partição num DataFrame (ordenado por COLUNA_PARTICAO)."""
+    df = pd.read_parquet(particao["caminho"], engine="pyarrow")
+    return df.sort_values(COLUNA_PARTICAO, kind="stable").reset_index(drop=True)
+
+
+def _marcador(particao, destino):
+    return os.path.join(particao["caminho"], f"_CARREGADO_{destino}")
+
+
+def particao_carregada(particao, destino):
+    return os.path.exists(_marcador(particao, destino))
+
+
+def marca_carregada(particao, destino, linhas):
+    """Regista que a partição foi carregada no DW destino (o pyarrow ignora ficheiros começados por _)."""
+    with open(_marcador(particao, destino), mode="w", encoding="utf-8") as ficheiro:
+        ficheiro.write(f"{datetime.now().isoformat(timespec='seconds')};{linhas}\n")
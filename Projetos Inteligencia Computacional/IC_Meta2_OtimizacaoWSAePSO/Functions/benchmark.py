@@ -0,0 +1,250 @@
+import csv
+import json
+import time
+import tracemalloc
+
+import numpy as np
+
+from .ackley import ackley_function
+from .islands import ALGORITHMS
+from .rastrigin import rastrigin_function
+from .rosenbrock import rosenbrock_function
+
+# Funções de teste: nome -> (função, lb, ub, valor ótimo)
+FUNCTIONS = {
+    "ackley": (ackley_function, -32.768, 32.768, 0.0),
+    "rastrigin": (rastrigin_function, -5.12, 5.12, 0.0),
+    "rosenbrock": (rosenbrock_function, -5.0, 10.0, 0.0),
+}
+
+# Métricas comparadas com a baseline: nome -> (tolerância relativa,
+# tolerância absoluta); em todas, menor é melhor
+METRICS = {
+    "median_fitness": (0.1, 1e-6),
+    "ert": (0.1, 0),
+    "time_per_iteration": (0.3, 1e-4),
+    "peak_memory_kb": (0.1, 1),
+}
+
+KEY = ("algorithm", "function", "dimension", "budget")
+
+
+class _counter(object):
+    """
+    Wrapper of the fitness function: counts the evaluations, the time spent
+    in them and the first evaluation that reaches the target
+    """
+
+    def __init__(self, function, target):
+        self.__function = function
+        self.__target = target
+        self.evaluations = 0
+        self.fitness_time = 0.0
+        self.hit = None
+
+    def __call__(self, x):
+        start = time.perf_counter()
+        value = self.__function(x)
+        self.fitness_time += time.perf_counter() - start
+        self.evaluations += 1
+        if self.hit is None and value <= self.__target:
+            self.hit = self.evaluations
+        return value
+
+
+def run(algorithm, function, dimension, budget, n=30, seed=None, target=1e-2,
+        options=None):
+    """
+    Runs one optimizer until it has used budget fitness evaluations.
+
+    :param algorithm: name in islands.ALGORITHMS ("pso", "wsa", "de" or
+    "cmaes")
+    :param function: name in FUNCTIONS
+    :param dimension: space dimension
+    :param budget: number of fitness evaluations
+    :param n: number of agents (default value is 30)
+    :param seed: seed of the optimizer's np.random.Generator (default value
+    is None)
+    :param target: distance to the optimum counted as success (default value
+    is 1e-2)
+    :param options: keyword arguments of the optimizer class (default value
+    is None)
+    :return: dict with the run record; curve has one [evaluations, Gbest
+    fitness] pair per iteration
+    """
+
+    fitness_function, lb, ub, optimum = FUNCTIONS[function]
+    counter = _counter(fitness_function, optimum + target)
+
+    # Memória de pico medida só no aquecimento (construção dos buffers e
+    # 1.ª iteração): o tracemalloc torna as alocações mais lentas e
+    # estragaria os tempos
+    tracemalloc.start()
+    try:
+        optimizer = ALGORITHMS[algorithm](
+            n, counter, [lb] * dimension, [ub] * dimension, dimension, 0,
+            seed=seed, history=False, **(options or {}))
+        optimizer.iterate(1)
+        peak_memory = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    curve = [[counter.evaluations, optimizer.get_Gbest_fitness()]]
+
+    counter.fitness_time = 0.0
+    iterations = 0
+    start = time.perf_counter()
+    while counter.evaluations < budget:
+        optimizer.iterate(1)
+        iterations += 1
+        curve.append([counter.evaluations, optimizer.get_Gbest_fitness()])
+    total = time.perf_counter() - start
+
+    return {
+        "algorithm": algorithm,
+        "function": function,
+        "dimension": dimension,
+        "budget": budget,
+        "n": n,
+        "seed": seed,
+        "best_fitness": optimizer.get_Gbest_fitness(),
+        "evaluations": counter.evaluations,
+        "evaluations_to_target": counter.hit,
+        "iterations": iterations,
+        "time_total": total,
+        "time_per_iteration": total / iterations if iterations else None,
+        "time_fitness": counter.fitness_time,
+        "time_overhead": total - counter.fitness_time,
+        "peak_memory_kb": peak_memory / 1024,
+        "curve": curve,
+    }
+
+
+def suite(algorithms, functions, dimensions, budgets, runs=5, n=30, seed=0,
+          target=1e-2, options=None):
+    """
+    Runs every optimizer over the function x dimension x budget grid.
+
+    :param algorithms: list of names in islands.ALGORITHMS
+    :param functions: list of names in FUNCTIONS
+    :param dimensions: list of space dimensions
+    :param budgets: list of fitness evaluation budgets
+    :param runs: independent runs of every cell (default value is 5)
+    :param n: number of agents (default value is 30)
+    :param seed: base seed; run r of every cell uses the seed [seed, r], so
+    the whole suite is reproducible (default value is 0)
+    :param target: distance to the optimum counted as success (default value
+    is 1e-2)
+    :param options: dict algorithm -> keyword arguments of its class
+    (default value is None)
+    :return: list with the record of every run
+    """
+
+    options = options or {}
+    records = []
+    for function in functions:
+        for dimension in dimensions:
+            for budget in budgets:
+                for algorithm in algorithms:
+                    for r in range(runs):
+                        record = run(algorithm, function, dimension, budget,
+                                     n=n, seed=[seed, r], target=target,
+                                     options=options.get(algorithm))
+                        record["run"] = r
+                        records.append(record)
+    return records
+
+
+def summary(records):
+    """
+    Aggregates the runs of every (algorithm, function, dimension, budget)
+    cell. ert is the expected running time: evaluations used by all runs
+    (up to the target, in the successful ones) over the number of successful
+    runs, None if no run reached the target.
+
+    :param records: list returned by suite()
+    :return: list with one dict per cell
+    """
+
+    cells = {}
+    for record in records:
+        cells.setdefault(tuple(record[k] for k in KEY), []).append(record)
+
+    rows = []
+    for key, cell in cells.items():
+        fitness = [r["best_fitness"] for r in cell]
+        hits = [r["evaluations_to_target"] for r in cell]
+        successes = sum(h is not None for h in hits)
+        used = sum(h if h is not None else r["evaluations"]
+                   for h, r in zip(hits, cell))
+        times = [r["time_per_iteration"] for r in cell
+                 if r["time_per_iteration"] is not None]
+        total = sum(r["time_total"] for r in cell)
+        row = dict(zip(KEY, key))
+        row.update({
+            "runs": len(cell),
+            "median_fitness": float(np.median(fitness)),
+            "mean_fitness": float(np.mean(fitness)),
+            "min_fitness": float(np.min(fitness)),
+            "success_rate": successes / len(cell),
+            "ert": used / successes if successes else None,
+            "time_per_iteration": float(np.median(times)) if times else None,
+            "fitness_time_share": sum(r["time_fitness"] for r in cell) / total
+            if total else None,
+            "peak_memory_kb": max(r["peak_memory_kb"] for r in cell),
+        })
+        rows.append(row)
+    return rows
+
+
+def compare(rows, baseline):
+    """
+    Compares a summary with a stored baseline summary.
+
+    :param rows: list returned by summary()
+    :param baseline: list returned by summary() in an earlier version
+    :return: list of regressions, dicts with the cell, the metric, and the
+    baseline and current values (empty if nothing got worse than METRICS
+    allows)
+    """
+
+    reference = {tuple(b[k] for k in KEY): b for b in baseline}
+    regressions = []
+    for row in rows:
+        old = reference.get(tuple(row[k] for k in KEY))
+        if old is None:
+            continue
+        for metric, (relative, absolute) in METRICS.items():
+            before, after = old.get(metric), row.get(metric)
+            if before is None:
+                continue
+            # ert None: a célula deixou de atingir o alvo
+            if after is None or after > before * (1 + relative) + absolute:
+                regression = {k: row[k] for k in KEY}
+                regression.update({"metric": metric, "baseline": before,
+                                   "current": after})
+                regressions.append(regression)
+    return regressions
+
+
+def save_csv(rows, path):
+    """Writes a list of records or summary rows to CSV (without curves)"""
+
+    fields = [k for k in rows[0] if k != "curve"]
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=fields, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def save_json(data, path):
+    """Writes the results (records, summary) to JSON"""
+
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=1)
+
+
+def load_json(path):
+    """Reads results written by save_json"""
+
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
@@ -0,0 +1,189 @@
+import time
+
+import numpy as np
+
+from . import intelligence
+
+
+class cmaes(intelligence.sw):
+    """
+    Covariance Matrix Adaptation Evolution Strategy
+    ((mu/mu_w, lambda)-CMA-ES; a pesquisa é feita no espaço normalizado
+    [0, 1]^d, para limites com escalas muito diferentes, ex.: LR e neurónios)
+    """
+
+    def __init__(self, n, function, lb, ub, dimension, iteration, sigma=0.3,
+                 seed=None, history=True, observers=None, initial=None):
+        """
+        :param n: number of agents sampled at every iteration (lambda)
+        :param function: test function
+        :param lb: lower limits for plot axes
+        :param ub: upper limits for plot axes
+        :param dimension: space dimension
+        :param iteration: the number of iterations
+        :param sigma: initial step size, as a fraction of ub - lb
+        (default value is 0.3)
+        :param seed: seed of the np.random.Generator (default value is None)
+        :param history: keep every iteration's agents for get_agents()
+        (default value is True)
+        :param observers: list of Functions.observers notified at every
+        iteration; CMA-ES has no neighbor search, time_neighbors is always 0
+        (default value is None: silent)
+        :param initial: array (k, dimension) of positions, best first; the
+        first one is the initial mean, e.g. the best trial of an earlier run
+        (default value is None: random mean)
+        """
+
+        super(cmaes, self).__init__(observers)
+
+        if n < 2:
+            raise ValueError("CMA-ES precisa de pelo menos 2 agentes")
+
+        self.__function = function
+        self.__history = history
+        self.__rng = np.random.default_rng(seed)
+        self.__lb = np.asarray(lb, dtype=np.float64)
+        self.__width = np.asarray(ub, dtype=np.float64) - self.__lb
+
+        # Parâmetros de estratégia (valores por omissão de Hansen, 2016)
+        d = dimension
+        mu = n // 2
+        weights = np.log((n + 1) / 2) - np.log(np.arange(1, mu + 1))
+        self.__weights = weights / weights.sum()
+        self.__mu_eff = 1 / (self.__weights ** 2).sum()
+        mu_eff = self.__mu_eff
+        self.__cc = (4 + mu_eff / d) / (d + 4 + 2 * mu_eff / d)
+        self.__cs = (mu_eff + 2) / (d + mu_eff + 5)
+        self.__c1 = 2 / ((d + 1.3) ** 2 + mu_eff)
+        self.__cmu = min(1 - self.__c1, 2 * (mu_eff - 2 + 1 / mu_eff) /
+                         ((d + 2) ** 2 + mu_eff))
+        self.__damps = 1 + 2 * max(0, np.sqrt((mu_eff - 1) / (d + 1)) - 1) + \
+            self.__cs
+        self.__chi_n = np.sqrt(d) * (1 - 1 / (4 * d) + 1 / (21 * d ** 2))
+
+        # Estado da distribuição (espaço normalizado)
+        self.__mean = self.__rng.uniform(0, 1, d)
+        if initial is not None and len(initial):
+            self.__mean = np.clip((np.asarray(initial[0], dtype=np.float64) -
+                                   self.__lb) / self.__width, 0, 1)
+        self.__sigma = sigma
+        self.__C = np.eye(d)
+        self.__B = np.eye(d)
+        self.__D = np.ones(d)
+        self.__pc = np.zeros(d)
+        self.__ps = np.zeros(d)
+        self.__generation = 0
+        self.__eigen_generation = 0
+
+        self.__z = np.empty((n, d))
+        self.__y = np.empty((n, d))
+        self.__x = np.empty((n, d))
+        self.__fitness = np.full(n, np.inf)
+        self.__agents = np.empty((n, d))
+        self.__Gbest_fitness = float("inf")
+
+        self.iterate(iteration)
+
+    def iterate(self, iteration):
+        """Continues the optimization for the given number of iterations"""
+
+        z, y, x = self.__z, self.__y, self.__x
+        n, d = x.shape
+        mu = len(self.__weights)
+
+        for t in range(iteration):
+
+            start = self._start_iteration()
+
+            # Amostragem em lote: x = m + sigma * B D z, z ~ N(0, I)
+            self.__rng.standard_normal(out=z)
+            np.matmul(z * self.__D, self.__B.T, out=y)
+            np.multiply(y, self.__sigma, out=x)
+            x += self.__mean
+            np.clip(x, 0, 1, out=x)
+            # Passo efetivo (depois do clip), usado na atualização
+            np.subtract(x, self.__mean, out=y)
+            y /= self.__sigma
+
+            np.multiply(x, self.__width, out=self.__agents)
+            self.__agents += self.__lb
+            if self.__history:
+                self._points(self.__agents)
+            sampled = time.perf_counter()
+            for i in range(n):
+                self.__fitness[i] = self.__function(self.__agents[i])
+            evaluated = time.perf_counter()
+
+            order = np.argsort(self.__fitness)
+            if self.__fitness[order[0]] < self.__Gbest_fitness:
+                self.__Gbest_fitness = float(self.__fitness[order[0]])
+                self._set_Gbest(self.__agents[order[0]].copy())
+
+            self.__update_distribution(y[order[:mu]])
+
+            self._end_iteration(self.__agents, evaluated - sampled, 0.0,
+                                sampled - start +
+                                time.perf_counter() - evaluated)
+
+    def __update_distribution(self, y_best):
+        d = len(self.__mean)
+        self.__generation += 1
+        mu_eff, cs, cc = self.__mu_eff, self.__cs, self.__cc
+        c1, cmu = self.__c1, self.__cmu
+
+        y_w = self.__weights @ y_best
+        self.__mean = self.__mean + self.__sigma * y_w
+
+        # Caminhos de evolução (C^-1/2 = B D^-1 B^T)
+        C_inv_sqrt_y = self.__B @ ((self.__B.T @ y_w) / self.__D)
+        self.__ps = (1 - cs) * self.__ps + \
+            np.sqrt(cs * (2 - cs) * mu_eff) * C_inv_sqrt_y
+        norm_ps = np.linalg.norm(self.__ps)
+        h_sigma = norm_ps / np.sqrt(
+            1 - (1 - cs) ** (2 * self.__generation)) / self.__chi_n < \
+            1.4 + 2 / (d + 1)
+        self.__pc = (1 - cc) * self.__pc + \
+            h_sigma * np.sqrt(cc * (2 - cc) * mu_eff) * y_w
+
+        # Atualização rank-one + rank-mu da covariância
+        rank_mu = (y_best * self.__weights[:, np.newaxis]).T @ y_best
+        self.__C = (1 - c1 - cmu) * self.__C + \
+            c1 * (np.outer(self.__pc, self.__pc) +
+                  (1 - h_sigma) * cc * (2 - cc) * self.__C) + cmu * rank_mu
+
+        self.__sigma *= np.exp((cs / self.__damps) * (norm_ps / self.__chi_n -
+                                                      1))
+        self.__sigma = min(self.__sigma, 1.0)
+
+        # Decomposição B D^2 B^T só de vez em quando (custo O(d^3))
+        if self.__generation - self.__eigen_generation > \
+                1 / (c1 + cmu) / d / 10:
+            self.__eigen_generation = self.__generation
+            self.__C = np.triu(self.__C) + np.triu(self.__C, 1).T
+            eigenvalues, self.__B = np.linalg.eigh(self.__C)
+            self.__D = np.sqrt(np.maximum(eigenvalues, 1e-20))
+
+    def get_best_agents(self, k):
+        """Returns the k best agents of the last iteration and their fitness
+        (migration)"""
+
+        best = np.argsort(self.__fitness)[:k]
+        return self.__agents[best].copy(), self.__fitness[best].copy()
+
+    def immigrate(self, positions, fitness):
+        """Moves the mean to the best immigrant if it beats the last
+        iteration (migration)"""
+
+        if not len(fitness):
+            return
+        best = int(np.argmin(fitness))
+        if fitness[best] < self.__fitness.min():
+            self.__mean = (np.asarray(positions[best], dtype=np.float64) -
+                           self.__lb) / self.__width
+        if fitness[best] < self.__Gbest_fitness:
+            self.__Gbest_fitness = float(fitness[best])
+            self._set_Gbest(np.array(positions[best], dtype=np.float64))
+
+    def get_Gbest_fitness(self):
+        """Retorna o melhor fitness (score) encontrado durante a otimização."""
+        return self.__Gbest_fitness
@@ -0,0 +1,181 @@
+import time
+
+import numpy as np
+
+from . import intelligence
+
+
+class de(intelligence.sw):
+    """
+    Differential Evolution
+    (rand/1/bin, com adaptação de F e CR ao estilo JADE)
+    """
+
+    def __init__(self, n, function, lb, ub, dimension, iteration, F=0.5,
+                 CR=0.9, adaptive=True, c=0.1, seed=None, dtype=np.float64,
+                 history=True, surrogate=None, observers=None,
+                 initial=None):
+        """
+        :param n: number of agents (at least 4)
+        :param function: test function
+        :param lb: lower limits for plot axes
+        :param ub: upper limits for plot axes
+        :param dimension: space dimension
+        :param iteration: the number of iterations
+        :param F: differential weight of the mutation v = x_r1 + F (x_r2 -
+        x_r3); with adaptive=True, the initial mean of the per-agent F
+        (default value is 0.5)
+        :param CR: crossover probability; with adaptive=True, the initial
+        mean of the per-agent CR (default value is 0.9)
+        :param adaptive: JADE adaptation: every agent draws F ~ Cauchy(mu_F,
+        0.1) and CR ~ N(mu_CR, 0.1), and the means move towards the values
+        of the successful trials (default value is True)
+        :param c: learning rate of mu_F and mu_CR (default value is 0.1)
+        :param seed: seed of the np.random.Generator (default value is None)
+        :param dtype: dtype of the positions, np.float64 or np.float32
+        (default value is np.float64)
+        :param history: keep every iteration's agents for get_agents()
+        (default value is True)
+        :param surrogate: Functions.surrogate.surrogate that pre-screens
+        every trial population (default value is None)
+        :param observers: list of Functions.observers notified at every
+        iteration (default value is None: silent)
+        :param initial: array (k, dimension), k <= n, of positions that
+        replace the first random agents, e.g. the best trials of an earlier
+        run (default value is None)
+        """
+
+        super(de, self).__init__(observers)
+
+        if n < 4:
+            raise ValueError("DE rand/1 precisa de pelo menos 4 agentes")
+
+        self.__function = function
+        self.__mu_F, self.__mu_CR = F, CR
+        self.__adaptive, self.__c = adaptive, c
+        self.__history = history
+        self.__surrogate = surrogate
+        self.__rng = np.random.default_rng(seed)
+        self.__lb = np.asarray(lb, dtype=dtype)
+        self.__ub = np.asarray(ub, dtype=dtype)
+
+        self.__agents = intelligence.initial_agents(
+            self.__rng, self.__lb, self.__ub, n, dimension, dtype, initial)
+        if history:
+            self._points(self.__agents)
+
+        # Buffers reutilizados em todas as iterações
+        self.__trials = np.empty_like(self.__agents)
+        self.__fitness = np.empty(n)
+        self.__trial_fitness = np.empty(n)
+        self.__keys = np.empty((n, n))
+
+        self.__evaluate(self.__agents, self.__fitness)
+        self.__Gbest_fitness = float("inf")
+        self.__update_Gbest()
+
+        self.iterate(iteration)
+
+    def iterate(self, iteration):
+        """Continues the optimization for the given number of iterations"""
+
+        agents, trials = self.__agents, self.__trials
+        n, dimension = agents.shape
+        rng, keys = self.__rng, self.__keys
+
+        for t in range(iteration):
+
+            start = self._start_iteration()
+            F, CR = self.__parameters(n)
+
+            # r1, r2, r3 distintos entre si e de i: as 3 menores chaves
+            # aleatórias de cada linha, com a diagonal excluída
+            rng.random(out=keys)
+            np.fill_diagonal(keys, np.inf)
+            r = np.argpartition(keys, 3, axis=1)[:, :3]
+            neighbors_done = time.perf_counter()
+
+            # Mutação rand/1: trials = x_r1 + F (x_r2 - x_r3)
+            np.subtract(agents[r[:, 1]], agents[r[:, 2]], out=trials)
+            trials *= F[:, np.newaxis]
+            trials += agents[r[:, 0]]
+
+            # Crossover binomial (pelo menos uma coordenada do mutante)
+            keep = rng.random((n, dimension)) >= CR[:, np.newaxis]
+            keep[np.arange(n), rng.integers(0, dimension, n)] = False
+            np.copyto(trials, agents, where=keep)
+            np.clip(trials, self.__lb, self.__ub, out=trials)
+
+            # Seleção: o trial substitui o agente se não for pior
+            update_done = time.perf_counter()
+            self.__evaluate(trials, self.__trial_fitness)
+            evaluated = time.perf_counter()
+            success = self.__trial_fitness <= self.__fitness
+            np.copyto(agents, trials, where=success[:, np.newaxis])
+            np.copyto(self.__fitness, self.__trial_fitness, where=success)
+            if self.__history:
+                self._points(agents)
+
+            if self.__adaptive and success.any():
+                self.__adapt(F[success], CR[success])
+            self.__update_Gbest()
+
+            self._end_iteration(agents, evaluated - update_done,
+                                neighbors_done - start,
+                                update_done - neighbors_done +
+                                time.perf_counter() - evaluated)
+
+    def __parameters(self, n):
+        if not self.__adaptive:
+            return np.full(n, self.__mu_F), np.full(n, self.__mu_CR)
+
+        CR = np.clip(self.__rng.normal(self.__mu_CR, 0.1, n), 0, 1)
+        # F ~ Cauchy(mu_F, 0.1), novamente sorteado se <= 0, truncado a 1
+        F = np.empty(n)
+        pending = np.arange(n)
+        while len(pending):
+            F[pending] = self.__mu_F + 0.1 * self.__rng.standard_cauchy(
+                len(pending))
+            pending = pending[F[pending] <= 0]
+        return np.minimum(F, 1), CR
+
+    def __adapt(self, F, CR):
+        c = self.__c
+        self.__mu_CR = (1 - c) * self.__mu_CR + c * CR.mean()
+        # Média de Lehmer (favorece F maiores, como no JADE)
+        self.__mu_F = (1 - c) * self.__mu_F + c * (F ** 2).sum() / F.sum()
+
+    def __evaluate(self, agents, fitness):
+        # Com surrogate, os trials não avaliados ficam com fitness inf
+        # (nunca substituem o agente)
+        if self.__surrogate is not None:
+            self.__surrogate.evaluate(self.__function, agents, fitness)
+            return
+        for i in range(len(fitness)):
+            fitness[i] = self.__function(agents[i])
+
+    def __update_Gbest(self):
+        best = self.__fitness.argmin()
+        if self.__fitness[best] < self.__Gbest_fitness:
+            self.__Gbest_fitness = float(self.__fitness[best])
+            self._set_Gbest(self.__agents[best].copy())
+
+    def get_best_agents(self, k):
+        """Returns the k best agents and their fitness (migration)"""
+
+        best = np.argsort(self.__fitness)[:k]
+        return self.__agents[best].copy(), self.__fitness[best].copy()
+
+    def immigrate(self, positions, fitness):
+        """Replaces the worst agents by the given positions, already
+        evaluated with the given fitness (migration)"""
+
+        worst = np.argsort(self.__fitness)[len(self.__fitness) -
+                                           len(fitness):]
+        self.__agents[worst] = positions
+        self.__fitness[worst] = fitness
+        self.__update_Gbest()
+
+    def get_Gbest_fitness(self):
+        """Retorna o melhor fitness (score) encontrado durante a otimização."""
+        return self.__Gbest_fitness
@@ -1,9 +1,35 @@
+import time
+
+import numpy as np
+
+
+def initial_agents(rng, lb, ub, n, dimension, dtype, initial=None):
+    """
+    Initial population: uniform in [lb, ub], with the first rows replaced by
+    the given positions (e.g. the best trials of earlier runs).
+
+    :param initial: array (k, dimension) of positions, k <= n; clipped to
+    [lb, ub] (default value is None)
+    :return: array (n, dimension)
+    """
+
+    # Sorteia sempre a população inteira: a sequência do rng não depende de
+    # initial
+    agents = rng.uniform(lb, ub, (n, dimension)).astype(dtype)
+    if initial is not None and len(initial):
+        initial = np.asarray(initial, dtype=dtype)[:n]
+        agents[:len(initial)] = np.clip(initial, lb, ub)
+    return agents
+
+
 class sw(object):
 
-    def __init__(self):
+    def __init__(self, observers=None):
 
         self.__Positions = []
         self.__Gbest = []
+        self.__observers = list(observers or [])
+        self.__iteration = 0
 
     def _set_Gbest(self, Gbest):
         self.__Gbest = Gbest
@@ -21,3 +47,66 @@ class sw(object):
         """Return the best position of algorithm (return type: list)"""
 
         return list(self.__Gbest)
+
+    def add_observer(self, observer):
+        """Attaches an observer (Functions.observers) notified at every
+        iteration"""
+
+        self.__observers.append(observer)
+
+    def close_observers(self):
+        """Closes every observer (ends the progress line, closes trace
+        files, dumps the profile); call it once the optimization is over"""
+
+        for observer in self.__observers:
+            observer.close()
+
+    def _start_iteration(self):
+        # Devolve o instante de início (os tempos só são usados se houver
+        # observadores; sem eles não há mais nenhum custo)
+        self.__iteration += 1
+        for observer in self.__observers:
+            observer.start(self.__iteration)
+        return time.perf_counter()
+
+    def _end_iteration(self, agents, time_fitness, time_neighbors,
+                       time_update):
+        if not self.__observers:
+            return
+        # Diversidade: distância média dos agentes ao centroide
+        diversity = float(np.mean(np.linalg.norm(
+            agents - agents.mean(axis=0), axis=1)))
+        event = {
+            "algorithm": type(self).__name__,
+            "iteration": self.__iteration,
+            "Gbest_fitness": self.get_Gbest_fitness(),
+            "diversity": diversity,
+            "time_fitness": time_fitness,
+            "time_neighbors": time_neighbors,
+            "time_update": time_update,
+        }
+        for observer in self.__observers:
+            observer.update(event)
+
+    def get_Gbest_fitness(self):
+        """Returns the best fitness found (return type: float)"""
+
+        raise NotImplementedError
+
+    def iterate(self, iteration):
+        """Continues the optimization for the given number of iterations
+        (island model)"""
+
+        raise NotImplementedError
+
+    def get_best_agents(self, k):
+        """Returns the k best agents and their fitness (return type: tuple
+        of arrays, island model migration)"""
+
+        raise NotImplementedError
+
+    def immigrate(self, positions, fitness):
+        """Replaces the worst agents by already evaluated positions (island
+        model migration)"""
+
+        raise NotImplementedError
@@ -0,0 +1,215 @@
+import multiprocessing
+
+import numpy as np
+
+from . import intelligence
+from .cmaes import cmaes
+from .de import de
+from .pso import pso
+from .wsa import wsa
+
+ALGORITHMS = {"pso": pso, "wsa": wsa, "de": de, "cmaes": cmaes}
+
+
+def migration_targets(k, topology, rng):
+    """
+    Destination islands of the migrants of each island.
+
+    :param k: number of islands
+    :param topology: "ring" (i -> i+1), "all" (i -> every other island) or
+    "random" (i -> one random island, drawn at every migration)
+    :param rng: np.random.Generator used by the "random" topology
+    :return: list with the destination indices of each island
+    """
+
+    if k < 2:
+        return [[] for _ in range(k)]
+    if topology == "ring":
+        return [[(i + 1) % k] for i in range(k)]
+    if topology == "all":
+        return [[j for j in range(k) if j != i] for i in range(k)]
+    if topology == "random":
+        return [[(i + int(rng.integers(1, k))) % k] for i in range(k)]
+    raise ValueError(f"Topologia de migração desconhecida: {topology} "
+                     f"(ring, all ou random)")
+
+
+def _create_island(algorithm, n, function, lb, ub, dimension, seed, options):
+    # iteration=0: só cria e avalia a população inicial (as iterações são
+    # feitas por iterate(), entre migrações)
+    return ALGORITHMS[algorithm](n, function, lb, ub, dimension, 0, seed=seed,
+                                 history=False, **options)
+
+
+def _epoch(optimizer, iteration, migrants):
+    optimizer.iterate(iteration)
+    positions, fitness = optimizer.get_best_agents(migrants)
+    return positions, fitness, optimizer.get_Gbest(), optimizer.get_Gbest_fitness()
+
+
+def _island_worker(conn, island):
+    """Processo de uma ilha: executa os comandos recebidos pelo pipe."""
+    try:
+        optimizer = _create_island(*island)
+        while True:
+            command, arguments = conn.recv()
+            if command == "epoch":
+                conn.send(_epoch(optimizer, *arguments))
+            elif command == "immigrate":
+                optimizer.immigrate(*arguments)
+            else:
+                break
+    except Exception as e:
+        conn.send(e)
+    finally:
+        conn.close()
+
+
+class _LocalIsland(object):
+    """Ilha no próprio processo (processes=False), com a interface de _ProcessIsland."""
+
+    def __init__(self, island):
+        self.__optimizer = _create_island(*island)
+        self.__result = None
+
+    def start_epoch(self, iteration, migrants):
+        self.__result = _epoch(self.__optimizer, iteration, migrants)
+
+    def end_epoch(self):
+        return self.__result
+
+    def immigrate(self, positions, fitness):
+        self.__optimizer.immigrate(positions, fitness)
+
+    def close(self):
+        pass
+
+
+class _ProcessIsland(object):
+    """Ilha num processo próprio; comandos e migrantes passam por um pipe."""
+
+    def __init__(self, island):
+        self.__conn, child = multiprocessing.Pipe()
+        self.__process = multiprocessing.Process(
+            target=_island_worker, args=(child, island), daemon=True)
+        self.__process.start()
+        child.close()
+
+    def start_epoch(self, iteration, migrants):
+        self.__conn.send(("epoch", (iteration, migrants)))
+
+    def end_epoch(self):
+        result = self.__conn.recv()
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def immigrate(self, positions, fitness):
+        self.__conn.send(("immigrate", (positions, fitness)))
+
+    def close(self):
+        try:
+            self.__conn.send(("stop", None))
+        except (BrokenPipeError, OSError):
+            pass
+        self.__conn.close()
+        self.__process.join()
+
+
+class islands(intelligence.sw):
+    """
+    Island Model
+    (K sub-swarms pso/wsa/de/cmaes em processos separados, com migração periódica)
+    """
+
+    def __init__(self, function, lb, ub, dimension, iteration, swarms,
+                 interval=10, migrants=2, topology="ring", seed=None,
+                 processes=True):
+        """
+        :param function: test function (with processes=True it must be
+        picklable, i.e. defined at module level)
+        :param lb: lower limits for plot axes
+        :param ub: upper limits for plot axes
+        :param dimension: space dimension
+        :param iteration: the number of iterations of every island
+        :param swarms: list of islands, each one (algorithm, n) or
+        (algorithm, n, options) with algorithm "pso", "wsa", "de" or "cmaes"
+        and options the
+        keyword arguments of its class (e.g. {"topology": "ring"})
+        :param interval: iterations between migrations (default value is 10)
+        :param migrants: number of best agents each island sends at every
+        migration; they replace the worst agents of the destination
+        (default value is 2)
+        :param topology: migration topology, "ring", "all" or "random"
+        (default value is "ring")
+        :param seed: seed of the islands' np.random.Generator streams
+        (default value is None)
+        :param processes: run every island in its own process (default value
+        is True); False runs them one after the other in this process
+        """
+
+        super(islands, self).__init__()
+
+        seeds = np.random.SeedSequence(seed).spawn(len(swarms) + 1)
+        rng = np.random.default_rng(seeds[-1])
+        specs = [(s[0], s[1], function, lb, ub, dimension, seeds[i],
+                  s[2] if len(s) > 2 else {}) for i, s in enumerate(swarms)]
+        sizes = [s[1] for s in swarms]
+
+        island_class = _ProcessIsland if processes else _LocalIsland
+        running = []
+        try:
+            for spec in specs:
+                running.append(island_class(spec))
+
+            self.__Gbest_fitness = float("inf")
+            self.__islands_fitness = [float("inf")] * len(running)
+            done = 0
+            while done < iteration:
+                epoch = min(interval, iteration - done)
+                done += epoch
+
+                # Todas as ilhas iteram em paralelo até à próxima migração
+                for island in running:
+                    island.start_epoch(epoch, migrants)
+                results = [island.end_epoch() for island in running]
+
+                for i, (_, _, Gbest, Gbest_fitness) in enumerate(results):
+                    self.__islands_fitness[i] = Gbest_fitness
+                    if Gbest_fitness < self.__Gbest_fitness:
+                        self.__Gbest_fitness = Gbest_fitness
+                        self._set_Gbest(Gbest)
+
+                if done < iteration:
+                    self.__migrate(running, results, sizes, migrants,
+                                   migration_targets(len(running), topology,
+                                                     rng))
+        finally:
+            for island in running:
+                island.close()
+
+    @staticmethod
+    def __migrate(running, results, sizes, migrants, targets):
+        # Migrantes recebidos por cada ilha (de uma ou mais origens)
+        received = [[] for _ in running]
+        for source, destinations in enumerate(targets):
+            for destination in destinations:
+                received[destination].append(source)
+
+        for destination, sources in enumerate(received):
+            if not sources:
+                continue
+            positions = np.concatenate([results[s][0] for s in sources])
+            fitness = np.concatenate([results[s][1] for s in sources])
+            # Os melhores, sem nunca substituir a ilha inteira
+            best = np.argsort(fitness)[:min(migrants, sizes[destination] - 1)]
+            running[destination].immigrate(positions[best], fitness[best])
+
+    def get_islands_fitness(self):
+        """Returns the best fitness of every island (return type: list)"""
+
+        return list(self.__islands_fitness)
+
+    def get_Gbest_fitness(self):
+        """Retorna o melhor fitness (score) encontrado em todas as ilhas."""
+        return self.__Gbest_fitness
@@ -0,0 +1,234 @@
+import csv
+import time
+
+import numpy as np
+
+from . import intelligence
+
+
+def dominance(objectives):
+    """
+    Pareto dominance matrix (minimization of every objective).
+
+    :param objectives: array (n, m)
+    :return: boolean array (n, n), [i, j] True if i dominates j
+    """
+
+    F = np.asarray(objectives)
+    no_worse = (F[:, np.newaxis, :] <= F[np.newaxis, :, :]).all(axis=2)
+    better = (F[:, np.newaxis, :] < F[np.newaxis, :, :]).any(axis=2)
+    return no_worse & better
+
+
+def nondominated(objectives):
+    """Boolean mask of the rows not dominated by any other row"""
+
+    return ~dominance(objectives).any(axis=0)
+
+
+def crowding_distance(objectives):
+    """
+    Crowding distance of each point of a front (NSGA-II): sum, over the
+    objectives, of the normalized gap between its two neighbors; the extreme
+    points get inf.
+
+    :param objectives: array (n, m)
+    :return: array (n,)
+    """
+
+    F = np.asarray(objectives, dtype=np.float64)
+    n, m = F.shape
+    distance = np.zeros(n)
+    if n < 3:
+        distance[:] = np.inf
+        return distance
+    for k in range(m):
+        order = np.argsort(F[:, k])
+        span = F[order[-1], k] - F[order[0], k]
+        distance[order[[0, -1]]] = np.inf
+        if span > 0:
+            distance[order[1:-1]] += (F[order[2:], k] -
+                                      F[order[:-2], k]) / span
+    return distance
+
+
+class mopso(intelligence.sw):
+    """
+    Multi-Objective Particle Swarm Optimization
+    (arquivo de Pareto limitado por crowding distance; o líder de cada
+    partícula é escolhido no arquivo por torneio binário, como no MOPSO-CD)
+    """
+
+    def __init__(self, n, function, lb, ub, dimension, iteration, w=0.4,
+                 c1=1, c2=1, archive_size=100, seed=None, history=True,
+                 observers=None, initial=None):
+        """
+        :param n: number of agents
+        :param function: objective function, returns the m objectives of a
+        position (all minimized)
+        :param lb: lower limits for plot axes
+        :param ub: upper limits for plot axes
+        :param dimension: space dimension
+        :param iteration: the number of iterations
+        :param w: inertia weight (default value is 0.4)
+        :param c1: weight of the personal best (default value is 1)
+        :param c2: weight of the leader taken from the archive (default value
+        is 1)
+        :param archive_size: maximum number of nondominated solutions kept;
+        the most crowded are dropped first (default value is 100)
+        :param seed: seed of the np.random.Generator (default value is None)
+        :param history: keep every iteration's agents for get_agents()
+        (default value is True)
+        :param observers: list of Functions.observers notified at every
+        iteration; Gbest_fitness is the best first objective in the archive
+        (default value is None: silent)
+        :param initial: array (k, dimension), k <= n, of positions that
+        replace the first random agents (default value is None)
+        """
+
+        super(mopso, self).__init__(observers)
+
+        self.__function = function
+        self.__w, self.__c1, self.__c2 = w, c1, c2
+        self.__archive_size = archive_size
+        self.__history = history
+        self.__rng = np.random.default_rng(seed)
+        self.__lb = np.asarray(lb, dtype=np.float64)
+        self.__ub = np.asarray(ub, dtype=np.float64)
+
+        self.__agents = intelligence.initial_agents(
+            self.__rng, self.__lb, self.__ub, n, dimension, np.float64,
+            initial)
+        if history:
+            self._points(self.__agents)
+        self.__velocity = np.zeros((n, dimension))
+
+        self.__objectives = self.__evaluate()
+        self.__Pbest = self.__agents.copy()
+        self.__Pbest_objectives = self.__objectives.copy()
+        self.__archive = np.empty((0, dimension))
+        self.__archive_objectives = np.empty((0, self.__objectives.shape[1]))
+        self.__update_archive()
+
+        self.iterate(iteration)
+
+    def iterate(self, iteration):
+        """Continues the optimization for the given number of iterations"""
+
+        agents, velocity = self.__agents, self.__velocity
+        n, dimension = agents.shape
+        rng = self.__rng
+
+        for t in range(iteration):
+
+            start = self._start_iteration()
+
+            # Líder de cada partícula: torneio binário no arquivo, ganha a
+            # solução menos povoada (maior crowding distance)
+            crowding = crowding_distance(self.__archive_objectives)
+            a = rng.integers(0, len(crowding), n)
+            b = rng.integers(0, len(crowding), n)
+            leaders = self.__archive[np.where(crowding[a] >= crowding[b], a,
+                                              b)]
+            neighbors_done = time.perf_counter()
+
+            velocity *= self.__w
+            velocity += self.__c1 * rng.random((n, dimension)) * \
+                (self.__Pbest - agents)
+            velocity += self.__c2 * rng.random((n, dimension)) * \
+                (leaders - agents)
+            agents += velocity
+            np.clip(agents, self.__lb, self.__ub, out=agents)
+            if self.__history:
+                self._points(agents)
+
+            update_done = time.perf_counter()
+            self.__objectives = self.__evaluate()
+            evaluated = time.perf_counter()
+
+            self.__update_Pbest()
+            self.__update_archive()
+
+            self._end_iteration(agents, evaluated - update_done,
+                                neighbors_done - start,
+                                update_done - neighbors_done +
+                                time.perf_counter() - evaluated)
+
+    def __evaluate(self):
+        objectives = np.array([np.asarray(self.__function(agent),
+                                          dtype=np.float64)
+                               for agent in self.__agents])
+        # Objetivos não finitos (ex.: treino divergido) passam a inf: um NaN
+        # nunca é dominado (as comparações com NaN são sempre falsas)
+        objectives[~np.isfinite(objectives)] = np.inf
+        return objectives
+
+    def __update_Pbest(self):
+        # O novo ponto substitui o Pbest se o dominar; se nenhum domina o
+        # outro, a escolha é aleatória
+        new, old = self.__objectives, self.__Pbest_objectives
+        new_dominates = (new <= old).all(axis=1) & (new < old).any(axis=1)
+        old_dominates = (old <= new).all(axis=1) & (old < new).any(axis=1)
+        replace = new_dominates | (~old_dominates &
+                                   (self.__rng.random(len(new)) < 0.5))
+        self.__Pbest[replace] = self.__agents[replace]
+        self.__Pbest_objectives[replace] = new[replace]
+
+    def __update_archive(self):
+        positions = np.vstack([self.__archive, self.__agents])
+        objectives = np.vstack([self.__archive_objectives,
+                                self.__objectives])
+        # Soluções repetidas (mesmos objetivos) ficam uma só vez
+        _, unique = np.unique(objectives, axis=0, return_index=True)
+        positions, objectives = positions[unique], objectives[unique]
+        # Soluções com algum objetivo inf ficam fora do arquivo (podiam ser
+        # não dominadas pelos outros objetivos), salvo se não houver outras
+        finite = np.isfinite(objectives).all(axis=1)
+        if finite.any():
+            positions, objectives = positions[finite], objectives[finite]
+        keep = nondominated(objectives)
+        positions, objectives = positions[keep], objectives[keep]
+
+        # Arquivo cheio: sai a solução mais povoada, uma de cada vez
+        while len(objectives) > self.__archive_size:
+            drop = np.argmin(crowding_distance(objectives))
+            positions = np.delete(positions, drop, axis=0)
+            objectives = np.delete(objectives, drop, axis=0)
+
+        self.__archive, self.__archive_objectives = positions, objectives
+        best = np.argmin(objectives[:, 0])
+        self.__Gbest_fitness = float(objectives[best, 0])
+        self._set_Gbest(positions[best].copy())
+
+    def get_front(self):
+        """Returns the Pareto front found, sorted by the first objective
+        (return type: tuple (positions array, objectives array))"""
+
+        order = np.argsort(self.__archive_objectives[:, 0])
+        return self.__archive[order].copy(), \
+            self.__archive_objectives[order].copy()
+
+    def export_front(self, path, names=None, objective_names=None):
+        """
+        Writes the Pareto front to CSV, one solution per row.
+
+        :param path: CSV file
+        :param names: column names of the position (default value is None:
+        x1, x2, ...)
+        :param objective_names: column names of the objectives (default
+        value is None: f1, f2, ...)
+        """
+
+        positions, objectives = self.get_front()
+        names = names or [f"x{i + 1}" for i in range(positions.shape[1])]
+        objective_names = objective_names or \
+            [f"f{i + 1}" for i in range(objectives.shape[1])]
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(list(names) + list(objective_names))
+            for position, objective in zip(positions, objectives):
+                writer.writerow(list(position) + list(objective))
+
+    def get_Gbest_fitness(self):
+        """Retorna o melhor valor do primeiro objetivo no arquivo de Pareto."""
+        return self.__Gbest_fitness
@@ -0,0 +1,143 @@
+import cProfile
+import json
+import pstats
+import sys
+import time
+
+
+class observer(object):
+    """
+    Base observer: the optimizers call start() before and update() after
+    every iteration. The event given to update() is a dict with algorithm,
+    iteration, Gbest_fitness, diversity (mean distance of the agents to their
+    centroid) and the times, in seconds, of the iteration spent in
+    time_fitness, time_neighbors and time_update. close() is called by the
+    optimizer's close_observers(), at the end of the optimization.
+    """
+
+    def start(self, iteration):
+        pass
+
+    def update(self, event):
+        pass
+
+    def close(self):
+        pass
+
+
+class recorder(observer):
+    """Keeps every event in memory (get_events())"""
+
+    def __init__(self):
+        self.__events = []
+
+    def update(self, event):
+        self.__events.append(event)
+
+    def get_events(self):
+        """Returns the events of all iterations (return type: list)"""
+
+        return self.__events
+
+
+class progress(observer):
+    """
+    Progress bar, rewritten in place at every iteration
+    (iteration, Gbest fitness and seconds per iteration)
+    """
+
+    def __init__(self, total=None, width=30, stream=None):
+        """
+        :param total: expected number of iterations; None shows only the
+        counter, without the bar (default value is None)
+        :param width: width of the bar in characters (default value is 30)
+        :param stream: output stream (default value is None: sys.stderr)
+        """
+
+        self.__total = total
+        self.__width = width
+        self.__stream = stream or sys.stderr
+        self.__start = time.perf_counter()
+        self.__open_line = False
+
+    def update(self, event):
+        t = event["iteration"]
+        elapsed = time.perf_counter() - self.__start
+        if self.__total:
+            done = min(self.__width, self.__width * t // self.__total)
+            bar = f"[{'#' * done}{'-' * (self.__width - done)}] " \
+                  f"{t}/{self.__total}"
+        else:
+            bar = f"Iteração {t}"
+        self.__stream.write(f"\r{event['algorithm']} {bar} | "
+                            f"Gbest {event['Gbest_fitness']:.5g} | "
+                            f"{elapsed / t:.3f} s/it")
+        self.__open_line = not (self.__total and t >= self.__total)
+        if not self.__open_line:
+            self.__stream.write("\n")
+        self.__stream.flush()
+
+    def close(self):
+        if self.__open_line:
+            self.__stream.write("\n")
+            self.__stream.flush()
+
+
+class jsonl(observer):
+    """Trace with one JSON line per iteration"""
+
+    def __init__(self, path):
+        """
+        :param path: file written (overwritten) with one event per line
+        """
+
+        self.__file = open(path, "w", encoding="utf-8")
+
+    def update(self, event):
+        self.__file.write(json.dumps(event) + "\n")
+        self.__file.flush()
+
+    def close(self):
+        self.__file.close()
+
+
+class profiler(observer):
+    """
+    cProfile sampling: profiles one iteration out of every, so that long
+    runs can be profiled without paying the cProfile cost in all of them
+    """
+
+    def __init__(self, every=10, path=None):
+        """
+        :param every: profile iterations 1, 1 + every, 1 + 2 * every, ...
+        (default value is 10)
+        :param path: file where close() dumps the stats, readable with
+        pstats or snakeviz (default value is None)
+        """
+
+        self.__every = every
+        self.__path = path
+        self.__profile = cProfile.Profile()
+        self.__active = False
+
+    def start(self, iteration):
+        if (iteration - 1) % self.__every == 0:
+            self.__profile.enable()
+            self.__active = True
+
+    def update(self, event):
+        if self.__active:
+            self.__profile.disable()
+            self.__active = False
+
+    def get_stats(self, sort="cumulative", limit=20):
+        """Prints the functions with the largest times of the sampled
+        iterations and returns the pstats.Stats"""
+
+        stats = pstats.Stats(self.__profile)
+        stats.sort_stats(sort).print_stats(limit)
+        return stats
+
+    def close(self):
+        if self.__path:
+            self.__profile.dump_stats(self.__path)
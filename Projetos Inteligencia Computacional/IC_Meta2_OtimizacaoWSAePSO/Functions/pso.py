@@ -1,15 +1,47 @@
+import time
+
 import numpy as np
 
 from . import intelligence
 
 
+def neighbors(n, topology="global"):
+    """
+    Precomputed neighbor index array of each particle (the particle itself
+    included), used to select the best personal best of its neighborhood.
+
+    :param n: number of agents
+    :param topology: "global" (all particles, shape (1, n), broadcast to every
+    particle), "ring" (i-1, i, i+1) or "von_neumann" (i, i+-1 and i+-cols on
+    a toroidal grid with cols = round(sqrt(n)))
+    :return: integer array of shape (1, n) or (n, k)
+    """
+
+    if topology == "global":
+        return np.arange(n)[np.newaxis, :]
+
+    i = np.arange(n)[:, np.newaxis]
+    if topology == "ring":
+        offsets = np.array([-1, 0, 1])
+    elif topology == "von_neumann":
+        cols = max(int(round(np.sqrt(n))), 1)
+        offsets = np.array([-cols, -1, 0, 1, cols])
+    else:
+        raise ValueError(f"Topologia desconhecida: {topology} "
+                         f"(global, ring ou von_neumann)")
+    return (i + offsets) % n
+
+
 class pso(intelligence.sw):
     """
     Particle Swarm Optimization
+    (Memória do melhor pessoal de cada partícula e topologias de vizinhança)
     """
 
     def __init__(self, n, function, lb, ub, dimension, iteration, w=0.5, c1=1,
-                 c2=1):
+                 c2=1, topology="global", seed=None, dtype=np.float64,
+                 history=True, surrogate=None, observers=None,
+                 initial=None):
         """
         :param n: number of agents
         :param function: test function
@@ -27,36 +59,150 @@ class pso(intelligence.sw):
         (default value is 1)
         :param c2: ratio between "cognitive" and "social" component
         (default value is 1)
+        :param topology: neighborhood of the social component: "global",
+        "ring" or "von_neumann" (default value is "global")
+        :param seed: seed of the np.random.Generator (default value is None)
+        :param dtype: dtype of positions and velocities, np.float64 or
+        np.float32 (default value is np.float64)
+        :param history: keep every iteration's agents for get_agents()
+        (default value is True)
+        :param surrogate: Functions.surrogate.surrogate that pre-screens
+        every population, so that only part of it is evaluated with function
+        (default value is None: every agent is evaluated)
+        :param observers: list of Functions.observers notified at every
+        iteration (default value is None: silent)
+        :param initial: array (k, dimension), k <= n, of positions that
+        replace the first random agents, e.g. the best trials of an earlier
+        run (default value is None)
         """
 
-        super(pso, self).__init__()
+        super(pso, self).__init__(observers)
+
+        self.__function = function
+        self.__w, self.__c1, self.__c2 = w, c1, c2
+        self.__history = history
+        self.__surrogate = surrogate
+        self.__rng = np.random.default_rng(seed)
+        self.__lb = np.asarray(lb, dtype=dtype)
+        self.__ub = np.asarray(ub, dtype=dtype)
+
+        self.__agents = intelligence.initial_agents(
+            self.__rng, self.__lb, self.__ub, n, dimension, dtype, initial)
+        if history:
+            self._points(self.__agents)
+
+        # Vizinhos de cada partícula (calculados uma vez)
+        self.__neighborhood = neighbors(n, topology)
+
+        # Buffers reutilizados em todas as iterações (atualização sem alocações)
+        self.__velocity = np.zeros((n, dimension), dtype=dtype)
+        self.__r1 = np.empty((n, dimension), dtype=dtype)
+        self.__r2 = np.empty((n, dimension), dtype=dtype)
+        self.__term = np.empty((n, dimension), dtype=dtype)
+        self.__Lbest = np.empty((self.__neighborhood.shape[0], dimension),
+                                dtype=dtype)
+        self.__neighbor_fitness = np.empty(self.__neighborhood.shape)
+        self.__fitness = np.empty(n)
 
-        self.__agents = np.random.uniform(lb, ub, (n, dimension))
-        velocity = np.zeros((n, dimension))
-        self._points(self.__agents)
+        # Melhor posição de cada partícula e respetivo fitness (cada agente
+        # é avaliado uma única vez por iteração, sem reavaliar Pbest/Gbest)
+        self.__evaluate()
+        self.__Pbest = self.__agents.copy()
+        self.__Pbest_fitness = self.__fitness.copy()
+        # Um Pbest NaN nunca melhoraria (fitness < NaN é sempre falso)
+        self.__Pbest_fitness[np.isnan(self.__Pbest_fitness)] = np.inf
+        self.__update_Gbest()
 
-        Pbest = self.__agents[np.array([function(x)
-                                        for x in self.__agents]).argmin()]
-        Gbest = Pbest
+        self.iterate(iteration)
+
+    def iterate(self, iteration):
+        """Continues the optimization for the given number of iterations"""
+
+        agents, velocity, term = self.__agents, self.__velocity, self.__term
+        Pbest, Pbest_fitness = self.__Pbest, self.__Pbest_fitness
+        neighborhood, Lbest = self.__neighborhood, self.__Lbest
+        r1, r2, dtype = self.__r1, self.__r2, agents.dtype
 
         for t in range(iteration):
 
-            r1 = np.random.random((n, dimension))
-            r2 = np.random.random((n, dimension))
-            velocity = w * velocity + c1 * r1 * (
-                Pbest - self.__agents) + c2 * r2 * (
-                Gbest - self.__agents)
-            self.__agents += velocity
-            self.__agents = np.clip(self.__agents, lb, ub)
-            self._points(self.__agents)
+            start = self._start_iteration()
+
+            # Melhor Pbest da vizinhança de cada partícula
+            np.take(Pbest_fitness, neighborhood, out=self.__neighbor_fitness)
+            best = np.take_along_axis(
+                neighborhood,
+                self.__neighbor_fitness.argmin(axis=1)[:, np.newaxis],
+                axis=1)[:, 0]
+            np.take(Pbest, best, axis=0, out=Lbest)
+            neighbors_done = time.perf_counter()
+
+            self.__rng.random(out=r1, dtype=dtype)
+            self.__rng.random(out=r2, dtype=dtype)
+
+            # velocity = w * velocity + c1 * r1 * (Pbest - agents)
+            #            + c2 * r2 * (Lbest - agents)
+            velocity *= self.__w
+            np.subtract(Pbest, agents, out=term)
+            term *= r1
+            term *= self.__c1
+            velocity += term
+            np.subtract(Lbest, agents, out=term)
+            term *= r2
+            term *= self.__c2
+            velocity += term
+
+            agents += velocity
+            np.clip(agents, self.__lb, self.__ub, out=agents)
+            if self.__history:
+                self._points(agents)
+
+            update_done = time.perf_counter()
+            self.__evaluate()
+            evaluated = time.perf_counter()
+            improved = self.__fitness < Pbest_fitness
+            np.copyto(Pbest, agents, where=improved[:, np.newaxis])
+            np.copyto(Pbest_fitness, self.__fitness, where=improved)
+            self.__update_Gbest()
+
+            self._end_iteration(agents, evaluated - update_done,
+                                neighbors_done - start,
+                                update_done - neighbors_done +
+                                time.perf_counter() - evaluated)
+
+    def get_best_agents(self, k):
+        """Returns the k best personal bests and their fitness (migration)"""
+
+        best = np.argsort(self.__Pbest_fitness)[:k]
+        return self.__Pbest[best].copy(), self.__Pbest_fitness[best].copy()
+
+    def immigrate(self, positions, fitness):
+        """Replaces the worst particles by the given positions, already
+        evaluated with the given fitness (migration)"""
+
+        worst = np.argsort(self.__Pbest_fitness)[len(self.__Pbest_fitness) -
+                                                 len(fitness):]
+        self.__agents[worst] = positions
+        self.__Pbest[worst] = positions
+        self.__Pbest_fitness[worst] = fitness
+        self.__velocity[worst] = 0
+        self.__update_Gbest()
 
-            Pbest = self.__agents[
-                np.array([function(x) for x in self.__agents]).argmin()]
-            if function(Pbest) < function(Gbest):
-                Gbest = Pbest
+    def __evaluate(self):
+        # Com surrogate, os agentes não avaliados ficam com fitness inf
+        # (não atualizam o Pbest)
+        if self.__surrogate is not None:
+            self.__surrogate.evaluate(self.__function, self.__agents,
+                                      self.__fitness)
+            return
+        for i in range(len(self.__fitness)):
+            self.__fitness[i] = self.__function(self.__agents[i])
 
-        self._set_Gbest(Gbest)
+    def __update_Gbest(self):
+        best = self.__Pbest_fitness.argmin()
+        self.__Gbest_fitness = float(self.__Pbest_fitness[best])
+        self._set_Gbest(self.__Pbest[best].copy())
 
     # Método para o main.py recuperar o valor sem treinar de novo
     def get_Gbest_fitness(self):
-        return self.__Gbest_fitness
\ No newline at end of file
+        """Retorna o melhor fitness (score) encontrado durante a otimização."""
+        return self.__Gbest_fitness
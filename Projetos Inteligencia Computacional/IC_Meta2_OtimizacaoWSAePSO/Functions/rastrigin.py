@@ -0,0 +1,14 @@
+import numpy as np
+
+
+def rastrigin_function(x):
+    a = 10
+
+    x = np.array(x)
+
+    dimensao = len(x)
+
+    if dimensao == 0:
+        return 0.0
+
+    return a * dimensao + np.sum(x ** 2 - a * np.cos(2 * np.pi * x))
@@ -0,0 +1,11 @@
+import numpy as np
+
+
+def rosenbrock_function(x):
+    x = np.array(x)
+
+    if len(x) < 2:
+        return 0.0
+
+    # Vale estreito e curvo (mal condicionado), mínimo 0 em x = (1, ..., 1)
+    return np.sum(100 * (x[1:] - x[:-1] ** 2) ** 2 + (1 - x[:-1]) ** 2)
@@ -0,0 +1,153 @@
+import numpy as np
+
+
+def _pairwise_distances(a, b):
+    d2 = np.einsum("ij,ij->i", a, a)[:, np.newaxis] + \
+        np.einsum("ij,ij->i", b, b)[np.newaxis, :] - 2 * a @ b.T
+    return np.sqrt(np.maximum(d2, 0))
+
+
+class rbf(object):
+    """
+    Interpolação RBF cúbica com cauda linear (modelo de Regis & Shoemaker),
+    só com numpy. As posições são normalizadas para [0, 1] pelos limites das
+    amostras.
+    """
+
+    def __init__(self, positions, fitness):
+        positions = np.asarray(positions, dtype=np.float64)
+        self.__low = positions.min(axis=0)
+        self.__scale = np.maximum(positions.max(axis=0) - self.__low, 1e-12)
+        self.__centers = (positions - self.__low) / self.__scale
+
+        m, d = self.__centers.shape
+        tail = np.hstack([np.ones((m, 1)), self.__centers])
+        system = np.zeros((m + d + 1, m + d + 1))
+        system[:m, :m] = _pairwise_distances(self.__centers,
+                                             self.__centers) ** 3
+        system[:m, m:] = tail
+        system[m:, :m] = tail.T
+        rhs = np.concatenate([np.asarray(fitness, dtype=np.float64),
+                              np.zeros(d + 1)])
+        # lstsq: posições repetidas (ex.: agentes presos nos limites) tornam o
+        # sistema singular
+        coefficients = np.linalg.lstsq(system, rhs, rcond=None)[0]
+        self.__weights, self.__tail = coefficients[:m], coefficients[m:]
+
+    def predict(self, positions):
+        """Returns (predicted fitness, distance to the nearest sample) of
+        each position, in the normalized space"""
+
+        x = (np.asarray(positions, dtype=np.float64) - self.__low) / \
+            self.__scale
+        distances = _pairwise_distances(x, self.__centers)
+        prediction = distances ** 3 @ self.__weights + self.__tail[0] + \
+            x @ self.__tail[1:]
+        return prediction, distances.min(axis=1)
+
+
+class surrogate(object):
+    """
+    Surrogate-assisted pre-screening
+    (só as posições mais promissoras ou mais incertas são avaliadas)
+    """
+
+    def __init__(self, fraction=0.5, explore=0.25, min_samples=None):
+        """
+        :param fraction: share of every population sent to the real fitness
+        function, once the model is trained (default value is 0.5)
+        :param explore: share of those real evaluations given to the most
+        uncertain positions (farthest from any evaluated one) instead of the
+        best predicted (default value is 0.25)
+        :param min_samples: evaluated positions needed before screening
+        starts (default value is None: 2 * (dimension + 1))
+        """
+
+        self.__fraction = fraction
+        self.__explore = explore
+        self.__min_samples = min_samples
+        self.__positions = []
+        self.__fitness = []
+        self.__real = 0
+        self.__saved = 0
+
+    def evaluate(self, function, agents, fitness):
+        """
+        Fills fitness with the fitness of every agent: the selected agents
+        are evaluated with function, the others are screened out with
+        fitness np.inf (they do not update any memory of the optimizer).
+        Returns the boolean mask of the real evaluations.
+        """
+
+        n, dimension = agents.shape
+        min_samples = self.__min_samples or 2 * (dimension + 1)
+        selected = np.ones(n, dtype=bool)
+        if len(self.__fitness) >= min_samples:
+            selected = self.__select(agents)
+
+        fitness[~selected] = np.inf
+        for i in np.flatnonzero(selected):
+            fitness[i] = function(agents[i])
+            self.__positions.append(np.array(agents[i], dtype=np.float64))
+            self.__fitness.append(float(fitness[i]))
+        self.__real += int(selected.sum())
+        self.__saved += n - int(selected.sum())
+        return selected
+
+    def __select(self, agents):
+        n = len(agents)
+        k = max(1, int(np.ceil(self.__fraction * n)))
+        n_explore = int(round(self.__explore * k))
+
+        # Fitness não finito (treino divergido, NaN guardado como inf) tornaria
+        # todas as previsões NaN: conta como o pior fitness finito
+        fitness = np.array(self.__fitness)
+        finite = np.isfinite(fitness)
+        if not finite.any():
+            return np.ones(n, dtype=bool)
+        fitness[~finite] = fitness[finite].max()
+
+        model = rbf(np.array(self.__positions), fitness)
+        prediction, uncertainty = model.predict(agents)
+
+        selected = np.zeros(n, dtype=bool)
+        selected[np.argsort(prediction)[:k - n_explore]] = True
+        uncertainty[selected] = -np.inf
+        selected[np.argsort(-uncertainty)[:n_explore]] = True
+        return selected
+
+    def get_real_evaluations(self):
+        """Returns the number of calls to the real fitness function"""
+
+        return self.__real
+
+    def get_saved_evaluations(self):
+        """Returns the number of positions screened out by the model"""
+
+        return self.__saved
+
+    def get_samples(self):
+        """Returns every evaluated (position, fitness) pair (return type:
+        tuple of arrays)"""
+
+        return np.array(self.__positions), np.array(self.__fitness)
+
+
+if __name__ == "__main__":
+    # Verificação de regressão (python -m Functions.surrogate): uma amostra
+    # com fitness inf não pode desligar a pré-seleção (previsões NaN
+    # selecionavam sempre os agentes 0..k-1)
+    def sphere(x):
+        return float(np.sum(x ** 2))
+
+    rng = np.random.default_rng(0)
+    screening = surrogate(fraction=0.5, explore=0)
+    screening.evaluate(lambda x: np.inf, rng.uniform(-5, 5, (1, 2)),
+                       np.empty(1))
+    for _ in range(3):
+        screening.evaluate(sphere, rng.uniform(-5, 5, (10, 2)), np.empty(10))
+    agents = rng.uniform(-5, 5, (10, 2))
+    agents[7:] = 0.01  # os melhores agentes estão no fim
+    chosen = np.flatnonzero(screening.evaluate(sphere, agents, np.empty(10)))
+    assert {7, 8, 9} <= set(chosen), chosen
+    print("surrogate: OK", chosen)
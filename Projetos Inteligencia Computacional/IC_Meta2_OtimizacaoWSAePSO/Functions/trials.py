@@ -0,0 +1,164 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+import numpy as np
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS trials (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    dataset_hash TEXT,
+    epochs INTEGER,
+    image_size INTEGER,
+    key TEXT NOT NULL,
+    position TEXT NOT NULL,
+    fitness REAL NOT NULL,
+    seconds REAL,
+    created TEXT DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS ix_trials_context
+    ON trials (dataset_hash, epochs, image_size, key);
+"""
+
+# Contexto de um trial: só trials com o mesmo contexto são reutilizados
+# (IS compara também NULL)
+CONTEXT = "dataset_hash IS ? AND epochs IS ? AND image_size IS ?"
+
+
+def dataset_hash(*paths):
+    """
+    Hash of one or more dataset folders: relative path and size of every
+    file (renaming, adding or removing images changes it; the contents are
+    not read, so it is cheap even for large datasets).
+
+    :return: hexadecimal blake2b digest (32 characters)
+    """
+
+    digest = hashlib.blake2b(digest_size=16)
+    for path in paths:
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                full = os.path.join(root, name)
+                relative = os.path.relpath(full, path).replace(os.sep, "/")
+                digest.update(f"{relative}\0{os.path.getsize(full)}\n"
+                              .encode("utf-8"))
+        digest.update(b"\1")
+    return digest.hexdigest()
+
+
+class trials(object):
+    """
+    Trial store (SQLite): every evaluated position with its fitness, for
+    the same dataset, epochs and image size. Answers exact repeats without
+    calling the fitness function and gives the best trials to warm-start the
+    next optimization (initial=).
+    """
+
+    def __init__(self, path, dataset_hash=None, epochs=None, image_size=None,
+                 key=None):
+        """
+        :param path: SQLite file (created if missing)
+        :param dataset_hash: hash of the dataset (see dataset_hash())
+        (default value is None)
+        :param epochs: training epochs of every evaluation (default value is
+        None)
+        :param image_size: image size of every evaluation (default value is
+        None)
+        :param key: function position -> list with the hyperparameters the
+        fitness function really uses (e.g. the number of neurons rounded to
+        int); positions with the same key are the same trial (default value
+        is None: the position itself)
+        """
+
+        self.__conn = sqlite3.connect(path)
+        self.__conn.executescript(SCHEMA)
+        self.__context = (dataset_hash, epochs, image_size)
+        self.__key = key or (lambda position: [float(v) for v in position])
+        self.__hits = 0
+        self.__evaluations = 0
+
+    def __key_of(self, position):
+        return json.dumps(self.__key(position))
+
+    def lookup(self, position):
+        """Returns the stored fitness of the position, None if it was never
+        evaluated in this context"""
+
+        row = self.__conn.execute(
+            f"SELECT fitness FROM trials WHERE {CONTEXT} AND key = ? "
+            f"ORDER BY id LIMIT 1",
+            self.__context + (self.__key_of(position),)).fetchone()
+        return row[0] if row else None
+
+    def record(self, position, fitness, seconds=None):
+        """
+        Stores an evaluated position. A NaN fitness (e.g. a diverged
+        training) is stored as inf, the worst trial.
+
+        :return: the stored fitness
+        """
+
+        fitness = float(fitness)
+        if np.isnan(fitness):
+            fitness = float("inf")
+        self.__conn.execute(
+            "INSERT INTO trials (dataset_hash, epochs, image_size, key, "
+            "position, fitness, seconds) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            self.__context + (self.__key_of(position),
+                              json.dumps([float(v) for v in position]),
+                              fitness, seconds))
+        # Commit por trial: um treino interrompido não perde os anteriores
+        self.__conn.commit()
+        return fitness
+
+    def objective(self, function):
+        """
+        Wraps the fitness function: exact repeats are answered from the
+        store, new positions are evaluated and recorded. The optimizer gets
+        the stored fitness (NaN becomes inf, see record()), so a repeat
+        returns the same value as the first evaluation.
+
+        :return: function with the same signature as function
+        """
+
+        def stored(position):
+            fitness = self.lookup(position)
+            if fitness is not None:
+                self.__hits += 1
+                return fitness
+            start = time.perf_counter()
+            fitness = function(position)
+            self.__evaluations += 1
+            return self.record(position, fitness, time.perf_counter() - start)
+
+        return stored
+
+    def best(self, k):
+        """
+        Returns the k best distinct trials of this context (return type:
+        tuple (positions array (k', dimension), fitness array), k' <= k),
+        ready for the initial= argument of the optimizers
+        """
+
+        rows = self.__conn.execute(
+            f"SELECT position, MIN(fitness) AS f FROM trials WHERE {CONTEXT} "
+            f"GROUP BY key ORDER BY f LIMIT ?",
+            self.__context + (k,)).fetchall()
+        return (np.array([json.loads(r[0]) for r in rows]),
+                np.array([r[1] for r in rows]))
+
+    def get_hits(self):
+        """Returns the number of evaluations answered from the store"""
+
+        return self.__hits
+
+    def get_evaluations(self):
+        """Returns the number of calls to the real fitness function"""
+
+        return self.__evaluations
+
+    def close(self):
+        self.__conn.close()
@@ -1,3 +1,5 @@
+import time
+
 import numpy as np
 
 from . import intelligence
@@ -10,7 +12,8 @@ class wsa(intelligence.sw):
     """
 
     def __init__(self, n, function, lb, ub, dimension, iteration, ro0=2,
-                 eta=0.005):
+                 eta=0.005, seed=None, dtype=np.float64, history=True,
+                 surrogate=None, observers=None, initial=None):
         """
         :param n: number of agents
         :param function: test function
@@ -22,91 +25,177 @@ class wsa(intelligence.sw):
     (default value is 2)
         :param eta: probability of message distortion at large distances
     (default value is 0.005)
+        :param seed: seed of the np.random.Generator (default value is None)
+        :param dtype: dtype of the positions, np.float64 or np.float32
+    (default value is np.float64)
+        :param history: keep every iteration's agents for get_agents()
+    (default value is True)
+        :param surrogate: Functions.surrogate.surrogate that pre-screens
+    every population, so that only part of it is evaluated with function
+    (default value is None: every agent is evaluated)
+        :param observers: list of Functions.observers notified at every
+    iteration (default value is None: silent)
+        :param initial: array (k, dimension), k <= n, of positions that
+    replace the first random agents, e.g. the best trials of an earlier run
+    (default value is None)
         """
 
-        super(wsa, self).__init__()
-
-        self.__agents = np.random.uniform(lb, ub, (n, dimension))
-        self._points(self.__agents)
-
+        super(wsa, self).__init__(observers)
+
+        self.__function = function
+        self.__ro0, self.__eta = ro0, eta
+        self.__history = history
+        self.__surrogate = surrogate
+        self.__rng = np.random.default_rng(seed)
+        self.__lb = np.asarray(lb, dtype=dtype)
+        self.__ub = np.asarray(ub, dtype=dtype)
+
+        self.__agents = intelligence.initial_agents(
+            self.__rng, self.__lb, self.__ub, n, dimension, dtype, initial)
+        if history:
+            self._points(self.__agents)
+
+        # Buffers reutilizados em todas as iterações: as novas posições são
+        # escritas em new_agents e os dois arrays trocam de papel (sem .copy())
+        self.__new_agents = np.empty_like(self.__agents)
+        self.__step = np.empty_like(self.__agents)
+        self.__norms = np.empty(n, dtype=dtype)
+        self.__distances = np.empty((n, n), dtype=dtype)
+        self.__not_better = np.empty((n, n), dtype=bool)
+        self.__scale = np.empty(n, dtype=dtype)
+        self.__random = np.empty(n, dtype=dtype)
+        self.__squared = np.empty(n, dtype=dtype)
+        self.__nearest = np.empty(n, dtype=np.intp)
+        self.__flat = np.empty(n, dtype=np.intp)
+        self.__row_offsets = np.arange(n, dtype=np.intp) * n
+        self.__no_whale = np.empty(n, dtype=bool)
+        self.__new_fitness_scores = np.empty(n)
 
         # self.__fitness_scores guarda o score de cada agente
-        self.__fitness_scores = np.zeros(n)
+        self.__fitness_scores = np.empty(n)
         # self.__Gbest_fitness guarda o melhor score global encontrado
         self.__Gbest_fitness = float('inf')
 
-        Gbest = self.__agents[0]  # Placeholder inicial
-
-
         # Calcula o fitness de toda a população inicial *uma vez*
+        self.__evaluate(self.__agents, self.__fitness_scores)
+        self.__update_Gbest()  # Guarda o melhor Gbest inicial
+
+        self.iterate(iteration)
 
-        for i in range(n):
-            self.__fitness_scores[i] = function(self.__agents[i])
-            if self.__fitness_scores[i] < self.__Gbest_fitness:
-                self.__Gbest_fitness = self.__fitness_scores[i]
-                Gbest = self.__agents[i]
+    def iterate(self, iteration):
+        """Continues the optimization for the given number of iterations"""
 
-        self._set_Gbest(Gbest)  # Guarda o melhor Gbest inicial
+        scale, step, new_agents = self.__scale, self.__step, self.__new_agents
+        dtype = self.__agents.dtype
 
         # --- Loop de Iteração ---
         for t in range(iteration):
-            print(f"\n--- WSA: Iteração {t + 1}/{iteration} ---", flush=True)
-
-            # Copia os agentes para calcular as novas posições
-            # (Usar .copy() é importante para não modificar o original acidentalmente)
-            new_agents = self.__agents.copy()
-
-            for i in range(n):
-
-                # A função agora usa os scores guardados (self.__fitness_scores)
-                y = self.__better_and_nearest_whale(i, n)
-
-                if y:  # Se encontrou um "y" (agente melhor e mais próximo)
-                    new_agents[i] += np.dot(
-                        np.random.uniform(0, ro0 *
-                                          np.exp(-eta * self.__whale_dist(i, y))),
-                        self.__agents[y] - self.__agents[i])
+            start = self._start_iteration()
+
+            # Baleia melhor e mais próxima de cada agente (y) e distância
+            y, dist = self.__better_and_nearest_whales()
+            neighbors_done = time.perf_counter()
+
+            # new_agents[i] = agents[i] + U(0, ro0 * e^(-eta * d)) *
+            #                 (agents[y] - agents[i]); sem y o agente fica
+            np.multiply(dist, -self.__eta, out=scale)
+            np.exp(scale, out=scale)
+            scale *= self.__ro0
+            scale *= self.__rng.random(dtype=dtype, out=self.__random)
+            np.copyto(scale, 0, where=self.__no_whale)
+            np.take(self.__agents, y, axis=0, out=step)
+            step -= self.__agents
+            step *= scale[:, np.newaxis]
+            np.add(self.__agents, step, out=new_agents)
 
             # Aplica os limites (lb, ub) às novas posições
-            new_agents = np.clip(new_agents, lb, ub)
+            np.clip(new_agents, self.__lb, self.__ub, out=new_agents)
 
             # Avalia o fitness *apenas* das novas posições
-            new_fitness_scores = np.zeros(n)
-            for i in range(n):
-                new_fitness_scores[i] = function(new_agents[i])
+            update_done = time.perf_counter()
+            self.__evaluate(new_agents, self.__new_fitness_scores)
+            evaluated = time.perf_counter()
 
             # Atualiza o estado da "swarm" com as novas posições e scores
-            self.__agents = new_agents
-            self.__fitness_scores = new_fitness_scores
-            self._points(self.__agents)  # Para o histórico de pontos
+            self.__agents, new_agents = new_agents, self.__agents
+            self.__fitness_scores, self.__new_fitness_scores = \
+                self.__new_fitness_scores, self.__fitness_scores
+            if self.__history:
+                self._points(self.__agents)  # Para o histórico de pontos
 
             # Compara usando os scores já calculados
-            current_best_idx = np.argmin(self.__fitness_scores)
-            current_best_fitness = self.__fitness_scores[current_best_idx]
-
-            if current_best_fitness < self.__Gbest_fitness:
-                self.__Gbest_fitness = current_best_fitness
-                Gbest = self.__agents[current_best_idx]
-                self._set_Gbest(Gbest)  # Atualiza o Gbest na classe pai
-
-        # Fim do construtor
-        print(f"\n--- WSA: Otimização concluída. Score final: {self.__Gbest_fitness:.5f} ---", flush=True)
-
-    def __whale_dist(self, i, j):
-        return np.linalg.norm(self.__agents[i] - self.__agents[j])
-
-    def __better_and_nearest_whale(self, u, n):
-
-        temp = float("inf")
-        v = None
-        for i in range(n):
-            # Compara scores do array
-            if self.__fitness_scores[i] < self.__fitness_scores[u]:
-                dist_iu = self.__whale_dist(i, u)
-                if dist_iu < temp:
-                    v = i
-                    temp = dist_iu
-        return v
+            self.__update_Gbest()
+
+            self._end_iteration(self.__agents, evaluated - update_done,
+                                neighbors_done - start,
+                                update_done - neighbors_done +
+                                time.perf_counter() - evaluated)
+
+        self.__new_agents = new_agents
+
+    def get_best_agents(self, k):
+        """Returns the k best agents and their fitness (migration)"""
+
+        best = np.argsort(self.__fitness_scores)[:k]
+        return self.__agents[best].copy(), self.__fitness_scores[best].copy()
+
+    def immigrate(self, positions, fitness):
+        """Replaces the worst agents by the given positions, already
+        evaluated with the given fitness (migration)"""
+
+        worst = np.argsort(self.__fitness_scores)[len(self.__fitness_scores) -
+                                                  len(fitness):]
+        self.__agents[worst] = positions
+        self.__fitness_scores[worst] = fitness
+        self.__update_Gbest()
+
+    def __evaluate(self, agents, fitness):
+        # Com surrogate, os agentes não avaliados ficam com fitness inf
+        # (contam como piores na procura da baleia melhor e mais próxima)
+        if self.__surrogate is not None:
+            self.__surrogate.evaluate(self.__function, agents, fitness)
+            return
+        for i in range(len(fitness)):
+            fitness[i] = self.__function(agents[i])
+
+    def __update_Gbest(self):
+        current_best_idx = np.argmin(self.__fitness_scores)
+        current_best_fitness = self.__fitness_scores[current_best_idx]
+
+        if current_best_fitness < self.__Gbest_fitness:
+            self.__Gbest_fitness = float(current_best_fitness)
+            # Cópia: o array dos agentes é reutilizado nas iterações seguintes
+            self._set_Gbest(self.__agents[current_best_idx].copy())
+
+    def __better_and_nearest_whales(self):
+        """
+        Para cada agente u, o índice do agente com melhor score mais próximo
+        e a distância a esse agente, calculados sobre a matriz de distâncias
+        (||a||^2 + ||b||^2 - 2 a.b), nos buffers do objeto. Os agentes sem
+        baleia melhor ficam marcados em self.__no_whale (o seu índice é
+        válido mas não deve ser usado).
+        """
+        agents, norms = self.__agents, self.__norms
+        distances, not_better = self.__distances, self.__not_better
+        y, squared = self.__nearest, self.__squared
+        np.einsum("ij,ij->i", agents, agents, out=norms)
+        np.dot(agents, agents.T, out=distances)
+        distances *= -2
+        distances += norms[:, np.newaxis]
+        distances += norms[np.newaxis, :]
+
+        # Só contam os agentes com score estritamente melhor que o de u
+        np.greater_equal(self.__fitness_scores[np.newaxis, :],
+                         self.__fitness_scores[:, np.newaxis], out=not_better)
+        np.copyto(distances, np.inf, where=not_better)
+
+        # Distância ao mais próximo: distances[u, y[u]] pelo índice achatado
+        distances.argmin(axis=1, out=y)
+        np.add(self.__row_offsets, y, out=self.__flat)
+        np.take(distances.reshape(-1), self.__flat, out=squared)
+        np.isinf(squared, out=self.__no_whale)
+        np.maximum(squared, 0, out=squared)
+        return y, np.sqrt(squared, out=squared)
 
     def get_Gbest_fitness(self):
         """Retorna o melhor fitness (score) encontrado durante a otimização."""
@@ -0,0 +1,151 @@
+### --- 1. IMPORTAÇÃO DE BIBLIOTECAS ---
+import numpy as np
+import os
+import time
+import tensorflow as tf
+from tensorflow.keras.preprocessing.image import ImageDataGenerator
+from tensorflow.keras import layers, models
+from tensorflow.keras.optimizers import Adam
+from Functions.mopso import mopso
+from Functions.observers import progress
+
+
+base_drive_path = r"C:\Users\Daniel\Desktop\3_ano\IC\TP\Dataset\Skin_Diseases\kaggle"
+train_otimization_path = os.path.join(base_drive_path, "temp_train")
+val_path = os.path.join(base_drive_path, "val")
+
+# --- 2. CONFIGURAÇÃO DOS GERADORES ---
+IMG_SIZE_OPT = 64
+batch_size = 16
+
+print(f"A carregar gerador de treino de otimização (temp_train, {IMG_SIZE_OPT}x{IMG_SIZE_OPT})...")
+train_datagen = ImageDataGenerator(rescale=1. / 255, fill_mode='nearest')
+train_generator = train_datagen.flow_from_directory(
+    train_otimization_path,
+    target_size=(IMG_SIZE_OPT, IMG_SIZE_OPT),
+    batch_size=batch_size,
+    class_mode='categorical',
+    shuffle=True
+)
+
+print(f"A carregar gerador de validação de otimização (val, {IMG_SIZE_OPT}x{IMG_SIZE_OPT})...")
+val_opt_datagen = ImageDataGenerator(rescale=1. / 255)
+val_generator_opt = val_opt_datagen.flow_from_directory(
+    val_path,
+    target_size=(IMG_SIZE_OPT, IMG_SIZE_OPT),
+    batch_size=batch_size,
+    class_mode='categorical',
+    shuffle=False
+)
+
+num_classes = train_generator.num_classes
+
+
+### --- 3. FUNÇÃO PARA CRIAR O MODELO ---
+def create_model(learning_rate, num_neurons, size):
+    model = models.Sequential([
+        layers.Conv2D(16, (3, 3), activation='relu', input_shape=(size, size, 3)),
+        layers.MaxPooling2D((2, 2)),
+        layers.Conv2D(32, (3, 3), activation='relu'),
+        layers.MaxPooling2D((2, 2)),
+        layers.Conv2D(64, (3, 3), activation='relu'),
+        layers.Flatten(),
+        layers.Dense(int(num_neurons), activation='relu'),
+        layers.Dense(num_classes, activation='softmax')
+    ])
+    optimizer = Adam(learning_rate=learning_rate)
+    model.compile(optimizer=optimizer, loss='categorical_crossentropy', metrics=['accuracy'])
+    return model
+
+
+### --- 4. FUNÇÃO DE FITNESS MULTI-OBJETIVO ---
+EPOCHS_FOR_OPTIMIZATION = 10
+LATENCIA_REPETICOES = 20  # Inferências cronometradas por medição (mediana)
+OBJETIVOS = ["val_loss", "latencia_b1_ms", "latencia_b32_ms", "tamanho_kb"]
+
+# A latência e o tamanho só dependem da arquitetura (nº de neurónios), não
+# dos pesos treinados: medidos uma vez por nº de neurónios
+medicoes_arquitetura = {}
+
+
+def mede_latencia_ms(model, batch):
+    x = np.random.rand(batch, IMG_SIZE_OPT, IMG_SIZE_OPT, 3).astype("float32")
+    model(x, training=False)  # Aquecimento (traçado do grafo)
+    tempos = []
+    for _ in range(LATENCIA_REPETICOES):
+        inicio = time.perf_counter()
+        model(x, training=False)
+        tempos.append(time.perf_counter() - inicio)
+    return 1000 * float(np.median(tempos))
+
+
+def mede_arquitetura(num_neurons):
+    if num_neurons not in medicoes_arquitetura:
+        # Modelo criado no CPU (pesos incluídos): latência de serviço em CPU
+        with tf.device("/CPU:0"):
+            model = create_model(0.001, num_neurons, IMG_SIZE_OPT)
+            medicoes_arquitetura[num_neurons] = (mede_latencia_ms(model, 1), mede_latencia_ms(model, 32),
+                                                 model.count_params() * 4 / 1024)  # float32
+    return medicoes_arquitetura[num_neurons]
+
+
+def fitness_function(params):
+    learning_rate = params[0]
+    num_neurons = int(params[1])
+
+    print(f"Testando: LR={learning_rate:.6f}, Neurónios={num_neurons}...", end=" ")
+
+    model = create_model(learning_rate, num_neurons, IMG_SIZE_OPT)
+    history = model.fit(
+        train_generator,
+        epochs=EPOCHS_FOR_OPTIMIZATION,
+        validation_data=val_generator_opt,
+        verbose=0
+    )
+
+    val_loss = np.min(history.history['val_loss'])
+    latencia_b1, latencia_b32, tamanho_kb = mede_arquitetura(num_neurons)
+    print(f"-> Val Loss={val_loss:.5f} | {latencia_b1:.2f} ms (b1) | {latencia_b32:.2f} ms (b32) | "
+          f"{tamanho_kb:.0f} KB")
+
+    return [val_loss, latencia_b1, latencia_b32, tamanho_kb]
+
+
+### --- 5. EXECUÇÃO DA OTIMIZAÇÃO MULTI-OBJETIVO (MOPSO) ---
+n_agentes = 5
+n_iteracoes = 10
+lb = [0.0001, 32]
+ub = [0.01, 128]
+ORCAMENTO_LATENCIA_MS = 5.0  # Latência máxima aceite com batch 1
+ficheiro_frente = "pareto_mopso.csv"
+
+print("\n" + "=" * 50)
+print("--- INICIANDO OTIMIZAÇÃO MULTI-OBJETIVO (MOPSO) ---")
+print(f"Objetivos: {', '.join(OBJETIVOS)}")
+print(f"Algoritmo usará {n_agentes} agentes e {n_iteracoes} iterações.")
+print("=" * 50 + "\n")
+
+mopso_optimizer = mopso(n=n_agentes, function=fitness_function, lb=lb, ub=ub, dimension=2, iteration=n_iteracoes,
+                        observers=[progress(n_iteracoes)])
+mopso_optimizer.close_observers()
+
+mopso_optimizer.export_front(ficheiro_frente, names=["learning_rate", "neuronios"], objective_names=OBJETIVOS)
+posicoes, objetivos = mopso_optimizer.get_front()
+
+print("--- OTIMIZAÇÃO MOPSO CONCLUÍDA ---")
+print(f"Frente de Pareto ({len(posicoes)} soluções) exportada para {ficheiro_frente}:")
+for posicao, objetivo in zip(posicoes, objetivos):
+    print(f"  LR={posicao[0]:.6f} | Neurónios={int(posicao[1]):<4} | Val Loss={objetivo[0]:.5f} | "
+          f"{objetivo[1]:.2f} ms (b1) | {objetivo[2]:.2f} ms (b32) | {objetivo[3]:.0f} KB")
+
+# Modelo escolhido: menor val_loss dentro do orçamento de latência
+dentro_orcamento = np.flatnonzero(objetivos[:, 1] <= ORCAMENTO_LATENCIA_MS)
+if len(dentro_orcamento):
+    escolhido = dentro_orcamento[np.argmin(objetivos[dentro_orcamento, 0])]
+    print(f"🏆 Melhor modelo com latência <= {ORCAMENTO_LATENCIA_MS} ms (batch 1):")
+    print(f"Learning Rate: {posicoes[escolhido][0]:.6f}")
+    print(f"Neurónios: {int(posicoes[escolhido][1])}")
+    print(f"Val Loss: {objetivos[escolhido][0]:.5f} | Latência: {objetivos[escolhido][1]:.2f} ms")
+else:
+    print(f"Nenhuma solução da frente cumpre o orçamento de {ORCAMENTO_LATENCIA_MS} ms (batch 1).")
+print("--- Script Concluído ---")
@@ -5,6 +5,10 @@ from tensorflow.keras.preprocessing.image import ImageDataGenerator
 from tensorflow.keras import layers, models
 from tensorflow.keras.optimizers import Adam
 from Functions.pso import pso
+from Functions.observers import progress
+from Functions.surrogate import surrogate
+from Functions.trials import trials, dataset_hash
+from cache_features import extrator_convolucional, features_em_cache, hash_cache
 
 
 base_drive_path = r"C:\Users\Daniel\Desktop\3_ano\IC\TP\Dataset\Skin_Diseases\kaggle"
@@ -56,6 +60,39 @@ def create_model(learning_rate, num_neurons, size):
     return model
 
 
+# --- Modo de HPO ---
+# "completo": cada trial treina a CNN inteira; "cabeca": a parte convolucional é
+# treinada uma vez (hiperparâmetros de referência), as features de temp_train/val
+# ficam em cache (memmap) e cada trial só treina a cabeça densa (segundos, não minutos)
+MODO_HPO = "completo"
+PASTA_CACHE_FEATURES = "cache_features"
+LR_EXTRATOR, NEURONIOS_EXTRATOR, EPOCAS_EXTRATOR = 0.001, 64, 10
+
+
+def create_head(learning_rate, num_neurons, num_features):
+    model = models.Sequential([
+        layers.Dense(int(num_neurons), activation='relu', input_shape=(num_features,)),
+        layers.Dense(num_classes, activation='softmax')
+    ])
+    optimizer = Adam(learning_rate=learning_rate)
+    model.compile(optimizer=optimizer, loss='categorical_crossentropy', metrics=['accuracy'])
+    return model
+
+
+def treina_extrator():
+    model = create_model(LR_EXTRATOR, NEURONIOS_EXTRATOR, IMG_SIZE_OPT)
+    model.fit(trainWSA_generator, epochs=EPOCAS_EXTRATOR, validation_data=val_generator_opt, verbose=0)
+    return extrator_convolucional(model)
+
+
+if MODO_HPO == "cabeca":
+    features = features_em_cache(PASTA_CACHE_FEATURES, {"train": train_otimization_path, "val": val_path},
+                                 IMG_SIZE_OPT, treina_extrator, batch_size=batch_size,
+                                 descricao=f"lr={LR_EXTRATOR} neuronios={NEURONIOS_EXTRATOR} "
+                                           f"epocas={EPOCAS_EXTRATOR}")
+    (x_treino, y_treino), (x_val, y_val) = features["train"], features["val"]
+
+
 ### --- 4. DEFINIÇÃO DA FUNÇÃO DE FITNESS (Melhorada) ---
 # Aumentei o limite para 20, mas o EarlyStopping vai parar muito antes se necessário
 EPOCHS_FOR_OPTIMIZATION = 10
@@ -69,13 +106,25 @@ def fitness_function(params):
 
     print(f"Testando: LR={learning_rate:.6f}, Neurónios={num_neurons}...", end=" ")
 
-    model = create_model(learning_rate, num_neurons, IMG_SIZE_OPT)
-    history = model.fit(
-        trainWSA_generator,
-        epochs=EPOCHS_FOR_OPTIMIZATION,
-        validation_data=val_generator_opt,
-        verbose=0
-    )
+    if MODO_HPO == "cabeca":
+        # Só a cabeça densa, sobre as features em cache
+        model = create_head(learning_rate, num_neurons, x_treino.shape[1])
+        history = model.fit(
+            x_treino, y_treino,
+            batch_size=batch_size,
+            epochs=EPOCHS_FOR_OPTIMIZATION,
+            validation_data=(x_val, y_val),
+            shuffle=True,
+            verbose=0
+        )
+    else:
+        model = create_model(learning_rate, num_neurons, IMG_SIZE_OPT)
+        history = model.fit(
+            trainWSA_generator,
+            epochs=EPOCHS_FOR_OPTIMIZATION,
+            validation_data=val_generator_opt,
+            verbose=0
+        )
 
     val_loss = np.min(history.history['val_loss'])
     epochs_run = len(history.history['val_loss'])  # Para sabermos quantas épocas durou
@@ -84,6 +133,12 @@ def fitness_function(params):
     return val_loss
 
 
+def chave_hiperparametros(params):
+    # Hiperparâmetros que o treino usa de facto (neurónios inteiros): duas
+    # posições com a mesma chave são o mesmo trial
+    return [round(float(params[0]), 6), int(params[1])]
+
+
 ### --- 5. EXECUÇÃO DA OTIMIZAÇÃO SWARM (APENAS PSO) ---
 n_agentes = 5
 n_iteracoes = 10
@@ -95,14 +150,38 @@ print("--- INICIANDO OTIMIZAÇÃO DE HIPERPARÂMETROS (PSO) ---")
 print(f"Algoritmo usará {n_agentes} agentes e {n_iteracoes} iterações.")
 print("=" * 50 + "\n")
 
+# Base de trials (SQLite): repetições exatas são respondidas sem treinar e
+# metade da população inicial parte dos melhores trials de execuções
+# anteriores (mesmo dataset, épocas e tamanho de imagem)
+# (os trials do modo "cabeca" não se misturam com os do modo "completo", nem
+# com os de outro extrator/extração das features: hash do cache.json)
+hash_dados = dataset_hash(train_otimization_path, val_path)
+if MODO_HPO == "cabeca":
+    hash_dados += f":cabeca:{hash_cache(PASTA_CACHE_FEATURES)}"
+trials_hpo = trials("trials_hpo.sqlite", dataset_hash=hash_dados,
+                    epochs=EPOCHS_FOR_OPTIMIZATION, image_size=IMG_SIZE_OPT, key=chave_hiperparametros)
+populacao_inicial, _ = trials_hpo.best(n_agentes // 2)
+print(f"Trials anteriores na população inicial: {len(populacao_inicial)}")
+
+# Pré-seleção por surrogate (RBF): depois das primeiras iterações, só metade
+# das posições propostas em cada iteração é realmente treinada
+surrogate_hpo = surrogate(fraction=0.5)
+
 print("\n--- Executando Particle Swarm Optimization (PSO) ---")
-pso_optimizer = pso(n=n_agentes, function=fitness_function, lb=lb, ub=ub, dimension=2, iteration=n_iteracoes)
+pso_optimizer = pso(n=n_agentes, function=trials_hpo.objective(fitness_function), lb=lb, ub=ub, dimension=2,
+                    iteration=n_iteracoes,
+                    surrogate=surrogate_hpo, observers=[progress(n_iteracoes)], initial=populacao_inicial)
+pso_optimizer.close_observers()
 
 print("\nA obter a melhor solução do PSO...")
 best_params_pso = pso_optimizer.get_Gbest()
 
 best_fitness_pso = pso_optimizer.get_Gbest_fitness()
 print("(Score recuperado da memória - SEM re-treino desnecessário)")
+print(f"Treinos realizados: {trials_hpo.get_evaluations()} | "
+      f"Respondidos pela base de trials: {trials_hpo.get_hits()} | "
+      f"Treinos poupados pelo surrogate: {surrogate_hpo.get_saved_evaluations()}")
+trials_hpo.close()
 
 
 print("--- OTIMIZAÇÃO PSO CONCLUÍDA ---")
@@ -0,0 +1,56 @@
+import os
+import sys
+
+from Functions import benchmark
+
+# --- Configurações da suite (grelha função x dimensão x orçamento) ---
+algoritmos = ["pso", "wsa", "de", "cmaes"]
+funcoes = ["ackley", "rastrigin", "rosenbrock"]
+dimensoes = [2, 10]
+orcamentos = [1000, 5000]  # Nº de avaliações da função de fitness
+n_execucoes = 5
+n_agentes = 30
+alvo = 1e-2  # Distância ao ótimo que conta como sucesso
+
+ficheiro_json = "benchmark_resultados.json"
+ficheiro_csv = "benchmark_resultados.csv"
+ficheiro_baseline = "benchmark_baseline.json"
+
+# Uso: python benchmark_otimizadores.py [--baseline]
+# (--baseline guarda os resultados desta execução como nova baseline)
+guardar_baseline = "--baseline" in sys.argv[1:]
+
+print(f"A executar {len(algoritmos)} algoritmos x {len(funcoes)} funções x {len(dimensoes)} dimensões x "
+      f"{len(orcamentos)} orçamentos, {n_execucoes} execuções cada...")
+registos = benchmark.suite(algoritmos, funcoes, dimensoes, orcamentos, runs=n_execucoes, n=n_agentes,
+                           target=alvo)
+resumo = benchmark.summary(registos)
+
+benchmark.save_json({"records": registos, "summary": resumo}, ficheiro_json)
+benchmark.save_csv(resumo, ficheiro_csv)
+print(f"Resultados guardados em {ficheiro_json} (com curvas de convergência) e {ficheiro_csv}.")
+
+print(f"\n{'algoritmo':<8} {'função':<11} {'D':>3} {'orçamento':>9} {'mediana':>11} {'sucesso':>8} "
+      f"{'ERT':>8} {'ms/iter':>8} {'% fitness':>9} {'KB pico':>8}")
+for linha in resumo:
+    ert = f"{linha['ert']:.0f}" if linha["ert"] is not None else "-"
+    tempo = f"{1000 * linha['time_per_iteration']:.3f}" if linha["time_per_iteration"] is not None else "-"
+    fracao = f"{100 * linha['fitness_time_share']:.1f}" if linha["fitness_time_share"] is not None else "-"
+    print(f"{linha['algorithm']:<8} {linha['function']:<11} {linha['dimension']:>3} {linha['budget']:>9} "
+          f"{linha['median_fitness']:>11.4g} {linha['success_rate']:>8.0%} {ert:>8} {tempo:>8} {fracao:>9} "
+          f"{linha['peak_memory_kb']:>8.1f}")
+
+if guardar_baseline:
+    benchmark.save_json({"records": registos, "summary": resumo}, ficheiro_baseline)
+    print(f"\nBaseline atualizada: {ficheiro_baseline}")
+elif os.path.exists(ficheiro_baseline):
+    regressoes = benchmark.compare(resumo, benchmark.load_json(ficheiro_baseline)["summary"])
+    if regressoes:
+        print(f"\n{len(regressoes)} regressões face a {ficheiro_baseline}:")
+        for r in regressoes:
+            print(f"  {r['algorithm']} {r['function']} D{r['dimension']} orçamento {r['budget']}: "
+                  f"{r['metric']} {r['baseline']} -> {r['current']}")
+        sys.exit(1)
+    print(f"\nSem regressões face a {ficheiro_baseline}.")
+else:
+    print(f"\nSem baseline ({ficheiro_baseline}); use --baseline para a criar.")
@@ -0,0 +1,102 @@
+### Cache de features (bottleneck) para a HPO só da cabeça densa
+# A parte convolucional é treinada uma vez e as imagens de cada conjunto passam
+# por ela uma única vez; as features achatadas ficam num .npy lido por memmap
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+from tensorflow.keras import layers, models
+from tensorflow.keras.preprocessing.image import ImageDataGenerator
+
+from Functions.trials import dataset_hash
+
+
+def extrator_convolucional(model):
+    """Modelo da entrada até ao Flatten de um modelo treinado, congelado."""
+    flatten = next(layer for layer in model.layers if isinstance(layer, layers.Flatten))
+    extrator = models.Model(model.inputs, flatten.output)
+    extrator.trainable = False
+    return extrator
+
+
+def extrai_features(extrator, caminho, size, batch_size, prefixo):
+    """Passa as imagens de caminho pelo extrator e grava prefixo_x.npy (memmap) e prefixo_y.npy."""
+    # shuffle=False: a ordem das features tem de corresponder à dos rótulos
+    gerador = ImageDataGenerator(rescale=1. / 255).flow_from_directory(
+        caminho,
+        target_size=(size, size),
+        batch_size=batch_size,
+        class_mode='categorical',
+        shuffle=False
+    )
+    dimensao = int(np.prod(extrator.outputs[0].shape[1:]))
+
+    # Escrita direta no ficheiro, lote a lote: o conjunto nunca está todo em memória
+    x = np.lib.format.open_memmap(prefixo + "_x.npy", mode="w+", dtype=np.float32,
+                                  shape=(gerador.samples, dimensao))
+    y = np.zeros((gerador.samples, gerador.num_classes), dtype=np.float32)
+    inicio = 0
+    for i in range(len(gerador)):
+        imagens, rotulos = gerador[i]
+        fim = inicio + len(imagens)
+        x[inicio:fim] = np.asarray(extrator.predict_on_batch(imagens)).reshape(len(imagens), -1)
+        y[inicio:fim] = rotulos
+        inicio = fim
+    x.flush()
+    del x
+    np.save(prefixo + "_y.npy", y)
+
+
+def features_em_cache(pasta, conjuntos, size, cria_extrator, descricao="", batch_size=16):
+    """
+    Features de cada conjunto, extraídas só se a cache não existir ou estiver desatualizada.
+
+    :param pasta: pasta da cache (criada se não existir)
+    :param conjuntos: dict nome -> caminho das imagens (ex.: {"train": ..., "val": ...})
+    :param size: tamanho das imagens
+    :param cria_extrator: função sem argumentos que treina/cria o extrator (ver extrator_convolucional);
+    só é chamada quando é preciso extrair
+    :param descricao: identifica o extrator (arquitetura, hiperparâmetros, épocas); mudá-la invalida a cache
+    :param batch_size: lote da extração
+    :return: dict nome -> (x memmap (amostras, features), y one-hot)
+    """
+    os.makedirs(pasta, exist_ok=True)
+    ficheiro_meta = os.path.join(pasta, "cache.json")
+    meta = {
+        "size": size,
+        "extrator": descricao,
+        "datasets": {nome: dataset_hash(caminho) for nome, caminho in conjuntos.items()},
+    }
+
+    valida = os.path.exists(ficheiro_meta)
+    if valida:
+        with open(ficheiro_meta, encoding="utf-8") as f:
+            guardada = json.load(f)
+        guardada.pop("extraida", None)
+        valida = guardada == meta
+    if valida:
+        print(f"Features em cache ({pasta}): extração saltada.")
+    else:
+        print(f"A treinar o extrator e a extrair features para {pasta}...")
+        extrator = cria_extrator()
+        for nome, caminho in conjuntos.items():
+            extrai_features(extrator, caminho, size, batch_size, os.path.join(pasta, nome))
+        # Metadados escritos no fim: uma extração interrompida é refeita.
+        # A data da extração distingue extratores retreinados com a mesma descrição
+        with open(ficheiro_meta, "w", encoding="utf-8") as f:
+            json.dump(dict(meta, extraida=time.strftime("%Y-%m-%d %H:%M:%S")), f, indent=1)
+
+    return {nome: (np.load(os.path.join(pasta, nome + "_x.npy"), mmap_mode="r"),
+                   np.load(os.path.join(pasta, nome + "_y.npy")))
+            for nome in conjuntos}
+
+
+def hash_cache(pasta):
+    """
+    Hash do cache.json de pasta (extrator, datasets e data da extração), para o contexto dos trials:
+    os trials feitos sobre features de outro extrator, ou de outra extração, não são reutilizados.
+    """
+    with open(os.path.join(pasta, "cache.json"), "rb") as f:
+        return hashlib.blake2b(f.read(), digest_size=8).hexdigest()
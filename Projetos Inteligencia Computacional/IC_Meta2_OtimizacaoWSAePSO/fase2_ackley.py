@@ -3,6 +3,8 @@ from Functions import ackley  # Importa o módulo ackley.py (do seu pacote local
 # CORREÇÃO: Importar as CLASSES de dentro dos MÓDULOS
 from Functions.wsa import wsa
 from Functions.pso import pso
+from Functions.de import de
+from Functions.cmaes import cmaes
 
 
 # --- Configurações Globais ---
@@ -27,11 +29,13 @@ for dimensao in [2, 3]:
     # Usamos valores "standard" para a comparação
     n_agentes_comp = 30
     n_iteracoes_comp = 50
-    print(f"\n[D{dimensao}] PARTE A: Comparação WSA vs. PSO")
+    print(f"\n[D{dimensao}] PARTE A: Comparação WSA vs. PSO vs. DE vs. CMA-ES")
     print(f"Executando {n_execucoes} vezes com {n_agentes_comp} agentes e {n_iteracoes_comp} iterações.")
 
     resultados_wsa = []
     resultados_pso = []
+    resultados_de = []
+    resultados_cmaes = []
 
     for i in range(n_execucoes):
         # Executar WSA (Agora 'wsa' é a classe e pode ser chamada)
@@ -50,11 +54,22 @@ for dimensao in [2, 3]:
         best_pos_pso = pso_opt.get_Gbest()
         resultados_pso.append(funcao_benchmark(best_pos_pso))
 
+        # Executar DE e CMA-ES (mesma interface sw: get_Gbest_fitness evita reavaliar)
+        de_opt = de(n=n_agentes_comp, function=funcao_benchmark, lb=lb, ub=ub, dimension=dimensao,
+                    iteration=n_iteracoes_comp)
+        resultados_de.append(de_opt.get_Gbest_fitness())
+
+        cmaes_opt = cmaes(n=n_agentes_comp, function=funcao_benchmark, lb=lb, ub=ub, dimension=dimensao,
+                          iteration=n_iteracoes_comp)
+        resultados_cmaes.append(cmaes_opt.get_Gbest_fitness())
+
         # print(f"  D{dimensao} - Comparação Execução {i + 1}/{n_execucoes} concluída.")
 
     print(f"\nResultados da Comparação (D{dimensao}):")
     print(f"  WSA - Média: {np.mean(resultados_wsa):.6f} | Min: {np.min(resultados_wsa):.6f}")
     print(f"  PSO - Média: {np.mean(resultados_pso):.6f} | Min: {np.min(resultados_pso):.6f}")
+    print(f"  DE  - Média: {np.mean(resultados_de):.6f} | Min: {np.min(resultados_de):.6f}")
+    print(f"  CMA-ES - Média: {np.mean(resultados_cmaes):.6f} | Min: {np.min(resultados_cmaes):.6f}")
 
     # === PARTE B: ANÁLISE DE SENSIBILIDADE (Apenas WSA) ===
     print(f"\n[D{dimensao}] PARTE B: Análise de Sensibilidade do WSA")